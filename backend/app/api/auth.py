@@ -1,30 +1,56 @@
 """
 Authentication API Endpoints
+
+Register and login are async: the database work runs in the threadpool and
+bcrypt runs on its own bounded pool (app.core.hashing.bcrypt_pool). A flood
+of logins therefore queues there, not in front of the vault routes. When
+that queue is full the request is refused at once with 503 + Retry-After.
+
+A login also returns a refresh token. /refresh renews the pair without
+bcrypt, so clients only send the master password once per session
+(REFRESH_TOKEN_EXPIRE_DAYS). /logout ends that session.
+
+Changing the master password, deleting the account and an admin
+deactivating it end every session of the user at once. The first two ask
+for the master password; it is checked on the bcrypt pool like a login.
 """
-from datetime import timedelta
-from fastapi import APIRouter, Depends, HTTPException, status
-from fastapi.security import OAuth2PasswordRequestForm 
+from typing import Optional
+from fastapi import APIRouter, Depends, HTTPException, Response, status
+from fastapi.concurrency import run_in_threadpool
+from fastapi.security import OAuth2PasswordRequestForm
 from sqlalchemy.orm import Session
 
 # Import our system components
-from app.database.session import get_db
+from app.database.session import SessionLocal, get_db
 from app.services.user_services import user_service
-from app.core.jwt import create_access_token
-from app.schema.auth import UserRegister, UserResponse, Token
-from app.config import settings
+from app.services.token_service import token_service
+from app.core.hashing import HashingBusy, bcrypt_pool
+from app.core.jwt import decode_access_token
+from app.schema.auth import (
+    UserRegister, UserResponse, Token, RefreshRequest, PasswordChange, AccountDelete, ActiveUpdate
+)
+from app.api.deps import get_current_superuser, get_current_user, oauth2_scheme
+from app.core.principals import Principal
+from app.models.user import User
 # Create the router (like a mini-app for auth routes)
 router = APIRouter()
 
-@router.post("/register", response_model=UserResponse, status_code=status.HTTP_201_CREATED)
-def register_user(user_in: UserRegister, db: Session = Depends(get_db)):
-    """
-    Register a new user.
-    
-    1. Checks if email is already taken.
-    2. Checks if username is already taken.
-    3. Creates the user securely.
-    """
-    
+def _busy() -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        detail="Too many logins in progress, try again shortly",
+        headers={"Retry-After": "1"},
+    )
+
+def _issue_tokens(user_id: int) -> dict:
+    # Own short session, like the user lookup: see login_for_access_token
+    db = SessionLocal()
+    try:
+        return token_service.issue(db, user_id)
+    finally:
+        db.close()
+
+def _check_available(db: Session, user_in: UserRegister):
     # 1. Check for duplicate email
     user_email = user_service.get_user_by_email(db, email=user_in.email)
     if user_email:
@@ -32,7 +58,7 @@ def register_user(user_in: UserRegister, db: Session = Depends(get_db)):
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Email already registered"
         )
-    
+
     # 2. Check for duplicate username
     user_username = user_service.get_user_by_username(db, username=user_in.username)
     if user_username:
@@ -40,46 +66,184 @@ def register_user(user_in: UserRegister, db: Session = Depends(get_db)):
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Username already taken"
         )
-        
-    # 3. Create the user
-    new_user = user_service.create_user(db=db, user_in=user_in)
-    
+
+async def _confirm_master_password(db: Session, current_user: Principal, master_password: str) -> User:
+    """Load the caller's account and check its master password on the bcrypt pool."""
+    try:
+        bcrypt_pool.check_capacity()
+    except HashingBusy:
+        raise _busy()
+    user = await run_in_threadpool(user_service.get_user_by_id, db, current_user.id)
+    try:
+        confirmed = user is not None and await bcrypt_pool.verify(master_password, user.hashed_master_password)
+    except HashingBusy:
+        raise _busy()
+    if not confirmed:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Incorrect master password"
+        )
+    return user
+
+@router.post("/register", response_model=UserResponse, status_code=status.HTTP_201_CREATED)
+async def register_user(user_in: UserRegister, db: Session = Depends(get_db)):
+    """
+    Register a new user.
+
+    1. Checks if email is already taken.
+    2. Checks if username is already taken.
+    3. Creates the user securely.
+    """
+    try:
+        bcrypt_pool.check_capacity()
+    except HashingBusy:
+        raise _busy()
+    await run_in_threadpool(_check_available, db, user_in)
+
+    # 3. Hash on the bcrypt pool, then create the user
+    try:
+        hashed_password = await bcrypt_pool.hash(user_in.master_password)
+    except HashingBusy:
+        raise _busy()
+    new_user = await run_in_threadpool(user_service.create_user, db, user_in, hashed_password)
+
     return new_user
 
 
 
 @router.post("/token",response_model=Token)
-def login_for_access_token(
-    form_data: OAuth2PasswordRequestForm = Depends(), 
-    db: Session = Depends(get_db)
-):
+async def login_for_access_token(form_data: OAuth2PasswordRequestForm = Depends()):
     """
     Authenticate user and return JWT token.
-    
+
     1. Verify username and password.
-    2. Create JWT token with expiration.
-    3. Return token and token type.
+    2. Create JWT token with expiration, plus a refresh token.
+    3. Return tokens and token type.
+
+    No get_db here: a login refused by the bcrypt pool never touches the
+    database, and an admitted one only holds a connection for the lookup.
     """
-    
+
     # 1. Authenticate user
-    user = user_service.authenticate_user(
-        db, 
-        username=form_data.username, 
-        password=form_data.password
-    )
+    try:
+        user = await user_service.authenticate_user_async(
+            username=form_data.username,
+            master_password=form_data.password
+        )
+    except HashingBusy:
+        raise _busy()
     if not user:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect username or password",
             headers={"WWW-Authenticate": "Bearer"},
         )
-    
-    # 2. Create JWT token
-    access_token_expires = timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
-    access_token = create_access_token(
-        data={"sub": str(user.id)}, 
-        expires_delta=access_token_expires
-    )
-    
-    # 3. Return the token
-    return {"access_token": access_token, "token_type": "bearer"}
+
+    # 2. Create the JWT and refresh token (a new session), 3. return them
+    return await run_in_threadpool(_issue_tokens, user.id)
+
+@router.post("/refresh", response_model=Token)
+def refresh_access_token(body: RefreshRequest, db: Session = Depends(get_db)):
+    """
+    Trade a refresh token for a new access token and refresh token.
+
+    No bcrypt here: a hash lookup and an HMAC signature. Each refresh token
+    works once; presenting a used one again ends the whole session.
+    """
+    tokens = token_service.rotate(db, body.refresh_token)
+    if tokens is None:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid or expired refresh token",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    return tokens
+
+@router.post("/logout", status_code=status.HTTP_204_NO_CONTENT)
+def logout(
+    body: Optional[RefreshRequest] = None,
+    token: str = Depends(oauth2_scheme),
+    current_user: Principal = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """
+    End the current session: its access token stops working at once and
+    its refresh tokens can no longer be used.
+    """
+    token_service.logout(db, decode_access_token(token), body.refresh_token if body else None)
+    return Response(status_code=status.HTTP_204_NO_CONTENT)
+
+@router.post("/change-password", status_code=status.HTTP_204_NO_CONTENT)
+async def change_master_password(
+    body: PasswordChange,
+    current_user: Principal = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """
+    Change the master password.
+
+    1. Verifies the current master password.
+    2. Hashes the new one on the bcrypt pool and stores it.
+    3. Ends every session, this one included: log in again afterwards.
+    """
+    user = await _confirm_master_password(db, current_user, body.current_master_password)
+    try:
+        hashed_password = await bcrypt_pool.hash(body.new_master_password)
+    except HashingBusy:
+        raise _busy()
+    await run_in_threadpool(user_service.change_master_password, db, user, hashed_password)
+    return Response(status_code=status.HTTP_204_NO_CONTENT)
+
+@router.delete("/me", status_code=status.HTTP_204_NO_CONTENT)
+async def delete_account(
+    body: AccountDelete,
+    current_user: Principal = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """
+    Delete the caller's account and every vault entry in it, after
+    verifying the master password. Its sessions end at once.
+    """
+    user = await _confirm_master_password(db, current_user, body.master_password)
+    await run_in_threadpool(user_service.delete_user, db, user)
+    return Response(status_code=status.HTTP_204_NO_CONTENT)
+
+@router.patch("/users/{user_id}/active", response_model=UserResponse)
+def set_user_active(
+    user_id: int,
+    body: ActiveUpdate,
+    current_user: Principal = Depends(get_current_superuser),
+    db: Session = Depends(get_db)
+):
+    """
+    Admin only: deactivate (or reactivate) an account. Deactivating ends
+    all of its sessions; a reactivated user logs in again.
+    """
+    if user_id == current_user.id and not body.is_active:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Cannot deactivate your own account"
+        )
+    user = user_service.get_user_by_id(db, user_id)
+    if user is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="User not found"
+        )
+    return user_service.set_active(db, user, body.is_active)
+
+@router.get("/hashing-stats")
+def get_hashing_stats(current_user: Principal = Depends(get_current_superuser)):
+    """
+    Admin only: bcrypt pool queue depth, rejections and latencies,
+    plus rehash-on-login progress.
+    """
+    return {**bcrypt_pool.stats(), "rehash": user_service.rehash_stats()}
+
+@router.get("/token-stats")
+def get_token_stats(current_user: Principal = Depends(get_current_superuser)):
+    """
+    Admin only: tokens issued and rotated, replayed refresh tokens,
+    and the revocation set.
+    """
+    return token_service.stats()
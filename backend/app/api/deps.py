@@ -10,7 +10,8 @@ from pydantic import ValidationError
 from app.database.session import get_db
 from app.core.jwt import decode_access_token
 from app.services.user_services import user_service
-from app.models.user import User
+from app.core.principals import Principal, principal_cache
+from app.core.revocation import revoked_tokens
 from app.config import settings
 
 # 1. The OAuth2 Scheme
@@ -22,10 +23,13 @@ oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/auth/token")
 def get_current_user(
     token: str = Depends(oauth2_scheme), 
     db: Session = Depends(get_db)
-) -> User:
+) -> Principal:
     """
     Validates the token and retrieves the current logged-in user.
-    If anything is wrong (expired token, fake user), it throws an error.
+    If anything is wrong (expired token, fake or deactivated user), it throws an error.
+
+    Returns a Principal (immutable, not bound to the session). It comes from
+    principal_cache when possible, so most requests never query the users table.
     """
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
@@ -37,14 +41,38 @@ def get_current_user(
     payload = decode_access_token(token)
     if payload is None:
         raise credentials_exception
-        
-    username: str = payload.get("sub")
-    if username is None:
+
+    # Logged out, session revoked or account locked: refused until the token expires
+    if revoked_tokens.is_revoked(payload.get("jti")):
         raise credentials_exception
         
-    # 3. Get the User from DB
-    user = user_service.get_user_by_username(db, username=username)
-    if user is None:
+    # The login route puts the user id in "sub"
+    user_id = payload.get("sub")
+    if user_id is None or not str(user_id).isdigit():
         raise credentials_exception
         
-    return user
\ No newline at end of file
+    # 3. Get the User (cache first, then DB)
+    principal = principal_cache.get(int(user_id))
+    if principal is None:
+        user = user_service.get_user_by_id(db, user_id=int(user_id))
+        if user is None:
+            raise credentials_exception
+        principal = Principal.from_user(user)
+        principal_cache.put(principal, token_exp=payload.get("exp"))
+
+    if not principal.is_active:
+        raise credentials_exception
+
+    return principal
+
+def get_current_superuser(current_user: Principal = Depends(get_current_user)) -> Principal:
+    """
+    Same as get_current_user, but only lets admins through.
+    Used for operational endpoints (stats, reloads).
+    """
+    if not current_user.is_superuser:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Admin privileges required",
+        )
+    return current_user
@@ -1,38 +1,94 @@
 """
 Machine Learning API Endpoints
 """
-from fastapi import APIRouter, Body
-from pydantic import BaseModel
+from typing import List, Literal, Optional
+from fastapi import APIRouter, Body, Depends, HTTPException, status
+from fastapi.concurrency import run_in_threadpool
+from pydantic import BaseModel, Field
 
+from app.config import settings
+from app.api.deps import get_current_superuser
+from app.ml.batcher import micro_batcher
 from app.ml.password_strength import password_strength_model
+from app.ml.patterns import PatternEngineError, pattern_strength_engine
+from app.ml.registry import ModelRegistryError
+from app.core.principals import Principal
 
 router = APIRouter()
 
+# "forest" = the Random Forest over character counts, "patterns" = the guess
+# estimator that detects words, keyboard walks, repeats, sequences and dates
+Engine = Literal["forest", "patterns"]
+PATTERN_INLINE_MAX_LENGTH = 32
+# How the pattern engine's match kinds read in a UI message
+PATTERN_NAMES = {
+    "dictionary": "common words",
+    "reversed": "reversed words",
+    "l33t": "common words with look-alike substitutions (p@ssw0rd)",
+    "spatial": "keyboard walks",
+    "sequence": "sequences like abc or 123",
+    "date": "dates or years",
+    "repeat": "repeated characters",
+}
+
 # --- Schemas ---
 class MLRequest(BaseModel):
     password: str
+    engine: Optional[Engine] = None     # default: settings.ML_DEFAULT_ENGINE
 
 class MLResponse(BaseModel):
     score: float    # 0.0 to 1.0
     label: str      # "Weak" or "Strong"
     message: str
+    guesses_log10: Optional[float] = None   # pattern engine only
+    patterns: Optional[List[str]] = None    # pattern kinds found (pattern engine only)
 
-@router.post("/predict", response_model=MLResponse)
-def predict_strength(request: MLRequest = Body(...)):
-    """
-    Analyze password using the Random Forest ML model.
-    Returns a score (0-1) indicating confidence in strength.
-    """
-    result = password_strength_model.predict(request.password)
-    
+class MLBatchRequest(BaseModel):
+    passwords: List[str] = Field(..., min_length=1, max_length=settings.ML_BATCH_MAX_ITEMS)
+    engine: Optional[Engine] = None
+
+class MLBatchResponse(BaseModel):
+    results: List[MLResponse]   # same order as the request
+
+class MLReloadRequest(BaseModel):
+    version: Optional[str] = None   # default: the manifest's active version
+
+
+def _to_response(result: dict) -> dict:
+    """Turn a raw model result into the API response (adds a UI message)."""
+    if result.get("warming"):
+        # Started, but the model is still loading in the background
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail={"status": "warming", "message": "ML Model is warming up. Please retry shortly."},
+            headers={"Retry-After": "1"},
+        )
     if result.get("error"):
         return {
             "score": 0.0,
             "label": "Error",
-            "message": "ML Model is not active. Please contact admin."
+            "message": ("Pattern engine is not available." if result.get("engine") == "patterns"
+                        else "ML Model is not active.") + " Please contact admin."
         }
         
     # Create a nice message for the UI
+    if "guesses_log10" in result:
+        # Pattern engine: a rule-based guess count, so name what made it low
+        found = ", ".join(PATTERN_NAMES.get(p, p) for p in result["patterns"])
+        if result["score"] > 0.8:
+            msg = "🚀 Strong! This password is excellent."
+        elif result["score"] > 0.5:
+            msg = f"⚠️ Moderate. It contains {found}." if found else "⚠️ Moderate. A few more characters would help."
+        else:
+            msg = f"❌ Weak. Easy to guess: it is built from {found}." if found else "❌ Weak. Too short to resist guessing."
+        return {
+            "score": result["score"],
+            "label": result["label"],
+            "message": f"{msg} (~10^{result['guesses_log10']:.0f} guesses to crack)",
+            "guesses_log10": result["guesses_log10"],
+            "patterns": result["patterns"],
+        }
+
     score_pct = int(result["score"] * 100)
     if result["score"] > 0.8:
         msg = "🚀 Strong! This password is excellent."
@@ -40,9 +96,75 @@ def predict_strength(request: MLRequest = Body(...)):
         msg = "⚠️ Moderate. It's okay, but could be better."
     else:
         msg = "❌ Weak. Our AI thinks this is easy to guess."
-
     return {
         "score": result["score"],
         "label": result["label"],
         "message": f"{msg} (AI Confidence: {score_pct}%)"
-    }
\ No newline at end of file
+    }
+
+
+def _predict_patterns(passwords: List[str]) -> List[dict]:
+    try:
+        return pattern_strength_engine.predict_many(passwords)
+    except PatternEngineError as e:
+        print(f"❌ Pattern engine unavailable: {e}")
+        return [{"score": 0.0, "label": "Error", "error": True, "engine": "patterns"} for _ in passwords]
+
+
+@router.post("/predict", response_model=MLResponse)
+async def predict_strength(request: MLRequest = Body(...)):
+    """
+    Analyze password using the Random Forest ML model, or the pattern engine.
+    Returns a score (0-1) indicating confidence in strength.
+    With micro-batching on, concurrent calls share one model invocation.
+    """
+    if (request.engine or settings.ML_DEFAULT_ENGINE) == "patterns":
+        # Typical passwords take ~0.2 ms and are scored right here on the event
+        # loop; long repetitive ones can take a few ms, so they go to a thread.
+        # So does anything before the startup load finished: loading may compile.
+        if pattern_strength_engine.loaded and len(request.password) <= PATTERN_INLINE_MAX_LENGTH:
+            return _to_response(_predict_patterns([request.password])[0])
+        return _to_response((await run_in_threadpool(_predict_patterns, [request.password]))[0])
+    if micro_batcher.running:
+        result = await micro_batcher.submit(request.password)
+    else:
+        result = await run_in_threadpool(password_strength_model.predict, request.password)
+    return _to_response(result)
+
+
+@router.post("/predict-batch", response_model=MLBatchResponse)
+def predict_strength_batch(request: MLBatchRequest = Body(...)):
+    """
+    Analyze many passwords with a single model call.
+    Much cheaper per password than calling /predict in a loop.
+    """
+    if (request.engine or settings.ML_DEFAULT_ENGINE) == "patterns":
+        results = _predict_patterns(request.passwords)
+    else:
+        results = password_strength_model.predict_many(request.passwords)
+    return {"results": [_to_response(r) for r in results]}
+
+
+@router.get("/stats")
+def ml_stats(current_user: Principal = Depends(get_current_superuser)):
+    """Micro-batching and prediction-cache metrics (admin only)."""
+    return {
+        "model": password_strength_model.model_info(),
+        "microbatch": micro_batcher.stats(),
+        "prediction_cache": password_strength_model.cache_stats(),
+    }
+
+
+@router.post("/reload")
+async def reload_model(request: MLReloadRequest = Body(MLReloadRequest()),
+                       current_user: Principal = Depends(get_current_superuser)):
+    """
+    Load a model version in the background, warm it up and swap it in (admin only).
+    Requests keep being served by the current model until the swap.
+    """
+    try:
+        return await run_in_threadpool(password_strength_model.reload, request.version)
+    except ModelRegistryError as e:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=f"Model reload failed: {e}")
@@ -6,7 +6,7 @@ from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy.orm import Session
 
 from app.database.session import get_db
-from app.models.user import User
+from app.core.principals import Principal
 from app.schema.password import PasswordCreate, PasswordUpdate, PasswordResponse
 from app.services.password_service import password_service
 from app.api.deps import get_current_user # Import the Bouncer!
@@ -19,7 +19,7 @@ router = APIRouter()
 def create_password(
     password_in: PasswordCreate,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user) # Require login
+    current_user: Principal = Depends(get_current_user) # Require login
 ):
     """
     Store a new encrypted password.
@@ -36,7 +36,7 @@ def read_passwords(
     skip: int = 0,
     limit: int = 100,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: Principal = Depends(get_current_user)
 ):
     """
     Retrieve all password entries for the current user.
@@ -54,7 +54,7 @@ def read_passwords(
 def read_password(
     password_id: int,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: Principal = Depends(get_current_user)
 ):
     """
     Retrieve a specific password entry.
@@ -70,7 +70,7 @@ def read_password(
         raise HTTPException(status_code=404, detail="Password entry not found")
         
     # Decrypt specifically for this "View" action
-    decrypted_pass = encryption_manager.decrypt(password_entry.encrypted_password)
+    decrypted_pass = encryption_manager.decrypt_entry(db, password_entry)
     
     # Attach it to the response object (Pydantic will pick it up)
     password_entry.password = decrypted_pass
@@ -83,7 +83,7 @@ def update_password(
     password_id: int,
     password_in: PasswordUpdate,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: Principal = Depends(get_current_user)
 ):
     """
     Update a password entry.
@@ -108,7 +108,7 @@ def update_password(
 def delete_password(
     password_id: int,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: Principal = Depends(get_current_user)
 ):
     """
     Delete a password entry.
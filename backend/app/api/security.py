@@ -2,14 +2,16 @@
 Securty Tools API endpoints
 """
 
+from typing import List, Optional
 from fastapi import APIRouter, Depends, HTTPException, status, Body
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from sqlalchemy.orm import Session
 from app.services.breach_checker import breach_checker 
+from app.config import settings
 
 from app.database.session import get_db
-from app.api.deps import get_current_user
-from app.models.user import User
+from app.api.deps import get_current_user, get_current_superuser
+from app.core.principals import Principal
 from app.services.score_service import score_service
 
 router = APIRouter()
@@ -27,11 +29,33 @@ class PasswordCheckRequest(BaseModel):
     password: str
 
 # Response Schema
+# status is "breached", "not_breached" or "unknown" (the check could not be done,
+# e.g. the breach API is down). For "unknown", is_breached and breach_count are null.
 class BreachResponse(BaseModel):
-    is_breached: bool
-    breach_count: int
+    status: str
+    is_breached: Optional[bool]
+    breach_count: Optional[int]
     message: str
 
+class BatchPasswordCheckRequest(BaseModel):
+    passwords: List[str] = Field(..., min_length=1, max_length=settings.BREACH_BATCH_MAX_ITEMS)
+
+class BatchBreachItem(BaseModel):
+    status: str                     # same values as BreachResponse.status
+    is_breached: Optional[bool]     # None when the lookup failed
+    breach_count: Optional[int]
+    error: Optional[str] = None
+
+class BatchBreachResponse(BaseModel):
+    results: List[BatchBreachItem]  # same order as the request
+    breached_count: int
+    failed_count: int
+
+def _breach_status(count: Optional[int]) -> str:
+    if count is None:
+        return "unknown"
+    return "breached" if count > 0 else "not_breached"
+
 @router.post("/check-password", response_model=BreachResponse)
 async def check_password_breach(
     request: PasswordCheckRequest = Body(...)
@@ -43,27 +67,74 @@ async def check_password_breach(
     
 # Verify against HIBP
     count = await breach_checker.check_password_breach(request.password)
-    
+
+    if count is None:
+        return {
+            "status": "unknown",
+            "is_breached": None,
+            "breach_count": None,
+            "message": "⚠️ We could not check this password right now. Please try again later."
+        }
+
     if count > 0:
         return {
+            "status": "breached",
             "is_breached": True,
             "breach_count": count,
             "message": f"⚠️ This password has appeared in {count} known data breaches. Do not use it!"
         }
 
     return {
+        "status": "not_breached",
         "is_breached": False,
         "breach_count": 0,
         "message": "✅ This password was NOT found in known data breaches."}
 
 
+@router.post("/check-passwords", response_model=BatchBreachResponse)
+async def check_passwords_breach(
+    request: BatchPasswordCheckRequest = Body(...),
+    current_user: Principal = Depends(get_current_user) # Requires Login!
+):
+    """
+    Check many passwords in one round trip (e.g. a whole vault audit).
+    Each range is fetched once per batch. A failed lookup is reported on
+    its item instead of being counted as "not breached".
+    """
+    results = await breach_checker.check_passwords_breach(request.passwords)
+
+    items = []
+    for result in results:
+        count = result["breach_count"]
+        items.append({
+            "status": _breach_status(count),
+            "is_breached": None if count is None else count > 0,
+            "breach_count": count,
+            "error": result["error"],
+        })
+
+    return {
+        "results": items,
+        "breached_count": sum(1 for item in items if item["is_breached"]),
+        "failed_count": sum(1 for item in items if item["error"]),
+    }
+
+
 @router.get("/score", response_model=HealthScoreResponse)
 def get_vault_health(
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user) # Requires Login!
+    current_user: Principal = Depends(get_current_user) # Requires Login!
 ):
     """
     Calculate the current health score of the user's password vault.
     Checks for password reuse and weak passwords.
     """
-    return score_service.calculate_health_score(db=db, user_id=current_user.id)
\ No newline at end of file
+    return score_service.calculate_health_score(db=db, user_id=current_user.id)
+
+
+@router.get("/breach-stats")
+def get_breach_checker_stats(current_user: Principal = Depends(get_current_superuser)):
+    """
+    Breach checker cache counters for this worker (admin only).
+    """
+    return breach_checker.stats()
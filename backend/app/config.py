@@ -5,6 +5,9 @@ Loads environment variables from the .env file.
 import os
 from pydantic_settings import BaseSettings
 
+# backend/: runtime files default to backend/data/, wherever the process starts
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
 class Settings(BaseSettings):
     # Application Info
     APP_NAME: str = "AI Password Manager"
@@ -18,11 +21,88 @@ class Settings(BaseSettings):
     # This MUST be a valid base64 key (generate with fernet.generate_key())
     ENCRYPTION_KEY: str
     
+    # Envelope encryption: per-user data keys wrapped by key-encryption keys (app/core/envelope.py)
+    ENCRYPTION_KEKS: str = ""                   # comma-separated Fernet keys, newest first (empty = ENCRYPTION_KEY)
+    ENCRYPTION_DEK_CACHE_SIZE: int = 1024       # unwrapped data keys kept in memory per worker
+
+    # Bulk encryption (EncryptionManager.encrypt_many / decrypt_many)
+    ENCRYPTION_BATCH_WORKERS: int = 0           # pool size for large batches (0 = always the calling thread)
+    ENCRYPTION_BATCH_EXECUTOR: str = "process"  # "process" scales with cores; "thread" avoids start-up and pickling
+    ENCRYPTION_BATCH_PARALLEL_MIN: int = 5000   # smaller batches stay on the calling thread
+
     # Security - JWT (Login)
     # This acts as the salt for hashing tokens
     JWT_SECRET_KEY: str 
     JWT_ALGORITHM: str = "HS256"
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 30
+    JWT_VERIFIED_CACHE_SIZE: int = 10000     # verified tokens remembered per worker, until their exp (0 = verify every request)
+    JWT_FAST_HS256: bool = True              # verify HS256 with hmac + json directly instead of python-jose
+    REFRESH_TOKEN_EXPIRE_DAYS: int = 14      # login session length: refreshing never extends it, then bcrypt again
+    REVOCATION_SYNC_SECONDS: float = 5.0     # how often each worker reloads revoked tokens from the DB (0 = startup only)
+    PRINCIPAL_CACHE_SIZE: int = 10000        # users whose principal is kept per worker (0 = query every request)
+    PRINCIPAL_CACHE_TTL_SECONDS: float = 60  # longest another worker can act on a stale principal
+
+    # Master password hashing (bcrypt on its own bounded pool, see app/core/hashing.py)
+    BCRYPT_ROUNDS: int = 12         # cost of new hashes; tune with: python -m app.core.hashing calibrate
+    BCRYPT_REHASH_ON_LOGIN: bool = True  # upgrade hashes of another cost after a successful login
+    BCRYPT_WORKERS: int = 0         # threads hashing at once (0 = half the CPU cores, at least 1)
+    BCRYPT_MAX_QUEUE: int = 8       # calls allowed to wait for a thread; beyond that logins get a fast 503
+                                    # (worst wait ~ queue / workers x one hash, ~0.3 s at cost 12)
+
+    # Breach Checker (Have I Been Pwned range API)
+    # One pooled HTTP client is shared by every lookup (see BreachChecker.startup)
+    HIBP_API_URL: str = "https://api.pwnedpasswords.com/range/"
+    HIBP_MAX_CONNECTIONS: int = 20
+    HIBP_MAX_KEEPALIVE_CONNECTIONS: int = 10
+    HIBP_KEEPALIVE_EXPIRY: float = 30.0     # seconds an idle connection is kept open
+    HIBP_HTTP2: bool = False                # requires the optional 'h2' package
+    HIBP_CONNECT_TIMEOUT: float = 3.0
+    HIBP_READ_TIMEOUT: float = 5.0
+    HIBP_WRITE_TIMEOUT: float = 5.0
+    HIBP_POOL_TIMEOUT: float = 2.0          # max wait for a free pooled connection
+    HIBP_BATCH_CONCURRENCY: int = 8         # concurrent range fetches per batch request
+    BREACH_BATCH_MAX_ITEMS: int = 500       # passwords accepted by /check-passwords
+
+    # Range cache: per-worker LRU in front of an on-disk store shared by all workers
+    HIBP_CACHE_ENABLED: bool = True
+    HIBP_CACHE_TTL_SECONDS: int = 86400
+    HIBP_MEMORY_CACHE_SIZE: int = 1024      # prefixes per worker (~20 KB each)
+    HIBP_DISK_CACHE_PATH: str = os.path.join(BACKEND_DIR, "data", "hibp_ranges.db")   # empty string disables the disk tier
+    HIBP_DISK_CACHE_MAX_ENTRIES: int = 20000
+    HIBP_CACHE_STALE_SECONDS: int = 604800  # past the TTL, a range may still be served while it is refreshed
+
+    # Resilience: fail fast when HIBP is down, hedge slow requests
+    HIBP_TOTAL_TIMEOUT: float = 4.0         # budget for one range fetch, hedge included
+    HIBP_BREAKER_FAILURE_THRESHOLD: int = 5 # consecutive failures before the circuit opens
+    HIBP_BREAKER_RESET_SECONDS: float = 30.0
+    HIBP_HEDGE_ENABLED: bool = False        # send a second GET when the first is slower than...
+    HIBP_HEDGE_PERCENTILE: float = 95.0     # ...this percentile of recent fetch latencies
+    HIBP_HEDGE_MIN_DELAY: float = 0.05
+
+    # Where breach lookups are answered:
+    #   "online"  - HIBP range API (with the cache above)
+    #   "offline" - local index only (build with: python -m app.services.breach_index build ...)
+    #   "hybrid"  - local index when it is available, otherwise the online API
+    BREACH_CHECK_MODE: str = "online"
+    BREACH_INDEX_PATH: str = os.path.join(BACKEND_DIR, "data", "pwned_sha1.idx")
+
+    # Optional Bloom filter pre-screen (build with: python -m app.services.breach_filter build ...)
+    # Definite misses skip the lookup entirely. Build it from a corpus at least as new
+    # as the one being queried, or newly breached passwords will be reported as safe.
+    BREACH_FILTER_PATH: str = ""    # empty string disables the filter
+
+    # Machine Learning
+    ML_BATCH_MAX_ITEMS: int = 1000      # passwords accepted by /api/ml/predict-batch
+    ML_MICROBATCH_ENABLED: bool = False # fuse concurrent /api/ml/predict calls into one model call
+    ML_MICROBATCH_WINDOW_MS: float = 2.0  # how long the first request waits for company
+    ML_MICROBATCH_MAX_SIZE: int = 64    # dispatch as soon as this many requests are queued
+    ML_PREDICTION_CACHE_SIZE: int = 65536  # feature tuples remembered by the LRU (0 = off)
+    ML_PREDICTION_TABLE_ENABLED: bool = False  # precompute the prediction for every reachable input
+    ML_PREDICTION_TABLE_MAX_CELLS: int = 1_000_000  # skip the table if the model would need more
+    ML_MODEL_CHECK_SECONDS: float = 5.0 # how often to poll the manifest/model files for a new version (0 = never)
+    ML_JOBLIB_MMAP_MODE: str = "r"      # map the joblib fallback's arrays instead of copying ("" = copy)
+    ML_DEFAULT_ENGINE: str = "forest"   # /predict engine when the request names none: "forest" or "patterns"
+    ML_PATTERN_MAX_LENGTH: int = 100    # characters the pattern engine analyses; the rest are ignored
     
     # Pydantic Configuration
     class Config:
@@ -0,0 +1,134 @@
+"""
+Envelope encryption - per-user data keys wrapped by key-encryption keys
+
+Each user has a data key (DEK), a Fernet key of their own that encrypts
+their vault entries. The DEK is stored on the users row, encrypted
+("wrapped") by a key-encryption key (KEK). The KEK never touches entries,
+so rotating it means rewrapping one small token per user. No vault entry is
+re-encrypted.
+
+ENCRYPTION_KEKS lists the active KEKs, newest first. They are combined with
+MultiFernet: new wraps use the first key, and unwrapping tries each key.
+To rotate a KEK:
+  1. Put the new key in front: ENCRYPTION_KEKS="new,old". Then deploy.
+  2. Run scripts/rotate_kek.py. It rewraps every DEK under the new key.
+  3. Drop the old key from ENCRYPTION_KEKS.
+
+Unwrapping costs a KEK decryption and a database read. Unwrapped DEKs are
+therefore kept in a bounded in-memory LRU, keyed by user id. Rotation does
+not change a DEK, so cached DEKs remain valid across rotation.
+"""
+
+import threading
+from collections import OrderedDict
+from typing import List, Optional
+
+from cryptography.fernet import Fernet, MultiFernet
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.models.user import User
+
+
+class DataKeyError(Exception):
+    """A user's data key is missing or cannot be unwrapped with any active KEK."""
+
+
+def _kek_list() -> List[str]:
+    keys = [k.strip() for k in settings.ENCRYPTION_KEKS.split(",") if k.strip()]
+    # Without explicit KEKs the legacy global key doubles as the only KEK
+    return keys or [settings.ENCRYPTION_KEY]
+
+
+class DataKeyManager:
+    """Wraps, unwraps and caches per-user data keys"""
+
+    def __init__(self, keks: Optional[List[str]] = None, cache_size: Optional[int] = None):
+        keks = keks or _kek_list()
+        self.kek = MultiFernet([Fernet(k.encode()) for k in keks])
+        self.kek_count = len(keks)
+        self.max_entries = settings.ENCRYPTION_DEK_CACHE_SIZE if cache_size is None else cache_size
+        self._keys: "OrderedDict[int, bytes]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.provisioned = 0
+
+    # --- Wrapping ---
+    def new_wrapped_key(self) -> str:
+        """A fresh DEK, wrapped under the primary KEK (what goes in users.wrapped_data_key)."""
+        return self.kek.encrypt(Fernet.generate_key()).decode("ascii")
+
+    def unwrap(self, wrapped: str) -> bytes:
+        try:
+            return self.kek.decrypt(wrapped.encode("ascii"))
+        except Exception as e:
+            raise DataKeyError("data key cannot be unwrapped with any active KEK") from e
+
+    def rewrap(self, wrapped: str) -> str:
+        """Same DEK, wrapped under the primary KEK (MultiFernet.rotate)."""
+        try:
+            return self.kek.rotate(wrapped.encode("ascii")).decode("ascii")
+        except Exception as e:
+            raise DataKeyError("data key cannot be unwrapped with any active KEK") from e
+
+    # --- Per-user keys ---
+    def key_for(self, db: Session, user_id: int) -> bytes:
+        """The user's unwrapped DEK, provisioning one on first use."""
+        with self._lock:
+            key = self._keys.get(user_id)
+            if key is not None:
+                self._keys.move_to_end(user_id)
+                self.hits += 1
+                return key
+            self.misses += 1
+
+        row = db.query(User.wrapped_data_key).filter(User.id == user_id).first()
+        if row is None:
+            raise DataKeyError(f"no user with id {user_id}")
+        wrapped = row[0] or self._provision(db, user_id)
+        key = self.unwrap(wrapped)
+
+        with self._lock:
+            self._keys[user_id] = key
+            self._keys.move_to_end(user_id)
+            while len(self._keys) > self.max_entries:
+                self._keys.popitem(last=False)
+        return key
+
+    def _provision(self, db: Session, user_id: int) -> str:
+        """
+        Give a user without a DEK their first one. The update only applies
+        while the column is still empty, so concurrent requests (or workers)
+        all end up with the one key that won.
+        """
+        db.query(User).filter(User.id == user_id, User.wrapped_data_key.is_(None)).update(
+            {User.wrapped_data_key: self.new_wrapped_key()}, synchronize_session=False
+        )
+        db.commit()
+        self.provisioned += 1
+        return db.query(User.wrapped_data_key).filter(User.id == user_id).scalar()
+
+    def forget(self, user_id: Optional[int] = None):
+        """Drop one user's cached DEK (e.g. account deleted), or all of them."""
+        with self._lock:
+            if user_id is None:
+                self._keys.clear()
+            else:
+                self._keys.pop(user_id, None)
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._keys),
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "provisioned": self.provisioned,
+            "active_keks": self.kek_count,
+        }
+
+
+# Export instance
+data_key_manager = DataKeyManager()
@@ -1,46 +1,260 @@
 """
 Core hashing utilities - Master password hashing with bcrypt
+
+bcrypt is slow on purpose (tens to hundreds of ms of CPU per call). The
+async helpers on `bcrypt_pool` run it on a dedicated, size-limited thread
+pool with a bounded queue. A login storm then cannot take over the shared
+threadpool the vault routes run on, and once the queue is full callers get
+HashingBusy straight away instead of waiting in line.
+
+BCRYPT_ROUNDS sets the cost of new hashes. Pick it for the hardware with:
+  python -m app.core.hashing calibrate --target-ms 250
+Hashes of another cost are flagged by needs_update() and rehashed on the
+user's next successful login, so existing accounts converge on the new cost.
 """
-from passlib.context import CryptContext
+import argparse
+import asyncio
+import os
+import re
+import secrets
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from typing import Dict, Optional
+
+import bcrypt
+
+from app.config import settings
+
+# bcrypt only reads the first 72 bytes; longer inputs are truncated (as passlib did)
+BCRYPT_MAX_BYTES = 72
+# "$2b$12$<salt+hash>": the variant we write and the cost
+BCRYPT_IDENT = "2b"
+BCRYPT_HASH = re.compile(r"^\$(2[abxy])\$(\d\d)\$")
+# Calibration never recommends less than this (OWASP's floor for bcrypt)
+MIN_ROUNDS = 10
+
+
+def _secret(password: str) -> bytes:
+    return password.encode("utf-8")[:BCRYPT_MAX_BYTES]
 
-# Define the hashing context for Bcrypt
-# Schemes tells passlib which algorithms to use. We use bcrypt as it's strong.
-# deprecated='auto' will automatically manage deprecated hash formats.
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
 class Hasher:
     """Handles hashing and verification of plain text passwords."""
 
-    #Used during regisrtration
+    #Used during login
     @staticmethod
     def verify_password(plain_password: str, hashed_password: str) -> bool:
         """
         Verifies a plain text password against a stored hashed password.
-        
+
         Args:
             plain_password: The password provided by the user (e.g., during login).
             hashed_password: The hashed password stored in the database.
-        
+
         Returns:
             True if the password matches the hash, False otherwise.
         """
-        # Bcrypt is designed to handle this comparison securely
-        return pwd_context.verify(plain_password, hashed_password)
-    #use during login
+        # Bcrypt is designed to handle this comparison securely (constant time)
+        try:
+            return bcrypt.checkpw(_secret(plain_password), hashed_password.encode("ascii"))
+        except ValueError:
+            return False  # not a bcrypt hash
+    #use during registration
     @staticmethod
     def get_password_hash(password: str) -> str:
         """
         Generates a secure hash for a plain text password.
-        
+
         Args:
             password: The password to hash (e.g., the Master Password during registration).
-            
+
         Returns:
             The securely generated hash string.
         """
-        return pwd_context.hash(password)
+        return bcrypt.hashpw(_secret(password), bcrypt.gensalt(settings.BCRYPT_ROUNDS)).decode("ascii")
+
+    @staticmethod
+    def needs_update(hashed_password: str) -> bool:
+        """
+        True if the hash was made with another cost (or bcrypt variant) than
+        BCRYPT_ROUNDS now asks for. Rehash it once the plain password is known.
+        """
+        match = BCRYPT_HASH.match(hashed_password or "")
+        if not match:
+            return True
+        return match.group(1) != BCRYPT_IDENT or int(match.group(2)) != settings.BCRYPT_ROUNDS
+
+    @staticmethod
+    def verify_dummy(plain_password: str) -> bool:
+        """Spend the time of a real verification (unknown username); always False."""
+        Hasher.verify_password(plain_password, _dummy_hash(settings.BCRYPT_ROUNDS))
+        return False
+
+
+@lru_cache(maxsize=4)
+def _dummy_hash(rounds: int) -> str:
+    # A hash at the current cost, of a secret nobody knows
+    return bcrypt.hashpw(secrets.token_bytes(16), bcrypt.gensalt(rounds)).decode("ascii")
 
 # Export the instance for easy import in other modules
 hasher = Hasher()
 
 
+class HashingBusy(Exception):
+    """The bcrypt queue is full; shed the request instead of queueing it."""
+
+
+class BcryptPool:
+    """Dedicated thread pool for bcrypt with admission control and latency metrics"""
+
+    def __init__(self, workers: Optional[int] = None, max_queue: Optional[int] = None):
+        # bcrypt releases the GIL, so threads use real cores
+        self.workers = workers or settings.BCRYPT_WORKERS or max(1, ((os.cpu_count() or 1) + 1) // 2)
+        self.max_queue = settings.BCRYPT_MAX_QUEUE if max_queue is None else max_queue
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._lock = threading.Lock()
+        self._in_flight = 0     # admitted and not finished: running + queued
+        self._running = 0
+        self.peak_in_flight = 0
+        self.completed = 0
+        self.rejected = 0
+        self._wait_times = deque(maxlen=1024)
+        self._run_times = deque(maxlen=1024)
+
+    @property
+    def capacity(self) -> int:
+        return self.workers + self.max_queue
+
+    def check_capacity(self):
+        """Raise HashingBusy now if a new call would be refused (lets callers skip work before it)."""
+        if self._in_flight >= self.capacity:
+            with self._lock:
+                self.rejected += 1
+            raise HashingBusy(f"{self._in_flight} bcrypt calls in flight (limit {self.capacity})")
+
+    async def verify(self, plain_password: str, hashed_password: str) -> bool:
+        return await self._submit(hasher.verify_password, plain_password, hashed_password)
+
+    async def verify_dummy(self, plain_password: str) -> bool:
+        return await self._submit(hasher.verify_dummy, plain_password)
+
+    async def hash(self, password: str) -> str:
+        return await self._submit(hasher.get_password_hash, password)
+
+    async def _submit(self, fn, *args):
+        with self._lock:
+            if self._in_flight >= self.capacity:
+                self.rejected += 1
+                raise HashingBusy(f"{self._in_flight} bcrypt calls in flight (limit {self.capacity})")
+            self._in_flight += 1
+            self.peak_in_flight = max(self.peak_in_flight, self._in_flight)
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="bcrypt")
+
+        queued_at = time.perf_counter()
+        future = self._executor.submit(self._timed, queued_at, fn, *args)
+        # Release the slot when the job really ends (or is cancelled before it starts),
+        # not when the awaiting request goes away
+        future.add_done_callback(self._release)
+        return await asyncio.wrap_future(future)
+
+    def _timed(self, queued_at: float, fn, *args):
+        started = time.perf_counter()
+        with self._lock:
+            self._running += 1
+        try:
+            return fn(*args)
+        finally:
+            finished = time.perf_counter()
+            with self._lock:
+                self._running -= 1
+                self.completed += 1
+                self._wait_times.append(started - queued_at)
+                self._run_times.append(finished - started)
+
+    def _release(self, _future):
+        with self._lock:
+            self._in_flight -= 1
+
+    def shutdown(self):
+        """Stop the pool (FastAPI shutdown hook); it restarts on the next call."""
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    def stats(self) -> dict:
+        """Queue depth, admission counters and recent wait/run latencies (ms)."""
+        with self._lock:
+            waits, runs = sorted(self._wait_times), sorted(self._run_times)
+            return {
+                "workers": self.workers,
+                "max_queue": self.max_queue,
+                "running": self._running,
+                "queued": self._in_flight - self._running,
+                "peak_in_flight": self.peak_in_flight,
+                "completed": self.completed,
+                "rejected": self.rejected,
+                "queue_wait_ms": _percentiles(waits),
+                "bcrypt_ms": _percentiles(runs),
+            }
+
+
+def _percentiles(ordered) -> dict:
+    if not ordered:
+        return {"p50": None, "p99": None}
+    at = lambda pct: ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100.0))]  # noqa: E731
+    return {"p50": round(at(50) * 1000, 2), "p99": round(at(99) * 1000, 2)}
+
+
+# Export instance
+bcrypt_pool = BcryptPool()
+
+
+def measure_rounds(rounds: int, samples: int = 3) -> float:
+    """Best-of-`samples` seconds for one bcrypt hash at `rounds` on this machine."""
+    best = float("inf")
+    for _ in range(samples):
+        started = time.perf_counter()
+        bcrypt.hashpw(b"calibration-password", bcrypt.gensalt(rounds))
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+def calibrate(target_ms: float, min_rounds: int = MIN_ROUNDS, max_rounds: int = 20) -> Dict:
+    """
+    Highest cost whose hash fits in `target_ms` here, but at least `min_rounds`.
+    Each step up doubles the time, so costs are timed upwards from 8 and
+    the search stops at the first one over budget.
+    """
+    timings = {}
+    rounds = 8
+    while rounds <= max_rounds:
+        timings[rounds] = measure_rounds(rounds, samples=3 if rounds < 14 else 1) * 1000
+        if timings[rounds] > target_ms:
+            break
+        rounds += 1
+    fitting = [r for r, ms in timings.items() if ms <= target_ms]
+    best = max(fitting) if fitting else 8
+    return {"rounds": max(best, min_rounds), "fits_budget": best >= min_rounds, "timings_ms": timings}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="bcrypt cost tools")
+    commands = parser.add_subparsers(dest="command", required=True)
+    calibrate_cmd = commands.add_parser("calibrate", help="pick BCRYPT_ROUNDS for a latency budget on this machine")
+    calibrate_cmd.add_argument("--target-ms", type=float, default=250.0, help="time one login may spend in bcrypt")
+    calibrate_cmd.add_argument("--min-rounds", type=int, default=MIN_ROUNDS)
+
+    args = parser.parse_args()
+    print(f"⏱️  Timing bcrypt on this machine (budget {args.target_ms:g} ms per hash) ...")
+    result = calibrate(args.target_ms, min_rounds=args.min_rounds)
+    for rounds, ms in result["timings_ms"].items():
+        print(f"   cost {rounds:>2}: {ms:8.1f} ms  (~{1000 / ms:,.1f} logins/s per worker)")
+    if not result["fits_budget"]:
+        print(f"⚠️  Even cost {args.min_rounds} exceeds the budget here; using the floor anyway")
+    print(f"✅ Set BCRYPT_ROUNDS={result['rounds']} (currently {settings.BCRYPT_ROUNDS}); "
+          f"older hashes are upgraded on each user's next login")
@@ -1,8 +1,25 @@
 """
 JWT Token handling utilities
+
+Every authenticated request used to run python-jose over the same bearer
+token: split, base64-decode, parse the header, HMAC, parse the claims.
+decode_access_token now keeps recently verified tokens in a per-worker LRU
+(token_cache), keyed by a SHA-256 digest of the token and dropped exactly at
+the token's `exp`. With HS256 a cache miss is verified by HS256Verifier,
+hmac + json from the standard library, and python-jose handles any other
+JWT_ALGORITHM. Tokens that fail verification are never cached.
 """
+import base64
+import binascii
+import hashlib
+import hmac
+import json
+import secrets
+import threading
+import time
+from collections import OrderedDict
 from datetime import datetime, timedelta
-from typing import Optional
+from typing import Optional, Tuple
 from jose import jwt, JWTError
 from app.config import settings
 
@@ -27,8 +44,9 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
         # Default to the setting in config.py (usually 30 mins)
         expire = datetime.utcnow() + timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
     
-    # 3. Add expiration claim ('exp') to the payload
+    # 3. Add expiration claim ('exp') to the payload, and an id to revoke it by
     to_encode.update({"exp": expire})
+    to_encode.setdefault("jti", secrets.token_hex(16))
     
     # 4. Encode the token using our Secret Key and Algorithm (HS256)
     encoded_jwt = jwt.encode(
@@ -39,17 +57,164 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     
     return encoded_jwt
 
-def decode_access_token(token: str):
+def _b64decode(segment: str) -> bytes:
+    return base64.urlsafe_b64decode(segment + "=" * (-len(segment) % 4))
+
+
+def _numeric(value) -> bool:
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+
+class HS256Verifier:
     """
-    Decodes and validates a JWT token.
-    Returns the payload dictionary or raises JWTError if invalid.
+    Verifies compact HS256 JWTs with hmac and json only.
+
+    It rejects every token python-jose rejects for our settings. It is
+    slightly stricter in a few places: a token is dead from the second of
+    its `exp` (RFC 7519), time claims must be JSON numbers, any `aud` is
+    refused because we never check audiences, and non-ASCII characters are
+    not silently dropped from the token.
     """
+
+    def __init__(self, secret: str):
+        # Keyed once; each verification copies the primed HMAC state
+        self._mac = hmac.new(secret.encode("utf-8"), digestmod=hashlib.sha256)
+
+    def verify(self, token: str) -> Optional[dict]:
+        """Return the claims, or None for any bad, tampered or expired token."""
+        try:
+            signing_input, _, signature = token.encode("ascii").rpartition(b".")
+            header_segment, _, payload_segment = signing_input.partition(b".")
+            if not header_segment or b"." in payload_segment:
+                return None
+            # Authenticate before parsing anything the client sent
+            mac = self._mac.copy()
+            mac.update(signing_input)
+            if not hmac.compare_digest(mac.digest(), _b64decode(signature.decode())):
+                return None
+            header = json.loads(_b64decode(header_segment.decode()))
+            claims = json.loads(_b64decode(payload_segment.decode()))
+        except (UnicodeError, binascii.Error, ValueError):
+            return None
+        if not isinstance(header, dict) or header.get("alg") != "HS256" or not isinstance(claims, dict):
+            return None
+        return claims if self._claims_valid(claims) else None
+
+    @staticmethod
+    def _claims_valid(claims: dict) -> bool:
+        now = time.time()
+        if "exp" in claims and not (_numeric(claims["exp"]) and now < claims["exp"]):
+            return False
+        if "nbf" in claims and not (_numeric(claims["nbf"]) and claims["nbf"] <= now):
+            return False
+        if "iat" in claims and not _numeric(claims["iat"]):
+            return False
+        for claim in ("sub", "jti"):
+            if claim in claims and not isinstance(claims[claim], str):
+                return False
+        return "aud" not in claims
+
+
+class VerifiedTokenCache:
+    """
+    Thread-safe bounded LRU of token digest -> verified claims.
+
+    Entries expire at the token's own `exp`, so a cached token is never
+    accepted a moment longer than re-verifying it would allow. Tokens
+    without `exp` are not cached. Keys are digests, so bearer tokens
+    themselves are not kept in memory. Changing JWT_SECRET_KEY needs a
+    restart (or clear()), as it always did for other workers.
+    """
+
+    def __init__(self, max_entries: Optional[int] = None):
+        self.max_entries = settings.JWT_VERIFIED_CACHE_SIZE if max_entries is None else max_entries
+        self._entries: "OrderedDict[bytes, Tuple[dict, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.expired = 0
+
+    @staticmethod
+    def _key(token: str) -> bytes:
+        return hashlib.sha256(token.encode("utf-8", "surrogatepass")).digest()
+
+    def get(self, token: str) -> Optional[dict]:
+        if self.max_entries <= 0:
+            return None
+        key = self._key(token)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            claims, exp = entry
+            if time.time() >= exp:
+                del self._entries[key]
+                self.expired += 1
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return claims
+
+    def put(self, token: str, claims: dict):
+        exp = claims.get("exp")
+        if self.max_entries <= 0 or not _numeric(exp) or time.time() >= exp:
+            return
+        with self._lock:
+            key = self._key(token)
+            self._entries[key] = (claims, exp)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "expired": self.expired,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
+
+
+# Export instances
+hs256_verifier = HS256Verifier(settings.JWT_SECRET_KEY)
+token_cache = VerifiedTokenCache()
+
+
+def verify_token(token: str) -> Optional[dict]:
+    """Full verification, no cache: the stdlib path for HS256, python-jose otherwise."""
+    if settings.JWT_FAST_HS256 and settings.JWT_ALGORITHM == "HS256":
+        return hs256_verifier.verify(token)
     try:
-        payload = jwt.decode(
-            token, 
-            settings.JWT_SECRET_KEY, 
+        return jwt.decode(
+            token,
+            settings.JWT_SECRET_KEY,
             algorithms=[settings.JWT_ALGORITHM]
         )
-        return payload
     except JWTError:
-        return None
\ No newline at end of file
+        return None
+
+
+def decode_access_token(token: str):
+    """
+    Decodes and validates a JWT token.
+    Returns the payload dictionary, or None if the token is invalid or expired.
+
+    A token verified earlier is answered from token_cache until its `exp`.
+    """
+    payload = token_cache.get(token)
+    if payload is None:
+        payload = verify_token(token)
+        if payload is None:
+            return None
+        token_cache.put(token, payload)
+    # Callers get their own copy; the cached claims stay untouched
+    return dict(payload)
\ No newline at end of file
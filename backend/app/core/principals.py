@@ -0,0 +1,110 @@
+"""
+Authenticated principals and their per-worker cache
+
+get_current_user used to load the ORM User on every authenticated request.
+It now resolves the token subject to a Principal, a small immutable
+snapshot of the fields routes need, and keeps it in a bounded TTL cache.
+An entry lives PRINCIPAL_CACHE_TTL_SECONDS at most, and never past the
+`exp` of the token that loaded it.
+
+The cache is per worker process, and nothing watches the users table. Code
+that deactivates, deletes or changes the credentials of a user must call
+principal_cache.invalidate(user_id) after committing; UserService does.
+Other workers pick the change up when their entry expires, so the TTL
+bounds how stale a principal can be.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from typing import NamedTuple, Optional, Tuple
+
+from app.config import settings
+
+
+class Principal(NamedTuple):
+    """Who is making the request: detached from any DB session, read-only."""
+    id: int
+    username: str
+    email: str
+    is_active: bool
+    is_superuser: bool
+
+    @classmethod
+    def from_user(cls, user) -> "Principal":
+        return cls(user.id, user.username, user.email, bool(user.is_active), bool(user.is_superuser))
+
+
+class PrincipalCache:
+    """Thread-safe bounded LRU of user id -> Principal, with per-entry expiry."""
+
+    def __init__(self, max_entries: Optional[int] = None, ttl_seconds: Optional[float] = None):
+        self.max_entries = settings.PRINCIPAL_CACHE_SIZE if max_entries is None else max_entries
+        self.ttl_seconds = settings.PRINCIPAL_CACHE_TTL_SECONDS if ttl_seconds is None else ttl_seconds
+        self._entries: "OrderedDict[int, Tuple[Principal, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.expired = 0
+        self.invalidations = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_entries > 0 and self.ttl_seconds > 0
+
+    def get(self, user_id: int) -> Optional[Principal]:
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is None:
+                self.misses += 1
+                return None
+            principal, expires_at = entry
+            if time.monotonic() >= expires_at:
+                del self._entries[user_id]
+                self.expired += 1
+                self.misses += 1
+                return None
+            self._entries.move_to_end(user_id)
+            self.hits += 1
+            return principal
+
+    def put(self, principal: Principal, token_exp: Optional[float] = None):
+        """Cache until the TTL runs out or the token expires, whichever is first."""
+        if not self.enabled:
+            return
+        lifetime = self.ttl_seconds
+        if token_exp is not None:
+            lifetime = min(lifetime, token_exp - time.time())
+        if lifetime <= 0:
+            return
+        with self._lock:
+            self._entries[principal.id] = (principal, time.monotonic() + lifetime)
+            self._entries.move_to_end(principal.id)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, user_id: Optional[int] = None):
+        """Forget one user (deactivated, deleted, credentials changed), or everyone."""
+        with self._lock:
+            self.invalidations += 1
+            if user_id is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(user_id, None)
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "ttl_seconds": self.ttl_seconds,
+            "hits": self.hits,
+            "misses": self.misses,
+            "expired": self.expired,
+            "invalidations": self.invalidations,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
+
+
+# Export instance
+principal_cache = PrincipalCache()
@@ -0,0 +1,88 @@
+"""
+Revoked access tokens, checked on every authenticated request
+
+Access tokens are stateless JWTs, so logging out, rotating a stolen refresh
+token or locking an account cannot un-sign them. Instead their `jti` goes
+into this set until the token's own `exp`; after that the signature check
+rejects the token anyway and the entry is purged. The set therefore stays
+small: at most the tokens revoked in the last ACCESS_TOKEN_EXPIRE_MINUTES.
+
+Entries are keyed by a 12-byte digest of the jti. A collision could only
+reject a valid token, never accept a revoked one.
+
+The set is per worker. TokenService records every revocation in the
+refresh_tokens table, and each worker reloads recent revocations every
+REVOCATION_SYNC_SECONDS (see TokenService.start).
+"""
+
+import hashlib
+import threading
+import time
+from typing import Dict, Optional
+
+
+class RevocationSet:
+    """Thread-safe set of revoked jti digests, each dropped at its token's exp."""
+
+    # Expired entries are swept at most this often, on the revoke path only
+    PURGE_INTERVAL_SECONDS = 60.0
+
+    def __init__(self):
+        self._entries: Dict[bytes, float] = {}
+        self._lock = threading.Lock()
+        self._next_purge = time.time() + self.PURGE_INTERVAL_SECONDS
+        self.revoked = 0
+        self.rejected = 0
+
+    @staticmethod
+    def _key(jti: str) -> bytes:
+        return hashlib.blake2b(jti.encode("utf-8"), digest_size=12).digest()
+
+    def revoke(self, jti: str, expires_at: float):
+        """Refuse this jti until `expires_at` (epoch seconds, the token's exp)."""
+        now = time.time()
+        if expires_at <= now:
+            return
+        key = self._key(jti)
+        with self._lock:
+            if key not in self._entries:
+                self.revoked += 1
+            self._entries[key] = max(expires_at, self._entries.get(key, 0.0))
+            if now >= self._next_purge:
+                self._purge(now)
+
+    def is_revoked(self, jti: Optional[str]) -> bool:
+        # Lock-free read: one dict lookup on the hot path
+        if not jti or not self._entries:
+            return False
+        if self._key(jti) in self._entries:
+            self.rejected += 1
+            return True
+        return False
+
+    def purge(self):
+        with self._lock:
+            self._purge(time.time())
+
+    def _purge(self, now: float):
+        for key in [k for k, exp in self._entries.items() if exp <= now]:
+            del self._entries[key]
+        self._next_purge = now + self.PURGE_INTERVAL_SECONDS
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def stats(self) -> dict:
+        return {
+            "entries": len(self._entries),
+            "revoked": self.revoked,
+            "rejected_requests": self.rejected,
+        }
+
+
+# Export instance
+revoked_tokens = RevocationSet()
@@ -1,25 +1,173 @@
 """
 Core security utilities - encryption and decryption
+
+Vault entries are encrypted with the owner's data key (envelope encryption,
+see app.core.envelope). Entries written before that still use the single
+global ENCRYPTION_KEY. PasswordEntry.encryption_version records which key
+applies, and scripts/migrate_envelope.py moves old entries over.
 """
 
-from cryptography.fernet import Fernet
+import threading
+from collections import defaultdict
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Callable, List, NamedTuple, Optional, Sequence, Union
+
+from cryptography.fernet import Fernet, InvalidToken
+from sqlalchemy.orm import Session
+
 from app.config import settings
+from app.core.envelope import data_key_manager
+
+# Values of PasswordEntry.encryption_version
+LEGACY_ENCRYPTION_VERSION = 1    # sealed with the global ENCRYPTION_KEY
+ENVELOPE_ENCRYPTION_VERSION = 2  # sealed with the owner's data key
+
+
+class CryptoResult(NamedTuple):
+    """One item of a bulk encrypt/decrypt: `value` on success, otherwise `error`."""
+    value: Optional[str]
+    error: Optional[str] = None
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+
+def _error(e: Exception) -> str:
+    if isinstance(e, InvalidToken):
+        return "invalid token"  # wrong key, tampered or not a Fernet token
+    return f"{type(e).__name__}: {e}"
+
+
+# Chunks get a Fernet on the thread path and the raw key on the process path
+# (Fernet objects do not pickle; building one from a key costs ~1 µs).
+# Fernet tokens are URL-safe base64, so ASCII is the cheapest codec for them.
+# Items may be passed as bytes to skip the encode step entirely.
+def _encrypt_chunk(values: Sequence[Union[str, bytes]], cipher: Union[Fernet, bytes]) -> List[CryptoResult]:
+    encrypt = (Fernet(cipher) if isinstance(cipher, bytes) else cipher).encrypt
+    results = []
+    for value in values:
+        try:
+            data = value if isinstance(value, bytes) else value.encode("utf-8")
+            results.append(CryptoResult(encrypt(data).decode("ascii")))
+        except Exception as e:
+            results.append(CryptoResult(None, _error(e)))
+    return results
+
+
+def _decrypt_chunk(tokens: Sequence[Union[str, bytes]], cipher: Union[Fernet, bytes]) -> List[CryptoResult]:
+    decrypt = (Fernet(cipher) if isinstance(cipher, bytes) else cipher).decrypt
+    results = []
+    for token in tokens:
+        try:
+            data = token if isinstance(token, bytes) else token.encode("ascii")
+            results.append(CryptoResult(decrypt(data).decode("utf-8")))
+        except Exception as e:
+            results.append(CryptoResult(None, _error(e)))
+    return results
 
 
 class EncryptionManager:
     """Handles AES-256 encryption/decryption using Fernet"""
-    
-    def __init__(self):
+
+    def __init__(self, batch_workers: Optional[int] = None, batch_executor: Optional[str] = None,
+                 batch_parallel_min: Optional[int] = None):
         # NOTE: This key is loaded from the .env file via app.config.settings
         self.key = settings.ENCRYPTION_KEY.encode()
         self.cipher = Fernet(self.key)
-    
-    def encrypt(self, plaintext: str) -> str:
-        return self.cipher.encrypt(plaintext.encode()).decode()
-    
-    def decrypt(self, ciphertext: str) -> str:
-        return self.cipher.decrypt(ciphertext.encode()).decode()
-    
+        # Bulk settings default to app.config; the overrides are for scripts and benchmarks
+        self.batch_workers = settings.ENCRYPTION_BATCH_WORKERS if batch_workers is None else batch_workers
+        self.batch_executor = batch_executor or settings.ENCRYPTION_BATCH_EXECUTOR
+        self.batch_parallel_min = (settings.ENCRYPTION_BATCH_PARALLEL_MIN if batch_parallel_min is None
+                                   else batch_parallel_min)
+        self._pool: Optional[Executor] = None
+        self._pool_lock = threading.Lock()
+
+    def _cipher(self, key: Optional[bytes]) -> Fernet:
+        return self.cipher if key is None else Fernet(key)
+
+    def encrypt(self, plaintext: str, key: Optional[bytes] = None) -> str:
+        """Encrypt with `key` (a data key), or the global key when omitted."""
+        return self._cipher(key).encrypt(plaintext.encode()).decode()
+
+    def decrypt(self, ciphertext: str, key: Optional[bytes] = None) -> str:
+        return self._cipher(key).decrypt(ciphertext.encode()).decode()
+
+    def encrypt_many(self, plaintexts: Sequence[Union[str, bytes]], key: Optional[bytes] = None) -> List[CryptoResult]:
+        """
+        Encrypt a batch. Returns one CryptoResult per item, in order; a bad
+        item gets an error instead of failing the batch.
+        """
+        return self._run_batch(_encrypt_chunk, plaintexts, key)
+
+    def decrypt_many(self, ciphertexts: Sequence[Union[str, bytes]], key: Optional[bytes] = None) -> List[CryptoResult]:
+        """Decrypt a batch. Same contract as encrypt_many (wrong key or tampered token -> error)."""
+        return self._run_batch(_decrypt_chunk, ciphertexts, key)
+
+    # --- Vault entries (envelope encryption) ---
+    def encrypt_for_user(self, db: Session, user_id: int, plaintext: str) -> str:
+        """Seal a new secret with the user's data key (store with ENVELOPE_ENCRYPTION_VERSION)."""
+        return self.encrypt(plaintext, data_key_manager.key_for(db, user_id))
+
+    def decrypt_entry(self, db: Session, entry) -> str:
+        """Open a PasswordEntry, whichever key it was sealed with."""
+        if entry.encryption_version == ENVELOPE_ENCRYPTION_VERSION:
+            return self.decrypt(entry.encrypted_password, data_key_manager.key_for(db, entry.user_id))
+        return self.decrypt(entry.encrypted_password)
+
+    def decrypt_entries(self, db: Session, entries: Sequence) -> List[CryptoResult]:
+        """decrypt_many for PasswordEntry rows: one bulk call per (key version, user)."""
+        groups = defaultdict(list)
+        for i, entry in enumerate(entries):
+            groups[(entry.encryption_version, entry.user_id)].append(i)
+
+        results: List[Optional[CryptoResult]] = [None] * len(entries)
+        for (version, user_id), indexes in groups.items():
+            key = None
+            if version == ENVELOPE_ENCRYPTION_VERSION:
+                try:
+                    key = data_key_manager.key_for(db, user_id)
+                except Exception as e:
+                    for i in indexes:
+                        results[i] = CryptoResult(None, _error(e))
+                    continue
+            opened = self.decrypt_many([entries[i].encrypted_password for i in indexes], key)
+            for i, result in zip(indexes, opened):
+                results[i] = result
+        return results
+
+    def _run_batch(self, chunk_fn: Callable, items: Sequence, key: Optional[bytes] = None) -> List[CryptoResult]:
+        """Small batches run on the calling thread; large ones are split across the pool."""
+        workers = self.batch_workers
+        if workers <= 1 or len(items) < self.batch_parallel_min:
+            return chunk_fn(items, self._cipher(key))
+
+        # A few chunks per worker evens out the load without much pickling overhead
+        size = -(-len(items) // (workers * 4))
+        chunks = [items[i:i + size] for i in range(0, len(items), size)]
+        pool = self._get_pool()
+        if isinstance(pool, ThreadPoolExecutor):
+            parts = pool.map(chunk_fn, chunks, [self._cipher(key)] * len(chunks))
+        else:
+            parts = pool.map(chunk_fn, chunks, [key or self.key] * len(chunks))
+        return [result for part in parts for result in part]
+
+    def _get_pool(self) -> Executor:
+        with self._pool_lock:
+            if self._pool is None:
+                if self.batch_executor == "thread":
+                    self._pool = ThreadPoolExecutor(max_workers=self.batch_workers, thread_name_prefix="crypto")
+                else:
+                    self._pool = ProcessPoolExecutor(max_workers=self.batch_workers)
+            return self._pool
+
+    def shutdown(self):
+        """Stop the bulk pool, if one was started (FastAPI shutdown hook)."""
+        with self._pool_lock:
+            if self._pool is not None:
+                self._pool.shutdown(wait=True, cancel_futures=True)
+                self._pool = None
+
     # ... (generate_key static method)\\
 
-encryption_manager = EncryptionManager()
\ No newline at end of file
+encryption_manager = EncryptionManager()
@@ -2,10 +2,33 @@
 Database initialization module.
 """
 
+from sqlalchemy import inspect, text
+
 from app.database.session import Base, engine
 #from app.models import User # all models are imported
 
+# Columns added after the tables first shipped. create_all() never alters an
+# existing table, so these are added in place. Existing entries default to
+# encryption_version 1 (global key) until scripts/migrate_envelope.py moves them.
+ADDED_COLUMNS = [
+    ("users", "wrapped_data_key", "VARCHAR"),
+    ("password_entries", "encryption_version", "INTEGER NOT NULL DEFAULT 1"),
+]
+
+def upgrade_schema():
+    """Add any ADDED_COLUMNS missing from tables created by an older version."""
+    inspector = inspect(engine)
+    tables = set(inspector.get_table_names())
+    with engine.begin() as conn:
+        for table, column, ddl in ADDED_COLUMNS:
+            if table not in tables:
+                continue
+            if column not in {c["name"] for c in inspector.get_columns(table)}:
+                conn.execute(text(f"ALTER TABLE {table} ADD COLUMN {column} {ddl}"))
+                print(f"✅ Added column {table}.{column}")
+
 def init_database():
     """Create all database tables defined in the app."""
+    upgrade_schema()
     Base.metadata.create_all(bind=engine)
-    print("✅ Initialized with all tables.")
\ No newline at end of file
+    print("✅ Initialized with all tables.")
@@ -1,10 +1,18 @@
 """
 Main FastAPI application entry point
 """
-from fastapi import FastAPI
+from fastapi import FastAPI, Response, status
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
 from app.config import settings
+from app.core.hashing import bcrypt_pool
+from app.core.security import encryption_manager
 from app.database.init_db import init_database
+from app.services.breach_checker import breach_checker
+from app.services.token_service import token_service
+from app.ml.batcher import micro_batcher
+from app.ml.password_strength import password_strength_model
+from app.ml.patterns import PatternEngineError, pattern_strength_engine
 # Import API routers
 from app.api import auth, passwords, security, generator, ml
 
@@ -32,8 +40,31 @@ app.add_middleware(
 async def startup_event():
     """Initialize database and ML models on startup"""
     init_database()
+    # Revoked access tokens must be known before the first request
+    await token_service.start()
+    await breach_checker.startup()
+    if settings.ML_MICROBATCH_ENABLED:
+        await micro_batcher.start()
+    # Loads in the background: the API answers while the model warms up
+    await password_strength_model.start()
+    # Map (or first compile) the pattern engine's file off the event loop,
+    # so /predict?engine=patterns never builds it inside a request
+    try:
+        await run_in_threadpool(pattern_strength_engine.load)
+    except PatternEngineError as e:
+        print(f"⚠️ Pattern engine not loaded: {e}")
     print(f"✅ {settings.APP_NAME} v{settings.APP_VERSION} started successfully")
 
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Release pooled connections and background workers on shutdown"""
+    await breach_checker.shutdown()
+    await token_service.stop()
+    await micro_batcher.stop()
+    await password_strength_model.stop()
+    encryption_manager.shutdown()
+    bcrypt_pool.shutdown()
+
 # --- 2. Register the router ---
 # prefix="/api/auth" means all routes in auth.py will start with /api/auth
 # tags=["Authentication"] groups them nicely in the auto-generated docs
@@ -64,4 +95,14 @@ async def root():
 @app.get("/health")
 async def health_check():
     """Health check endpoint"""
-    return {"status": "healthy"}
\ No newline at end of file
+    return {"status": "healthy"}
+
+@app.get("/ready")
+async def readiness_check(response: Response):
+    """Readiness: 503 until background start-up work (the ML model) is done.
+    /health only says the process is alive."""
+    model_status = password_strength_model.status
+    ready = model_status not in ("cold", "warming")
+    if not ready:
+        response.status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+    return {"status": "ready" if ready else "starting", "checks": {"ml_model": model_status}}
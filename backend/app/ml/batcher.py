@@ -0,0 +1,146 @@
+"""
+Micro-batching for ML predictions
+
+Concurrent /api/ml/predict requests are queued for a short window (or until
+the batch is full) and then run through the model as one matrix, so the
+RandomForest's fixed per-call cost is paid once per batch instead of once per
+request. While one batch runs in a worker thread, the next one fills up.
+"""
+
+import asyncio
+import logging
+import time
+from collections import deque
+from typing import Callable, List, Optional, Sequence
+
+from app.config import settings
+from app.ml.password_strength import password_strength_model
+
+logger = logging.getLogger(__name__)
+
+# Upper bounds of the batch-size histogram buckets
+BATCH_SIZE_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128, 256)
+
+
+class MicroBatcher:
+    """Fuses concurrent predict calls into predict_many calls. Lives on the event loop."""
+
+    def __init__(self, predict_many: Callable[[Sequence[str]], List[dict]], window_ms: float, max_batch_size: int):
+        self._predict_many = predict_many
+        self.window = window_ms / 1000.0
+        self.max_batch_size = max_batch_size
+        self._queue: Optional[asyncio.Queue] = None
+        self._worker: Optional[asyncio.Task] = None
+
+        # Metrics
+        self.batches = 0
+        self.items = 0
+        self.batch_size_histogram = {bound: 0 for bound in BATCH_SIZE_BUCKETS}
+        self.batch_size_histogram["inf"] = 0
+        self._queue_delays = deque(maxlen=1000)
+
+    @property
+    def running(self) -> bool:
+        return self._worker is not None and not self._worker.done()
+
+    async def start(self):
+        """Start the batching worker (called from the FastAPI startup hook)."""
+        if self.running:
+            return
+        self._queue = asyncio.Queue()
+        self._worker = asyncio.ensure_future(self._run())
+
+    async def stop(self):
+        """Stop the worker and fail anything still queued."""
+        if self._worker is not None:
+            self._worker.cancel()
+            try:
+                await self._worker
+            except asyncio.CancelledError:
+                pass
+            self._worker = None
+        while self._queue is not None and not self._queue.empty():
+            _, future, _ = self._queue.get_nowait()
+            if not future.done():
+                future.set_exception(RuntimeError("Prediction batcher stopped"))
+
+    async def submit(self, password: str) -> dict:
+        """Queue one password and wait for its result."""
+        future = asyncio.get_running_loop().create_future()
+        self._queue.put_nowait((password, future, time.monotonic()))
+        return await future
+
+    async def _collect(self) -> list:
+        """Wait for the first request, then gather more until the window closes or the batch is full."""
+        batch = [await self._queue.get()]
+        deadline = time.monotonic() + self.window
+        while len(batch) < self.max_batch_size:
+            try:
+                batch.append(self._queue.get_nowait())
+                continue
+            except asyncio.QueueEmpty:
+                pass
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), remaining))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    async def _run(self):
+        while True:
+            batch = await self._collect()
+            started = time.monotonic()
+            for _, _, enqueued_at in batch:
+                self._queue_delays.append(started - enqueued_at)
+            self._record_batch(len(batch))
+
+            try:
+                results = await asyncio.to_thread(self._predict_many, [password for password, _, _ in batch])
+            except Exception as e:
+                logger.error(f"Batched prediction failed: {e}")
+                for _, future, _ in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+
+            for (_, future, _), result in zip(batch, results):
+                if not future.done():  # the caller may have gone away
+                    future.set_result(result)
+
+    def _record_batch(self, size: int):
+        self.batches += 1
+        self.items += size
+        for bound in BATCH_SIZE_BUCKETS:
+            if size <= bound:
+                self.batch_size_histogram[bound] += 1
+                return
+        self.batch_size_histogram["inf"] += 1
+
+    def stats(self) -> dict:
+        delays = sorted(self._queue_delays)
+
+        def pct(p):
+            return delays[min(len(delays) - 1, int(len(delays) * p / 100.0))] * 1000 if delays else 0.0
+
+        return {
+            "running": self.running,
+            "window_ms": self.window * 1000,
+            "max_batch_size": self.max_batch_size,
+            "batches": self.batches,
+            "items": self.items,
+            "mean_batch_size": self.items / self.batches if self.batches else 0.0,
+            "batch_size_histogram": {f"<={k}" if k != "inf" else f">{BATCH_SIZE_BUCKETS[-1]}": v
+                                     for k, v in self.batch_size_histogram.items()},
+            "queue_delay_ms": {"p50": pct(50), "p99": pct(99), "max": delays[-1] * 1000 if delays else 0.0},
+        }
+
+
+# Export instance
+micro_batcher = MicroBatcher(
+    password_strength_model.predict_many,
+    window_ms=settings.ML_MICROBATCH_WINDOW_MS,
+    max_batch_size=settings.ML_MICROBATCH_MAX_SIZE,
+)
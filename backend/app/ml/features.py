@@ -0,0 +1,109 @@
+"""
+Password Features
+
+The one definition of the model inputs, shared by train.py and the API.
+
+  extract_features(password)        one password, one pass over the string
+  extract_features_batch(passwords) many passwords at once with NumPy
+
+The batch version encodes the whole batch into one code-point array. It
+classifies every character with a lookup table: ASCII through a fixed
+table, anything else through char_class() once per distinct character.
+It then counts the features with bincount reductions keyed by row.
+
+Changing what the features mean requires a new FEATURE_SCHEMA_VERSION.
+train.py embeds the version in every artifact. The API refuses to load
+a model whose version differs, so training and serving cannot drift apart.
+
+NumPy is imported on first batch use only, to keep API startup light.
+"""
+
+import hashlib
+import json
+import string
+from functools import lru_cache
+from typing import Sequence
+
+# The model inputs, in column order
+FEATURE_NAMES = ("length", "digits", "uppercase", "lowercase", "special", "unique")
+N_FEATURES = len(FEATURE_NAMES)
+FEATURE_SCHEMA_VERSION = 1
+# Artifacts written before the version was embedded were trained on version 1
+LEGACY_SCHEMA_VERSION = 1
+
+# Character classes, numbered by the feature column they count towards
+OTHER, DIGIT, UPPER, LOWER, SPECIAL = range(5)
+PUNCTUATION = frozenset(string.punctuation)
+# Below this many passwords the per-string loop beats NumPy's fixed costs
+SMALL_BATCH = 32
+
+
+def feature_schema_checksum(names=FEATURE_NAMES) -> str:
+    return hashlib.sha256(json.dumps(list(names)).encode("utf-8")).hexdigest()
+
+
+def char_class(c: str) -> int:
+    """Which count a character adds to (at most one of them)."""
+    if c.isdigit():
+        return DIGIT
+    if c.isupper():
+        return UPPER
+    if c.islower():
+        return LOWER
+    if c in PUNCTUATION:
+        return SPECIAL
+    return OTHER
+
+
+def extract_features(password: str) -> tuple:
+    """Length, Digits, Uppercase, Lowercase, Special chars, Unique chars, in a single pass."""
+    counts = [0] * 5
+    for c in password:
+        counts[char_class(c)] += 1
+    return (len(password), counts[DIGIT], counts[UPPER], counts[LOWER], counts[SPECIAL], len(set(password)))
+
+
+@lru_cache(maxsize=1)
+def _ascii_classes():
+    import numpy as np
+
+    return np.array([char_class(chr(code)) for code in range(128)], dtype=np.int64)
+
+
+def extract_features_batch(passwords: Sequence[str]):
+    """Feature matrix for a whole batch: int64, shape (len(passwords), N_FEATURES)."""
+    import numpy as np
+
+    n = len(passwords)
+    if n < SMALL_BATCH:
+        rows = [extract_features(p) for p in passwords]
+        return np.array(rows, dtype=np.int64).reshape(n, N_FEATURES)
+    features = np.zeros((n, N_FEATURES), dtype=np.int64)
+    lengths = np.fromiter(map(len, passwords), dtype=np.int64, count=n)
+    features[:, 0] = lengths
+    if not lengths.any():
+        return features
+
+    # Every character of the batch as one code point, tagged with its row
+    codes = np.frombuffer("".join(passwords).encode("utf-32-le", "surrogatepass"), dtype="<u4").astype(np.int64)
+    rows = np.repeat(np.arange(n, dtype=np.int64), lengths)
+
+    classes = np.empty(len(codes), dtype=np.int64)
+    ascii_mask = codes < 128
+    classes[ascii_mask] = _ascii_classes()[codes[ascii_mask]]
+    if not ascii_mask.all():
+        other = codes[~ascii_mask]
+        distinct, inverse = np.unique(other, return_inverse=True)
+        lookup = np.array([char_class(chr(code)) for code in distinct], dtype=np.int64)
+        classes[~ascii_mask] = lookup[inverse]
+
+    counts = np.bincount(rows * 5 + classes, minlength=n * 5).reshape(n, 5)
+    features[:, 1:5] = counts[:, DIGIT:SPECIAL + 1]
+
+    # Unique chars: sort (row, code) pairs and count where a new pair starts
+    keys = np.sort((rows << 32) | codes)
+    starts = np.empty(len(keys), dtype=bool)
+    starts[0] = True
+    np.not_equal(keys[1:], keys[:-1], out=starts[1:])
+    features[:, 5] = np.bincount(keys[starts] >> 32, minlength=n)
+    return features
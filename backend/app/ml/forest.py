@@ -0,0 +1,198 @@
+"""
+Compiled Random Forest
+
+A fitted RandomForestClassifier flattened into a handful of contiguous NumPy
+arrays, evaluated without scikit-learn. `train.py` writes the arrays next to
+the joblib model; `PasswordStrengthModel` prefers them when present.
+
+Arrays (every tree's nodes concatenated, child indices are absolute):
+  feature    int64   split feature (0 on leaves)
+  threshold  float64 split threshold (+inf on leaves)
+  children   int64   [left, right] pairs (a leaf points at itself on both sides)
+  values     float64 (n_classes, n_nodes) class probabilities, normalised like predict_proba
+  roots      int64   root node of each tree, in estimator order
+  classes    int64   class labels
+
+Because leaves loop back to themselves with an always-true split, every row
+can simply take `max_depth` steps with no per-row bookkeeping.
+
+File layout (little-endian): a 64-byte header (magic, version, counts,
+max_depth, feature schema version) followed by the arrays above, each starting on a 64-byte boundary.
+The arrays are stored exactly as predict_proba uses them, so `load()` maps
+the file read-only and works on it in place: every uvicorn worker shares the
+same page-cache copy instead of holding a private one.
+"""
+
+import mmap
+import os
+import struct
+from pathlib import Path
+
+import numpy as np
+
+MAGIC = b"PWFOREST"
+FORMAT_VERSION = 3
+READABLE_VERSIONS = (2, 3)  # version 2 had no feature schema field
+# magic, version, nodes, trees, classes, features, max_depth, feature schema (0 = not recorded)
+HEADER = struct.Struct("<8sIQIIIII24x")
+ALIGNMENT = 64
+CHUNK_ROWS = 1024  # rows evaluated together; keeps the (trees x rows) work arrays in cache
+
+
+def _layout(n_nodes: int, n_trees: int, n_classes: int):
+    """(name, dtype, shape, offset) of every array, in file order."""
+    arrays = (
+        ("feature", "<i8", (n_nodes,)),
+        ("threshold", "<f8", (n_nodes,)),
+        ("children", "<i8", (2 * n_nodes,)),
+        ("values", "<f8", (n_classes, n_nodes)),
+        ("roots", "<i8", (n_trees,)),
+        ("classes", "<i8", (n_classes,)),
+    )
+    offset = HEADER.size
+    for name, dtype, shape in arrays:
+        offset = -(-offset // ALIGNMENT) * ALIGNMENT
+        yield name, dtype, shape, offset
+        offset += int(np.prod(shape)) * np.dtype(dtype).itemsize
+
+
+class CompiledForest:
+    """Array form of a RandomForestClassifier. `predict_proba` matches sklearn bit for bit."""
+
+    def __init__(self, feature, threshold, children, values, roots, classes, max_depth: int, n_features: int,
+                 feature_schema_version=None):
+        self.feature = feature
+        self.threshold = threshold
+        self.children = children
+        self.values = values
+        self.roots = roots
+        self.classes_ = classes
+        self.max_depth = int(max_depth)
+        self.n_features = int(n_features)
+        self.feature_schema_version_ = feature_schema_version or None
+        self._mmap = None
+
+    @property
+    def n_estimators(self) -> int:
+        return len(self.roots)
+
+    @property
+    def node_count(self) -> int:
+        return len(self.feature)
+
+    @property
+    def nbytes(self) -> int:
+        return sum(a.nbytes for a in (self.feature, self.threshold, self.children, self.values, self.roots))
+
+    @classmethod
+    def from_sklearn(cls, clf) -> "CompiledForest":
+        """Flatten a fitted RandomForestClassifier (called at training time only)."""
+        features, thresholds, children, values, roots = [], [], [], [], []
+        offset = 0
+        for estimator in clf.estimators_:
+            tree = estimator.tree_
+            n = tree.node_count
+            is_leaf = tree.children_left == -1
+            own = np.arange(offset, offset + n, dtype=np.int64)
+
+            features.append(np.where(is_leaf, 0, tree.feature))
+            thresholds.append(np.where(is_leaf, np.inf, tree.threshold))
+            children.append(np.stack([np.where(is_leaf, own, tree.children_left + offset),
+                                      np.where(is_leaf, own, tree.children_right + offset)], axis=1))
+
+            # Same normalisation as DecisionTreeClassifier.predict_proba
+            proba = tree.value[:, 0, :clf.n_classes_].copy()
+            normalizer = proba.sum(axis=1)[:, np.newaxis]
+            normalizer[normalizer == 0.0] = 1.0
+            proba /= normalizer
+            values.append(proba)
+
+            roots.append(offset)
+            offset += n
+
+        return cls(
+            feature=np.concatenate(features).astype(np.int64),
+            threshold=np.concatenate(thresholds).astype(np.float64),
+            children=np.concatenate(children).astype(np.int64).ravel(),
+            values=np.ascontiguousarray(np.concatenate(values).T, dtype=np.float64),
+            roots=np.array(roots, dtype=np.int64),
+            classes=np.asarray(clf.classes_, dtype=np.int64),
+            max_depth=max(e.tree_.max_depth for e in clf.estimators_),
+            n_features=clf.n_features_in_,
+            feature_schema_version=getattr(clf, "feature_schema_version_", None),
+        )
+
+    def save(self, path: Path):
+        """Write the flat file. Goes through a temp file + rename, so workers
+        that still map the old file keep a consistent view of it."""
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        n_classes = len(self.classes_)
+        arrays = {"feature": self.feature, "threshold": self.threshold, "children": self.children,
+                  "values": self.values, "roots": self.roots, "classes": self.classes_}
+        partial = path.with_name(path.name + ".partial")
+        with open(partial, "wb") as out:
+            out.write(HEADER.pack(MAGIC, FORMAT_VERSION, self.node_count, self.n_estimators,
+                                  n_classes, self.n_features, self.max_depth, self.feature_schema_version_ or 0))
+            for name, dtype, shape, offset in _layout(self.node_count, self.n_estimators, n_classes):
+                out.write(b"\0" * (offset - out.tell()))
+                out.write(np.ascontiguousarray(arrays[name], dtype=dtype).tobytes())
+        os.replace(partial, path)
+
+    @classmethod
+    def load(cls, path: Path) -> "CompiledForest":
+        """Map a flat file read-only. The arrays are views into the shared mapping."""
+        with open(path, "rb") as f:
+            mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            magic, version, n_nodes, n_trees, n_classes, n_features, max_depth, schema = HEADER.unpack_from(mm, 0)
+        except struct.error as e:
+            mm.close()
+            raise ValueError(f"{path} is not a compiled forest: {e}") from e
+        if magic != MAGIC or version not in READABLE_VERSIONS:
+            mm.close()
+            raise ValueError(f"{path} is not a version {FORMAT_VERSION} compiled forest")
+
+        arrays = {}
+        for name, dtype, shape, offset in _layout(n_nodes, n_trees, n_classes):
+            count = int(np.prod(shape))
+            if offset + count * np.dtype(dtype).itemsize > len(mm):
+                mm.close()
+                raise ValueError(f"{path} is truncated")
+            arrays[name] = np.frombuffer(mm, dtype=dtype, count=count, offset=offset).reshape(shape)
+
+        forest = cls(max_depth=max_depth, n_features=n_features,
+                     feature_schema_version=schema if version >= 3 else None, **arrays)
+        forest._mmap = mm  # keeps the mapping alive as long as the arrays
+        return forest
+
+    def apply(self, X: np.ndarray) -> np.ndarray:
+        """Leaf index reached by every (tree, row): shape (n_estimators, n_rows)."""
+        n_rows = X.shape[0]
+        # sklearn validates X to float32 and compares it against float64 thresholds;
+        # widening the float32 values up front gives the same comparisons.
+        # Feature-major layout so one flat take() fetches every (tree, row) split value.
+        columns = np.asarray(X, dtype=np.float32).T.astype(np.float64).ravel()
+        rows = np.arange(n_rows)
+        nodes = np.repeat(self.roots[:, np.newaxis], n_rows, axis=1)
+        for _ in range(self.max_depth):
+            split = self.feature.take(nodes)
+            split *= n_rows
+            split += rows
+            go_right = columns.take(split) > self.threshold.take(nodes)
+            nodes <<= 1
+            nodes += go_right
+            nodes = self.children.take(nodes)
+        return nodes
+
+    def predict_proba(self, X: np.ndarray) -> np.ndarray:
+        """Class probabilities, shape (n_rows, n_classes), identical to the sklearn forest."""
+        proba = np.empty((X.shape[0], len(self.values)), dtype=np.float64)
+        for start in range(0, X.shape[0], CHUNK_ROWS):
+            leaves = self.apply(X[start:start + CHUNK_ROWS])
+            # Summing over the tree axis adds the trees one after another in
+            # estimator order, then divides: the same float operations sklearn
+            # performs, so the results are identical
+            for c, values in enumerate(self.values):
+                proba[start:start + CHUNK_ROWS, c] = values.take(leaves).sum(axis=0) / self.n_estimators
+        return proba
@@ -2,55 +2,245 @@
 ML Prediction Service for Password Strength Evaluation
 
 Loads the trained model and service predictions
+
+Importing this module is cheap: numpy, the compiled forest and joblib/sklearn
+are only imported when the model is loaded, which the API does in a
+background task after startup (see `start()`), so /health answers at once.
 """
 
-import joblib
-import pandas as pd
-import numpy as np 
-import string
+import asyncio
+import threading
+import time
 from pathlib import Path
+from typing import List, Optional, Sequence
 
+from app.config import settings
+from app.ml.features import FEATURE_SCHEMA_VERSION, LEGACY_SCHEMA_VERSION, extract_features, extract_features_batch
+from app.ml.registry import ModelRegistryError, model_registry
 
-# Define path to the saved model 
+# Define path to the saved model (used as-is when there is no registry manifest)
 BASE_DIR = Path(__file__).resolve().parent
 MODEL_PATH = BASE_DIR / "models" / "password_strength_v1.joblib"
+COMPILED_MODEL_PATH = BASE_DIR / "models" / "password_strength_v1.forest"
+
+# Every candidate model must score these sanely before it is swapped in
+CANARY_PASSWORDS = ("password", "123456", "Tr0ub4dor&3", "correct horse battery staple",
+                    "x", "Zq9!vL2#rT8@wP5$", "pässwörd 漢字")
+
+
+class _LoadedModel:
+    """One model version plus its own caches. Never changed once it serves traffic."""
+
+    def __init__(self, model, engine: str, version: Optional[str], source: Path):
+        self.model = model
+        self.engine = engine    # "compiled" (NumPy arrays) or "sklearn"
+        self.version = version  # None for an unregistered model file
+        self.source = source
+        self.loaded_at = time.time()
+        from app.ml.prediction_cache import PredictionLRU
+        # Predictions depend only on the feature tuple, never on the password itself
+        self.cache = PredictionLRU(settings.ML_PREDICTION_CACHE_SIZE) if settings.ML_PREDICTION_CACHE_SIZE > 0 else None
+        self.table = None
+        if settings.ML_PREDICTION_TABLE_ENABLED:
+            self._build_table()
+
+    def _build_table(self):
+        """Precompute every reachable prediction, if the table is small enough."""
+        from app.ml.forest import CompiledForest
+        from app.ml.prediction_cache import ThresholdTable
+
+        forest = self.model if self.engine == "compiled" else CompiledForest.from_sklearn(self.model)
+        cells = ThresholdTable.cell_count(forest)
+        if cells > settings.ML_PREDICTION_TABLE_MAX_CELLS:
+            print(f"⚠️ Prediction table would need {cells:,} cells, using the LRU cache only")
+            return
+        self.table = ThresholdTable.build(forest, class_index=1)
+        print(f"✅ Precomputed {cells:,} strength predictions")
+
 
 class PasswordStrengthModel:
     """Wrapper for the trained Random Forest Model"""
+
+    # Load states: "cold" (nothing tried yet), "warming" (loading in the
+    # background), "ready", or "unavailable" (no model, or it failed to load)
     def __init__(self):
-        self.model = None
-        self._load_model()
+        # predict() reads this reference once per call, and reload() replaces
+        # it in one assignment, so in-flight requests finish on the model they
+        # started with and nothing waits on a reload
+        self._active: Optional[_LoadedModel] = None
+        self.status = "cold"
+        self.reloads = 0
+        self.last_reload_error = None
+        self._seen_stamp = None
+        self._reload_lock = threading.Lock()
+        self._background: Optional[asyncio.Task] = None
 
-    def _load_model(self):
-        """Loads the .joblib file. Handles errors if the model hasnt been trained 
-        yet.
+    @property
+    def model(self):
+        return self._active.model if self._active else None
+
+    @property
+    def engine(self) -> Optional[str]:
+        return self._active.engine if self._active else None
+
+    @property
+    def warming(self) -> bool:
+        return self.status == "warming"
+
+    def load(self):
+        """Loads and warms up the active registry version (or the legacy model files).
+        Blocking and idempotent. Handles errors if the model hasnt been trained yet.
         """
+        with self._reload_lock:
+            if self.status in ("ready", "unavailable"):
+                return
+            self.status = "warming"
+            self._seen_stamp = self._watch_stamp()
+            try:
+                loaded = self._load()
+                if loaded is None:
+                    print(f"⚠️ Warning: ML Model not found at {MODEL_PATH}")
+                    print("   Run 'python -m backend.app.ml.train' to generate it.")
+                    self.status = "unavailable"
+                    return
+                self._warm_up(loaded)
+                self._active = loaded
+                self.status = "ready"
+            except Exception as e:
+                print(f"❌ Error loading ML model: {e}")
+                self.last_reload_error = str(e)
+                self.status = "unavailable"
 
-        try:
-            if MODEL_PATH.exists():
-                self.model = joblib.load(MODEL_PATH)
-                print(f"✅ ML Model loaded successfully from {MODEL_PATH}")
-            else:
-                print(f"⚠️ Warning: ML Model not found at {MODEL_PATH}")
-                print("   Run 'python -m backend.app.ml.train' to generate it.")
-        except Exception as e:
-            print(f"❌ Error loading ML model: {e}")
+    @staticmethod
+    def _load(version: Optional[str] = None) -> Optional[_LoadedModel]:
+        """Load a version from the registry, or the unversioned files when there is no manifest."""
+        if model_registry.exists():
+            resolved = model_registry.resolve(version)
+            model_registry.verify(resolved)
+            path, engine, version = resolved["path"], resolved["engine"], resolved["version"]
+        elif version:
+            raise ModelRegistryError(f"Cannot load {version}: there is no model manifest")
+        elif COMPILED_MODEL_PATH.exists():
+            path, engine = COMPILED_MODEL_PATH, "compiled"
+        elif MODEL_PATH.exists():
+            path, engine = MODEL_PATH, "sklearn"
+        else:
+            return None
 
-    
-    def _extract_features(self, password: str):
+        if engine == "compiled":
+            # Same predictions as the joblib model, without importing sklearn
+            from app.ml.forest import CompiledForest
+            model = CompiledForest.load(path)
+        else:
+            import joblib
+            model = joblib.load(path, mmap_mode=settings.ML_JOBLIB_MMAP_MODE or None)
+
+        # Training/serving skew: the artifact records the feature schema it was trained on
+        trained_on = getattr(model, "feature_schema_version_", None) or LEGACY_SCHEMA_VERSION
+        if trained_on != FEATURE_SCHEMA_VERSION:
+            raise ModelRegistryError(f"{path.name} was trained on feature schema v{trained_on}, "
+                                     f"this code extracts v{FEATURE_SCHEMA_VERSION}")
+        print(f"✅ ML Model {version or ''} loaded successfully from {path}")
+        return _LoadedModel(model, engine, version, path)
+
+    def _warm_up(self, candidate: _LoadedModel):
+        """Canary batch: the new model must answer like a strength model before it is swapped in."""
+        results = self._predict_many_with(candidate, CANARY_PASSWORDS)
+        if len(results) != len(CANARY_PASSWORDS) or not all(0.0 <= r["score"] <= 1.0 for r in results):
+            raise ModelRegistryError("Canary predictions out of range")
+        for password in CANARY_PASSWORDS:
+            self._predict_with(candidate, password)
+
+    def reload(self, version: Optional[str] = None) -> dict:
+        """
+        Load `version` (default: the manifest's active one), warm it up and
+        swap it in. Blocking, so call it from a worker thread. On any failure
+        the current model keeps serving and the error is raised.
+        """
+        with self._reload_lock:
+            stamp = self._watch_stamp()
+            try:
+                candidate = self._load(version)
+                if candidate is None:
+                    raise ModelRegistryError("No model artifact found")
+                self._warm_up(candidate)
+            except Exception as e:
+                self.last_reload_error = str(e)
+                raise
+            previous, self._active = self._active, candidate
+            self.status = "ready"
+            self._seen_stamp = stamp
+            self.reloads += 1
+            self.last_reload_error = None
+        print(f"🔄 Strength model swapped: {previous.version if previous else None} -> {candidate.version}")
+        return self.model_info()
+
+    @staticmethod
+    def _watch_stamp() -> tuple:
+        """Change marker for the manifest and the unversioned model files."""
+        stamps = [model_registry.stamp()]
+        for path in (COMPILED_MODEL_PATH, MODEL_PATH):
+            try:
+                stat = path.stat()
+                stamps.append((stat.st_mtime_ns, stat.st_size))
+            except OSError:
+                stamps.append(None)
+        return tuple(stamps)
+
+    def check_for_updates(self) -> bool:
+        """Reload if the manifest or a model file changed. Returns True if a new model was swapped in."""
+        stamp = self._watch_stamp()
+        if self.status in ("cold", "warming") or stamp == self._seen_stamp:
+            return False
+        # Remember the change even if the reload fails, so a broken publish is
+        # reported once instead of on every poll
+        self._seen_stamp = stamp
+        print("🔄 Model files changed, reloading")
+        self.reload()
+        return True
+
+    async def start(self):
         """
-        Must match the logic in train.py EXACTLY.
+        Load the model in the background, then poll for new versions
+        (FastAPI startup hook). Returns at once; until the load finishes
+        `status` is "warming".
         """
-        features = [
-            len(password),                                      # Length
-            sum(c.isdigit() for c in password),                 # Digits
-            sum(c.isupper() for c in password),                 # Uppercase
-            sum(c.islower() for c in password),                 # Lowercase
-            sum(c in string.punctuation for c in password),     # Special chars
-            len(set(password))                                  # Unique chars
-        ]
-        # Reshape for scikit-learn (1 sample, many features)
-        return np.array(features).reshape(1, -1)
+        if self._background is None:
+            if self.status == "cold":
+                self.status = "warming"
+            self._background = asyncio.ensure_future(self._run())
+
+    async def stop(self):
+        if self._background is not None:
+            self._background.cancel()
+            try:
+                await self._background
+            except asyncio.CancelledError:
+                pass
+            self._background = None
+
+    async def _run(self):
+        await asyncio.to_thread(self.load)
+        print(f"🤖 Strength model {self.status}")
+        if settings.ML_MODEL_CHECK_SECONDS <= 0:
+            return
+        while True:
+            await asyncio.sleep(settings.ML_MODEL_CHECK_SECONDS)
+            try:
+                await asyncio.to_thread(self.check_for_updates)
+            except Exception as e:
+                print(f"❌ Model reload failed, keeping the current model: {e}")
+
+
+    @staticmethod
+    def _to_result(strength_score: float) -> dict:
+        # Determine Label
+        label = "Strong" if strength_score > 0.5 else "Weak"
+        return {
+            "score": float(strength_score), # e.g., 0.85
+            "label": label,                 # "Strong"
+            "error": False
+        }
     
 
     def predict(self, password: str) -> dict:
@@ -58,25 +248,94 @@ class PasswordStrengthModel:
             Predicts strength.
             Returns: {score: float (0-1), label: str}
             """
-            if not self.model:
-                return {"score": 0.0, "label": "Model Not Loaded", "error": True}
+            if self.status == "cold":
+                self.load()  # used outside the API (scripts): load on first use
+            return self._predict_with(self._active, password)
 
-            # 1. Prepare data
-            features = self._extract_features(password)
+    def _predict_with(self, active: Optional[_LoadedModel], password: str) -> dict:
+            if not active:
+                return self._not_loaded()
+
+            # 1. Prepare data (and answer from the caches if we can)
+            row = extract_features(password)
+            if active.table:
+                return self._to_result(active.table.lookup(row))
+            if active.cache:
+                cached = active.cache.get(row)
+                if cached is not None:
+                    return self._to_result(cached)
+            # Reshape for scikit-learn (1 sample, many features)
+            import numpy as np
+            features = np.array(row).reshape(1, -1)
             
             # 2. Predict Probability (Get the confidence score)
             # returns [[prob_class_0, prob_class_1]]
-            probs = self.model.predict_proba(features)[0] 
+            probs = active.model.predict_proba(features)[0] 
             strength_score = probs[1] # Probability of being "Strong" (Class 1)
+            if active.cache:
+                active.cache.put(row, strength_score)
 
             # 3. Determine Label
-            label = "Strong" if strength_score > 0.5 else "Weak"
-            
-            return {
-                "score": float(strength_score), # e.g., 0.85
-                "label": label,                 # "Strong"
-                "error": False
-            }
+            return self._to_result(strength_score)
+
+    def predict_many(self, passwords: Sequence[str]) -> List[dict]:
+        """
+        Predicts strength for a batch with one predict_proba call.
+        Returns one result dict (same shape as predict) per password, in order.
+        """
+        if self.status == "cold":
+            self.load()
+        return self._predict_many_with(self._active, passwords)
+
+    def _predict_many_with(self, active: Optional[_LoadedModel], passwords: Sequence[str]) -> List[dict]:
+        if not active:
+            return [self._not_loaded() for _ in passwords]
+        if not passwords:
+            return []
+
+        features = extract_features_batch(passwords)
+        if active.table:
+            return [self._to_result(p) for p in active.table.lookup_many(features)]
+        if not active.cache:
+            strong_probs = active.model.predict_proba(features)[:, 1]
+            return [self._to_result(p) for p in strong_probs]
+
+        # Only the feature tuples the cache has not seen go to the model
+        rows = [tuple(r) for r in features.tolist()]
+        scores = [active.cache.get(row) for row in rows]
+        missing = [i for i, score in enumerate(scores) if score is None]
+        if missing:
+            strong_probs = active.model.predict_proba(features[missing])[:, 1]
+            for i, p in zip(missing, strong_probs):
+                scores[i] = p
+                active.cache.put(rows[i], p)
+        return [self._to_result(p) for p in scores]
+
+    def _not_loaded(self) -> dict:
+        if self.warming:
+            return {"score": 0.0, "label": "Model Warming Up", "error": True, "warming": True}
+        return {"score": 0.0, "label": "Model Not Loaded", "error": True}
+
+    def model_info(self) -> dict:
+        active = self._active
+        return {
+            "status": self.status,
+            "version": active.version if active else None,
+            "engine": active.engine if active else None,
+            "source": active.source.name if active else None,
+            "loaded_at": active.loaded_at if active else None,
+            "reloads": self.reloads,
+            "last_reload_error": self.last_reload_error,
+        }
+
+    def cache_stats(self) -> dict:
+        active = self._active
+        return {
+            "engine": active.engine if active else None,
+            "reloads": self.reloads,
+            "lru": active.cache.stats() if active and active.cache else None,
+            "table": active.table.stats() if active and active.table else None,
+        }
 
 # Export instance
 password_strength_model = PasswordStrengthModel()
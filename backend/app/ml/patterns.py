@@ -0,0 +1,614 @@
+"""
+Pattern-Aware Strength Engine
+
+Estimates how many guesses an attacker needs, in the spirit of zxcvbn.
+The forest only counts character classes; this engine looks for the
+patterns that make a password guessable:
+
+  dictionary   common passwords, English words and names (also reversed
+               and with l33t substitutions such as p@ssw0rd)
+  spatial      keyboard walks on QWERTY and the numeric keypad (qwerty, 1qaz)
+  repeat       repeated characters or blocks (aaaa, Password1!Password1!)
+  sequence     runs with a constant step (abcd, 13579, zyx)
+  date         years and day/month/year dates (1987, 12/05/1999)
+
+Everything else is brute force. A dynamic program picks the cheapest way to
+cover the password with matches; that guess count becomes the score.
+
+The wordlists in app/ml/data/*.txt and the keyboard graphs are compiled into
+one binary file: an Aho-Corasick automaton in CSR form (a byte string of
+edge labels plus uint32 arrays), word ranks, and a 128x128 direction table
+per keyboard. It is rebuilt automatically when a wordlist changes, or with:
+
+  python -m app.ml.patterns build
+  python -m app.ml.patterns check "Password1!Password1!"
+"""
+
+import argparse
+import math
+import os
+import re
+import struct
+import threading
+from array import array
+from collections import deque
+from datetime import date
+from pathlib import Path
+from typing import List, Optional, Sequence
+
+from app.config import settings
+
+DATA_DIR = Path(__file__).resolve().parent / "data"
+COMPILED_PATH = DATA_DIR / "patterns.bin"
+# Ranked wordlists, most common first. A word's guess count is its rank
+DICTIONARIES = ("passwords", "english", "names")
+
+MAGIC = b"PWPATTRN"
+VERSION = 1
+HEADER = struct.Struct("<8sIIIII36x")  # magic, version, states, edges, words, graphs
+GRAPH_HEADER = struct.Struct("<16sdd")  # name, starting positions, average degree
+
+# Keyboard layouts as in zxcvbn: slanted rows of two-character keys
+# (unshifted, shifted) and an aligned numeric keypad
+QWERTY = r"""
+`~ 1! 2@ 3# 4$ 5% 6^ 7& 8* 9( 0) -_ =+
+    qQ wW eE rR tT yY uU iI oO pP [{ ]} \|
+     aA sS dD fF gG hH jJ kK lL ;: '"
+      zZ xX cC vV bB nN mM ,< .> /?
+"""
+KEYPAD = """
+  / * -
+7 8 9 +
+4 5 6
+1 2 3
+  0 .
+"""
+
+# Common substitutions, read back as letters. "1" and "|" can stand for
+# either "i" or "l", so there are two views
+L33T_VIEWS = (
+    bytes.maketrans(b"4@83(6!1|05$7+2", b"aabecgiiiossttz"),
+    bytes.maketrans(b"4@83(6!1|05$7+2", b"aabecgillossttz"),
+)
+
+BRUTEFORCE_CARDINALITY = 10
+MIN_GUESSES_SINGLE_CHAR = 10
+MIN_GUESSES_MULTI_CHAR = 50
+MIN_GUESSES_BEFORE_GROWING_SEQUENCE = 10000
+MIN_YEAR_SPACE = 20
+BRUTEFORCE_LOG10 = math.log10(BRUTEFORCE_CARDINALITY)
+DAYS_LOG10 = math.log10(365)
+DATE_SEPARATOR_LOG10 = math.log10(365 * 4)   # the separator can be one of ~4 characters
+# 1e10 guesses resist an offline attack on a slow hash; that is the score's midpoint
+STRONG_GUESSES_LOG10 = 10.0
+
+DATE_WITH_SEPARATOR = re.compile(r"(\d{1,4})([\s/\\_.-])(\d{1,2})\2(\d{1,4})")
+RECENT_YEAR = re.compile(r"19\d\d|20\d\d")
+REPEAT_GREEDY = re.compile(r"(.+)\1+")
+REPEAT_LAZY = re.compile(r"(.+?)\1+")
+REPEAT_LAZY_ANCHORED = re.compile(r"^(.+?)\1+$")
+
+
+class PatternEngineError(Exception):
+    """Raised when the compiled pattern file is missing, corrupt or cannot be built."""
+
+
+# --- Compiler ---
+
+def _read_wordlist(path: Path) -> List[str]:
+    with open(path, "r", encoding="utf-8") as f:
+        return [line.strip().lower() for line in f if line.strip()]
+
+
+def _keyboard_graph(layout: str, slanted: bool):
+    """
+    Direction table for one keyboard: byte [a * 128 + b] is 1 + the direction
+    from key a to key b (0 if not adjacent); plus per-char shift flags.
+    """
+    positions, shifted = {}, bytearray(128)
+    token_size = 3 if slanted else 2
+    for y, line in enumerate(layout.strip("\n").split("\n")):
+        slant = y if slanted else 0
+        for token in line.split():
+            x = (line.index(token) - slant) // token_size
+            positions[(x, y)] = token
+            for i, c in enumerate(token):
+                shifted[ord(c)] = 1 if i == 1 else 0
+
+    if slanted:
+        steps = [(-1, 0), (0, -1), (1, -1), (1, 0), (0, 1), (-1, 1)]
+    else:
+        steps = [(-1, 0), (-1, -1), (0, -1), (1, -1), (1, 0), (1, 1), (0, 1), (-1, 1)]
+    table = bytearray(128 * 128)
+    neighbours = 0
+    for (x, y), token in positions.items():
+        for direction, (dx, dy) in enumerate(steps):
+            other = positions.get((x + dx, y + dy))
+            if other is None:
+                continue
+            for a in token:
+                neighbours += 1
+                for b in other:
+                    table[ord(a) * 128 + ord(b)] = direction + 1
+    chars = sum(len(token) for token in positions.values())
+    return chars, neighbours / chars, bytes(table), bytes(shifted)
+
+
+def build(data_dir: Path = DATA_DIR, target: Path = COMPILED_PATH) -> dict:
+    """Compile the wordlists and keyboard graphs into one binary file (temp file + rename)."""
+    # One entry per distinct word: its best rank over all lists
+    ranks = {}
+    for dict_id, name in enumerate(DICTIONARIES):
+        path = Path(data_dir) / f"{name}.txt"
+        if not path.exists():
+            raise PatternEngineError(f"Missing wordlist {path}")
+        for rank, word in enumerate(_read_wordlist(path), start=1):
+            if len(word) >= 3 and word.isascii() and (word not in ranks or rank < ranks[word][0]):
+                ranks[word] = (rank, dict_id)
+    words = sorted(ranks)
+
+    # Trie, then failure and output links breadth-first (Aho-Corasick)
+    children, output = [{}], [-1]
+    for word_id, word in enumerate(words):
+        state = 0
+        for byte in word.encode("ascii"):
+            if byte not in children[state]:
+                children[state][byte] = len(children)
+                children.append({})
+                output.append(-1)
+            state = children[state][byte]
+        output[state] = word_id
+    fail, out_link = [0] * len(children), [-1] * len(children)
+    queue = deque(children[0].values())  # depth 1 states fail back to the root
+    while queue:
+        state = queue.popleft()
+        for byte, child in children[state].items():
+            f = fail[state]
+            while f and byte not in children[f]:
+                f = fail[f]
+            if state:
+                fail[child] = children[f].get(byte, 0)
+            out_link[child] = fail[child] if output[fail[child]] >= 0 else out_link[fail[child]]
+            queue.append(child)
+
+    edge_start, labels, targets = array("I", [0]), bytearray(), array("I")
+    for edges in children:
+        for byte in sorted(edges):
+            labels.append(byte)
+            targets.append(edges[byte])
+        edge_start.append(len(labels))
+
+    graphs = [("qwerty",) + _keyboard_graph(QWERTY, slanted=True),
+              ("keypad",) + _keyboard_graph(KEYPAD, slanted=False)]
+
+    target = Path(target)
+    partial = target.with_name(target.name + ".partial")
+    with open(partial, "wb") as out:
+        out.write(HEADER.pack(MAGIC, VERSION, len(children), len(labels), len(words), len(graphs)))
+        out.write(edge_start.tobytes())
+        out.write(bytes(labels))
+        out.write(targets.tobytes())
+        out.write(array("I", fail).tobytes())
+        out.write(array("i", output).tobytes())
+        out.write(array("i", out_link).tobytes())
+        out.write(bytes(len(w) for w in words))
+        out.write(array("I", [ranks[w][0] for w in words]).tobytes())
+        out.write(bytes(ranks[w][1] for w in words))
+        for name, starts, degree, table, shifted in graphs:
+            out.write(GRAPH_HEADER.pack(name.encode("ascii"), starts, degree))
+            out.write(table)
+            out.write(shifted)
+    os.replace(partial, target)
+    return {"words": len(words), "states": len(children), "bytes": target.stat().st_size}
+
+
+# --- Guess estimates (zxcvbn's formulas) ---
+
+def _nck(n: int, k: int) -> int:
+    return math.comb(n, k) if 0 <= k <= n else 0
+
+
+def _case_variations(token: str) -> int:
+    upper = sum(c.isupper() for c in token)
+    lower = sum(c.islower() for c in token)
+    if upper == 0:
+        return 1
+    # Capitalised, all caps and last-letter caps are the usual choices
+    if lower == 0 or (upper == 1 and (token[0].isupper() or token[-1].isupper())):
+        return 2
+    return sum(_nck(upper + lower, i) for i in range(1, min(upper, lower) + 1))
+
+
+def _l33t_variations(token: str, letters: bytes) -> int:
+    variations = 1
+    lowered = token.lower()
+    for sub, letter in {(c, chr(l)) for c, l in zip(lowered, letters) if c != chr(l)}:
+        subbed, unsubbed = lowered.count(sub), lowered.count(letter)
+        if subbed == 0 or unsubbed == 0:
+            variations *= 2
+        else:
+            variations *= sum(_nck(subbed + unsubbed, i) for i in range(1, min(subbed, unsubbed) + 1))
+    return variations
+
+
+def _spatial_guesses(length: int, turns: int, shifted: int, starts: float, degree: float) -> float:
+    guesses = 0.0
+    for i in range(2, length + 1):
+        for j in range(1, min(turns, i - 1) + 1):
+            guesses += _nck(i - 1, j - 1) * starts * degree ** j
+    unshifted = length - shifted
+    if shifted and not unshifted:
+        guesses *= 2
+    elif shifted:
+        guesses *= sum(_nck(shifted + unshifted, i) for i in range(1, min(shifted, unshifted) + 1))
+    return guesses
+
+
+class PatternStrengthEngine:
+    """Guess-count estimator over the compiled pattern file. Thread-safe once loaded."""
+
+    def __init__(self, path: Path = COMPILED_PATH):
+        self.path = Path(path)
+        self._lock = threading.Lock()
+        self._loaded = False
+
+    @property
+    def loaded(self) -> bool:
+        return self._loaded
+
+    def load(self):
+        """Map the compiled file, rebuilding it first if a wordlist is newer. Idempotent."""
+        with self._lock:
+            if self._loaded:
+                return
+            sources = [DATA_DIR / f"{name}.txt" for name in DICTIONARIES]
+            if self.path == COMPILED_PATH and (not self.path.exists() or any(
+                    s.stat().st_mtime > self.path.stat().st_mtime for s in sources if s.exists())):
+                print(f"🔧 Compiling strength patterns into {self.path}")
+                try:
+                    build(DATA_DIR, self.path)
+                except OSError as e:
+                    if not self.path.exists():
+                        raise PatternEngineError(f"Cannot compile {self.path}: {e}") from e
+                    print(f"⚠️ Cannot recompile {self.path} ({e}), using the existing file")
+            try:
+                blob = self.path.read_bytes()
+            except OSError as e:
+                raise PatternEngineError(f"Cannot read {self.path}: {e}") from e
+            self._read(blob)
+            self.reference_year = date.today().year
+            self._loaded = True
+
+    def _read(self, blob: bytes):
+        try:
+            magic, version, n_states, n_edges, n_words, n_graphs = HEADER.unpack_from(blob, 0)
+        except struct.error as e:
+            raise PatternEngineError(f"{self.path} is not a pattern file: {e}") from e
+        if magic != MAGIC or version != VERSION:
+            raise PatternEngineError(f"{self.path} is not a version {VERSION} pattern file")
+
+        offset = HEADER.size
+
+        def take(typecode: str, count: int):
+            nonlocal offset
+            values = array(typecode)
+            size = values.itemsize * count
+            if offset + size > len(blob):
+                raise PatternEngineError(f"{self.path} is truncated")
+            values.frombytes(blob[offset:offset + size])
+            offset += size
+            return values
+
+        def take_bytes(count: int) -> bytes:
+            nonlocal offset
+            if offset + count > len(blob):
+                raise PatternEngineError(f"{self.path} is truncated")
+            offset += count
+            return blob[offset - count:offset]
+
+        self.edge_start = take("I", n_states + 1)
+        self.labels = take_bytes(n_edges)
+        self.targets = take("I", n_edges)
+        self.fail = take("I", n_states)
+        self.output = take("i", n_states)
+        self.out_link = take("i", n_states)
+        self.word_length = take_bytes(n_words)
+        self.word_rank = take("I", n_words)
+        self.word_dict = take_bytes(n_words)
+        self.graphs = []
+        for _ in range(n_graphs):
+            name, starts, degree = GRAPH_HEADER.unpack(take_bytes(GRAPH_HEADER.size))
+            self.graphs.append((name.rstrip(b"\0").decode(), starts, degree, take_bytes(128 * 128), take_bytes(128)))
+        self.n_words = n_words
+
+    # --- Matchers. Each returns (start, end inclusive, log10 guesses, pattern) tuples ---
+
+    def _dictionary_matches(self, password: str, view: bytes, reverse: bool = False, plain: bytes = None):
+        """
+        One Aho-Corasick pass over a lowercase ASCII view of the password.
+        `plain` is given for l33t views: the lowercase view before substitution.
+        """
+        edge_start, labels, targets, fail = self.edge_start, self.labels, self.targets, self.fail
+        output, out_link, word_length, word_rank = self.output, self.out_link, self.word_length, self.word_rank
+        n = len(view)
+        matches = []
+        state = 0
+        for pos, byte in enumerate(view):
+            while True:
+                i = labels.find(byte, edge_start[state], edge_start[state + 1])
+                if i >= 0:
+                    state = targets[i]
+                    break
+                if not state:
+                    break
+                state = fail[state]
+            hit = state if output[state] >= 0 else out_link[state]
+            while hit >= 0:
+                word = output[hit]
+                length = word_length[word]
+                start, end = pos - length + 1, pos
+                if reverse:
+                    start, end = n - 1 - end, n - 1 - start
+                token = password[start:end + 1]
+                if plain is not None:
+                    letters = view[start:end + 1]
+                    # Only a l33t match if a substitution was actually undone
+                    if plain[start:end + 1] == letters:
+                        hit = out_link[hit]
+                        continue
+                    guesses = math.log10(word_rank[word] * _case_variations(token) * _l33t_variations(token, letters))
+                    pattern = "l33t"
+                else:
+                    guesses = math.log10(word_rank[word] * _case_variations(token) * (2 if reverse else 1))
+                    pattern = "reversed" if reverse else "dictionary"
+                matches.append((start, end, guesses, pattern))
+                hit = out_link[hit]
+        return matches
+
+    def _spatial_matches(self, password: str):
+        matches = []
+        n = len(password)
+        codes = [ord(c) if ord(c) < 128 else 0 for c in password]
+        for _, starts, degree, table, shifted_flags in self.graphs:
+            i = 0
+            while i < n - 1:
+                j, turns, last_direction = i, 0, -1
+                shifted = shifted_flags[codes[i]]
+                while j < n - 1:
+                    direction = table[codes[j] * 128 + codes[j + 1]] if codes[j] and codes[j + 1] else 0
+                    if not direction:
+                        break
+                    if direction != last_direction:
+                        turns += 1
+                        last_direction = direction
+                    j += 1
+                    shifted += shifted_flags[codes[j]]
+                if j - i >= 2:
+                    guesses = _spatial_guesses(j - i + 1, turns, shifted, starts, degree)
+                    matches.append((i, j, math.log10(guesses), "spatial"))
+                i = j + 1 if j > i else i + 1
+        return matches
+
+    def _sequence_matches(self, password: str):
+        matches = []
+        n = len(password)
+        i = 0
+        while i < n - 2:
+            delta = ord(password[i + 1]) - ord(password[i])
+            j = i + 1
+            if 0 < abs(delta) <= 5:
+                while j + 1 < n and ord(password[j + 1]) - ord(password[j]) == delta:
+                    j += 1
+            if j - i >= 2:
+                first = password[i]
+                if first in "aAzZ019":
+                    base = 4
+                elif first.isdigit():
+                    base = 10
+                else:
+                    base = 26
+                matches.append((i, j, math.log10(base * (j - i + 1) * (1 if delta > 0 else 2)), "sequence"))
+                i = j
+            else:
+                i += 1
+        return matches
+
+    def _year_guesses(self, year: int) -> float:
+        return math.log10(max(abs(year - self.reference_year), MIN_YEAR_SPACE))
+
+    def _date_matches(self, password: str):
+        matches = [(m.start(), m.end() - 1, self._year_guesses(int(m.group())), "date")
+                   for m in RECENT_YEAR.finditer(password)]
+        for m in DATE_WITH_SEPARATOR.finditer(password):
+            year = self._date_year((m.group(1), m.group(3), m.group(4)))
+            if year is not None:
+                matches.append((m.start(), m.end() - 1, DATE_SEPARATOR_LOG10 + self._year_guesses(year), "date"))
+        # Digits only: every 4-8 digit window that splits into a valid date
+        years = {}  # long digit runs repeat the same windows
+        for m in re.finditer(r"\d{4,}", password):
+            digits, offset = m.group(), m.start()
+            for length in range(4, min(8, len(digits)) + 1):
+                for start in range(len(digits) - length + 1):
+                    chunk = digits[start:start + length]
+                    if chunk not in years:
+                        years[chunk] = self._digit_date_year(chunk)
+                    year = years[chunk]
+                    if year is not None:
+                        matches.append((offset + start, offset + start + length - 1,
+                                        DAYS_LOG10 + self._year_guesses(year), "date"))
+        return matches
+
+    @staticmethod
+    def _date_year(parts) -> Optional[int]:
+        """Year of a (d, m, y) / (m, d, y) / (y, m, d) triple, or None if none is valid."""
+        numbers = [int(p) for p in parts]
+        for year, a, b in ((numbers[2], numbers[0], numbers[1]), (numbers[0], numbers[1], numbers[2])):
+            if 1 <= a <= 31 and 1 <= b <= 31 and (a <= 12 or b <= 12):
+                if year < 100:
+                    return year + (1900 if year > 50 else 2000)
+                if 1000 <= year <= 2050:
+                    return year
+        return None
+
+    def _digit_date_year(self, chunk: str) -> Optional[int]:
+        """Year of a separator-less date such as 1231987 or 19870312, trying every split."""
+        for year_digits in (4, 2):
+            rest_length = len(chunk) - year_digits
+            if not 2 <= rest_length <= 4:
+                continue
+            # Year last (day/month first) or year first
+            for year, rest in ((chunk[rest_length:], chunk[:rest_length]), (chunk[:year_digits], chunk[year_digits:])):
+                for split in range(max(1, rest_length - 2), min(2, rest_length - 1) + 1):
+                    found = self._date_year((rest[:split], rest[split:], year))
+                    if found is not None:
+                        return found
+        return None
+
+    def _repeat_matches(self, password: str, depth: int):
+        matches = []
+        last = 0
+        while last < len(password):
+            greedy = REPEAT_GREEDY.search(password, last)
+            if not greedy:
+                break
+            lazy = REPEAT_LAZY.search(password, last)
+            if len(greedy.group(0)) > len(lazy.group(0)):
+                match = greedy
+                base = REPEAT_LAZY_ANCHORED.match(match.group(0)).group(1)
+            else:
+                match, base = lazy, lazy.group(1)
+            repeats = len(match.group(0)) // len(base)
+            base_guesses = self._guesses(base, depth + 1)[0] if depth < 2 else len(base) * BRUTEFORCE_LOG10
+            matches.append((match.start(), match.end() - 1, base_guesses + math.log10(repeats), "repeat"))
+            last = match.end()
+        return matches
+
+    # --- Search ---
+
+    def _matches(self, password: str, depth: int):
+        lower = password.encode("ascii", "replace").lower()
+        matches = self._dictionary_matches(password, lower)
+        matches += self._dictionary_matches(password, lower[::-1], reverse=True)
+        for table in L33T_VIEWS:
+            letters = lower.translate(table)
+            if letters != lower:
+                matches += self._dictionary_matches(password, letters, plain=lower)
+        matches += self._spatial_matches(password)
+        matches += self._sequence_matches(password)
+        matches += self._date_matches(password)
+        matches += self._repeat_matches(password, depth)
+        return matches
+
+    @staticmethod
+    def _pareto(row: dict) -> dict:
+        """Drop states that use more matches for a larger product: they can never win."""
+        kept, lowest = {}, math.inf
+        for k in sorted(row):
+            if row[k][0] < lowest:
+                kept[k] = row[k]
+                lowest = row[k][0]
+        return kept
+
+    def _guesses(self, password: str, depth: int = 0):
+        """(log10 guesses, pattern names) of the cheapest way to cover the password with matches."""
+        n = len(password)
+        if n == 0:
+            return 0.0, []
+        by_end = [[] for _ in range(n)]
+        for start, end, guesses, pattern in self._matches(password, depth):
+            if end - start + 1 < n:
+                minimum = MIN_GUESSES_SINGLE_CHAR if start == end else MIN_GUESSES_MULTI_CHAR
+                guesses = max(guesses, math.log10(minimum))
+            by_end[end].append((start, guesses, pattern))
+
+        # best[j][k]: lowest log10 product of guesses covering password[:j] with k
+        # matches; brute[j][k]: the same, ending in a brute-force run. A run
+        # grows one character (x10) at a time, so gaps cost O(n) rather than O(n^2)
+        best = [{} for _ in range(n + 1)]
+        brute = [{} for _ in range(n + 1)]
+        best[0][0] = (0.0, None)
+        start_run = math.log10(MIN_GUESSES_SINGLE_CHAR + 1)
+        for j in range(1, n + 1):
+            runs = brute[j]
+            for k, (product, _) in brute[j - 1].items():
+                runs[k] = (product + BRUTEFORCE_LOG10, (j - 1, k, None, True))
+            for k, (product, _) in best[j - 1].items():
+                candidate = product + start_run
+                if k + 1 not in runs or candidate < runs[k + 1][0]:
+                    runs[k + 1] = (candidate, (j - 1, k, "bruteforce", False))
+            brute[j] = runs = self._pareto(runs)
+
+            row = dict(runs)
+            for start, guesses, pattern in by_end[j - 1]:
+                for k, (product, _) in best[start].items():
+                    candidate = product + guesses
+                    if k + 1 not in row or candidate < row[k + 1][0]:
+                        row[k + 1] = (candidate, (start, k, pattern, False))
+            best[j] = self._pareto(row)
+
+        # zxcvbn: k! * product + D^(k-1), summed in log space
+        total, chosen_k = math.inf, 0
+        for k, (product, _) in best[n].items():
+            ordered = math.lgamma(k + 1) / math.log(10) + product
+            growing = (k - 1) * math.log10(MIN_GUESSES_BEFORE_GROWING_SEQUENCE)
+            high, low = max(ordered, growing), min(ordered, growing)
+            guesses = high + math.log10(1 + 10 ** (low - high))
+            if guesses < total:
+                total, chosen_k = guesses, k
+
+        patterns, j, k, states = [], n, chosen_k, best
+        while k:
+            previous_j, previous_k, pattern, in_run = states[j][k][1]
+            if pattern:
+                patterns.append(pattern)
+            states = brute if in_run else best
+            j, k = previous_j, previous_k
+        return total, patterns[::-1]
+
+    def estimate(self, password: str) -> dict:
+        """
+        Guess count (log10) and the patterns found. Only the first
+        ML_PATTERN_MAX_LENGTH characters are analysed, as zxcvbn-ts does. That
+        bounds the cost, and ignoring characters can only under-rate a password.
+        """
+        self.load()
+        guesses_log10, patterns = self._guesses(password[:settings.ML_PATTERN_MAX_LENGTH])
+        return {"guesses_log10": guesses_log10, "patterns": patterns}
+
+    def predict(self, password: str) -> dict:
+        """Same result shape as PasswordStrengthModel.predict, plus the guess estimate."""
+        estimate = self.estimate(password)
+        score = min(1.0, estimate["guesses_log10"] / (2 * STRONG_GUESSES_LOG10))
+        return {
+            "score": score,
+            "label": "Strong" if score > 0.5 else "Weak",
+            "error": False,
+            "guesses_log10": round(estimate["guesses_log10"], 2),
+            # Pattern kinds only: never echo parts of the password back
+            "patterns": sorted(set(p for p in estimate["patterns"] if p != "bruteforce")),
+        }
+
+    def predict_many(self, passwords: Sequence[str]) -> List[dict]:
+        return [self.predict(p) for p in passwords]
+
+
+# Export instance
+pattern_strength_engine = PatternStrengthEngine()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compile or try the pattern strength engine.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    commands.add_parser("build", help="compile app/ml/data/*.txt into patterns.bin")
+    check_cmd = commands.add_parser("check", help="score passwords")
+    check_cmd.add_argument("passwords", nargs="+")
+
+    args = parser.parse_args()
+    if args.command == "build":
+        info = build()
+        print(f"✅ {info['words']:,} words, {info['states']:,} states, {info['bytes']:,} bytes -> {COMPILED_PATH}")
+    else:
+        for password in args.passwords:
+            result = pattern_strength_engine.predict(password)
+            print(f"{password!r}: {result['label']} (10^{result['guesses_log10']} guesses, "
+                  f"{', '.join(result['patterns']) or 'no patterns'})")
@@ -0,0 +1,136 @@
+"""
+Prediction caches for the strength model
+
+The model only sees six small integers, so its answer is a pure function of
+that feature tuple. Two layers exploit that (neither ever sees a password):
+
+- PredictionLRU: bounded LRU of feature tuple -> strong probability.
+- ThresholdTable: the whole reachable table, computed up front. A tree only
+  asks "feature <= threshold", so every input falls into one cell of the grid
+  cut by the forest's distinct thresholds, and all inputs in a cell get the
+  same prediction. One model call on a representative of each cell gives an
+  exact answer for every possible input, of any length.
+"""
+
+import threading
+from bisect import bisect_left
+from collections import OrderedDict
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+
+class PredictionLRU:
+    """Thread-safe bounded LRU keyed by feature tuple (predictions run in the thread pool)."""
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[tuple, float]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: tuple) -> Optional[float]:
+        with self._lock:
+            score = self._entries.get(key)
+            if score is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return score
+
+    def put(self, key: tuple, score: float):
+        with self._lock:
+            self._entries[key] = score
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
+
+
+def _representatives(edges: np.ndarray) -> np.ndarray:
+    """
+    One float32 value inside every cell cut by `edges`: cell i holds
+    edges[i-1] < x <= edges[i], the last cell x > edges[-1].
+    float32 because the model compares float32 features with float64 thresholds.
+    """
+    reps = np.zeros(len(edges) + 1, dtype=np.float32)
+    for i, edge in enumerate(edges):
+        value = np.float32(edge)
+        if value > edge:
+            value = np.nextafter(value, np.float32(-np.inf))
+        reps[i] = value
+    if len(edges):
+        value = np.float32(edges[-1])
+        while value <= edges[-1]:
+            value = np.nextafter(value, np.float32(np.inf))
+        reps[-1] = value
+    return reps
+
+
+def _split_edges(forest) -> List[np.ndarray]:
+    """Sorted distinct thresholds the forest compares each feature against."""
+    internal = ~np.isinf(forest.threshold)
+    return [np.unique(forest.threshold[internal & (forest.feature == f)]) for f in range(forest.n_features)]
+
+
+class ThresholdTable:
+    """Exact prediction for every input, indexed by threshold cell."""
+
+    def __init__(self, edges: List[np.ndarray], scores: np.ndarray):
+        self.edges = edges
+        self._edge_lists = [e.tolist() for e in edges]
+        self.shape = tuple(len(e) + 1 for e in edges)
+        self.scores = scores
+        self._score_list = scores.tolist()
+        self.hits = 0
+
+    @staticmethod
+    def cell_count(forest) -> int:
+        return int(np.prod([len(e) + 1 for e in _split_edges(forest)], dtype=np.float64))
+
+    @classmethod
+    def build(cls, forest, class_index: int) -> "ThresholdTable":
+        """Evaluate the forest once per cell (see cell_count() for the size)."""
+        edges = _split_edges(forest)
+        grid = np.meshgrid(*(_representatives(e) for e in edges), indexing="ij")
+        X = np.stack([g.ravel() for g in grid], axis=1)
+        return cls(edges, forest.predict_proba(X)[:, class_index].copy())
+
+    def lookup(self, row: Tuple[int, ...]) -> float:
+        # Feature counts are integers, exact in float32, so comparing them as
+        # Python numbers matches the model's float32 comparison
+        index = 0
+        for value, edges, size in zip(row, self._edge_lists, self.shape):
+            index = index * size + bisect_left(edges, value)
+        self.hits += 1
+        return self._score_list[index]
+
+    def lookup_many(self, X: np.ndarray) -> np.ndarray:
+        X = np.asarray(X, dtype=np.float32).astype(np.float64)
+        index = np.zeros(X.shape[0], dtype=np.intp)
+        for f, (edges, size) in enumerate(zip(self.edges, self.shape)):
+            index = index * size + np.searchsorted(edges, X[:, f], side="left")
+        self.hits += X.shape[0]
+        return self.scores.take(index)
+
+    def stats(self) -> dict:
+        return {"cells": int(self.scores.size), "shape": list(self.shape), "hits": self.hits}
+
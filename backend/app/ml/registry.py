@@ -0,0 +1,170 @@
+"""
+Model Registry
+
+Versioned strength-model artifacts under app/ml/models/, described by
+manifest.json:
+
+  {
+    "active": "v2",
+    "versions": {
+      "v2": {
+        "files": {"forest": "password_strength_v2.forest", "joblib": "password_strength_v2.joblib"},
+        "sha256": {"password_strength_v2.forest": "...", ...},
+        "feature_schema": "<checksum of FEATURE_NAMES>",
+        "feature_schema_version": 1,
+        "created_at": "2026-10-18T12:00:00+00:00"
+      }
+    }
+  }
+
+train.py publishes new versions; the API loads the active one and hot-swaps
+when the manifest changes or an admin calls POST /api/ml/reload. A version
+whose feature schema differs from the running code is refused, as is any
+artifact whose checksum does not match. The artifacts also embed the
+feature schema version themselves (see features.py); that is checked when
+the model is loaded.
+
+  python -m app.ml.registry list
+  python -m app.ml.registry activate v2
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import re
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, Optional
+
+from app.ml.features import FEATURE_SCHEMA_VERSION, feature_schema_checksum
+
+MODELS_DIR = Path(__file__).resolve().parent / "models"
+MANIFEST_PATH = MODELS_DIR / "manifest.json"
+
+
+class ModelRegistryError(Exception):
+    """Raised when the manifest or a version's artifacts cannot be used."""
+
+
+def file_checksum(path: Path) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class ModelRegistry:
+    """Reads and updates manifest.json. Every write is a temp file + rename."""
+
+    def __init__(self, models_dir: Path = MODELS_DIR):
+        self.models_dir = Path(models_dir)
+        self.manifest_path = self.models_dir / MANIFEST_PATH.name
+
+    def exists(self) -> bool:
+        return self.manifest_path.exists()
+
+    def read(self) -> dict:
+        try:
+            with open(self.manifest_path, "r", encoding="utf-8") as f:
+                manifest = json.load(f)
+        except FileNotFoundError:
+            return {"active": None, "versions": {}}
+        except (OSError, ValueError) as e:
+            raise ModelRegistryError(f"Cannot read {self.manifest_path}: {e}") from e
+        manifest.setdefault("versions", {})
+        return manifest
+
+    def _write(self, manifest: dict):
+        self.models_dir.mkdir(parents=True, exist_ok=True)
+        partial = self.manifest_path.with_name(self.manifest_path.name + ".partial")
+        with open(partial, "w", encoding="utf-8") as f:
+            json.dump(manifest, f, indent=2, sort_keys=True)
+        os.replace(partial, self.manifest_path)
+
+    def stamp(self) -> Optional[tuple]:
+        """Cheap change marker for the manifest (None if there is none)."""
+        try:
+            stat = self.manifest_path.stat()
+        except OSError:
+            return None
+        return stat.st_mtime_ns, stat.st_size
+
+    def next_version(self) -> str:
+        """First "vN" not used by the manifest or by a model file already on disk."""
+        taken = set(self.read()["versions"])
+        taken.update(re.findall(r"password_strength_(v\d+)\.", " ".join(p.name for p in self.models_dir.glob("*"))))
+        numbers = [int(v[1:]) for v in taken if v[1:].isdigit()]
+        return f"v{max(numbers, default=0) + 1}"
+
+    def add_version(self, version: str, files: Dict[str, str], activate: bool = True) -> dict:
+        """Record artifacts already written to models_dir (kind -> file name)."""
+        manifest = self.read()
+        entry = {
+            "files": files,
+            "sha256": {name: file_checksum(self.models_dir / name) for name in files.values()},
+            "feature_schema": feature_schema_checksum(),
+            "feature_schema_version": FEATURE_SCHEMA_VERSION,
+            "created_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        }
+        manifest["versions"][version] = entry
+        if activate or not manifest.get("active"):
+            manifest["active"] = version
+        self._write(manifest)
+        return entry
+
+    def activate(self, version: str):
+        manifest = self.read()
+        if version not in manifest["versions"]:
+            raise ModelRegistryError(f"Unknown model version {version}")
+        manifest["active"] = version
+        self._write(manifest)
+
+    def resolve(self, version: Optional[str] = None) -> dict:
+        """
+        Validated description of a version (the active one by default):
+        {"version", "engine", "path", "sha256"}. Prefers the compiled forest.
+        """
+        manifest = self.read()
+        version = version or manifest.get("active")
+        entry = manifest["versions"].get(version) if version else None
+        if entry is None:
+            raise ModelRegistryError(f"Model version {version!r} is not in {self.manifest_path}")
+        if entry.get("feature_schema") != feature_schema_checksum():
+            raise ModelRegistryError(f"Model {version} was trained on a different feature schema")
+
+        for kind, engine in (("forest", "compiled"), ("joblib", "sklearn")):
+            name = entry["files"].get(kind)
+            if name and (self.models_dir / name).exists():
+                return {"version": version, "engine": engine, "path": self.models_dir / name,
+                        "sha256": entry["sha256"].get(name)}
+        raise ModelRegistryError(f"No artifact of model {version} exists in {self.models_dir}")
+
+    @staticmethod
+    def verify(resolved: dict):
+        """Check the artifact still matches the checksum recorded at publish time."""
+        if resolved["sha256"] and file_checksum(resolved["path"]) != resolved["sha256"]:
+            raise ModelRegistryError(f"Checksum mismatch for {resolved['path'].name}")
+
+
+# Export instance
+model_registry = ModelRegistry()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Inspect or switch the active strength model.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    commands.add_parser("list", help="show every registered version")
+    activate_cmd = commands.add_parser("activate", help="make a version active (running workers hot-swap)")
+    activate_cmd.add_argument("version")
+
+    args = parser.parse_args()
+    if args.command == "activate":
+        model_registry.activate(args.version)
+        print(f"✅ {args.version} is now the active model")
+    else:
+        manifest = model_registry.read()
+        for version, entry in sorted(manifest["versions"].items(), key=lambda kv: kv[1]["created_at"]):
+            marker = "*" if version == manifest.get("active") else " "
+            print(f"{marker} {version:<6} {entry['created_at']}  {', '.join(entry['files'].values())}")
@@ -2,30 +2,40 @@
 ML Training Script
 Generates synthetic password data and trains a Random Forest model.
 """
+import argparse
+import gzip
+import itertools
+import os
+import zlib
+from concurrent.futures import ProcessPoolExecutor
 import joblib
-import pandas as pd
 import numpy as np
 import string
 import secrets
 from pathlib import Path
 from sklearn.ensemble import RandomForestClassifier
 
+from app.ml.features import (FEATURE_SCHEMA_VERSION, N_FEATURES, char_class, extract_features,
+                             extract_features_batch)
+from app.ml.forest import CompiledForest
+from app.ml.registry import MODELS_DIR, model_registry
+
 # Defines where we save the trained model
 BASE_DIR = Path(__file__).resolve().parent
 MODEL_PATH = BASE_DIR / "models" / "password_strength_v1.joblib"
+COMPILED_MODEL_PATH = BASE_DIR / "models" / "password_strength_v1.forest"
 
-def extract_features(password: str):
-    """
-    Converts a text password into numerical features.
-    """
-    return [
-        len(password),                                      # Total Length
-        sum(c.isdigit() for c in password),                 # Count of numbers
-        sum(c.isupper() for c in password),                 # Count of Uppercase
-        sum(c.islower() for c in password),                 # Count of Lowercase
-        sum(c in string.punctuation for c in password),     # Count of Special chars
-        len(set(password))                                  # Count of Unique chars
-    ]
+# Synthetic password recipes: (label, alphabet, min length, max length).
+# Same distributions as generate_synthetic_data()
+WEAK_RECIPE = (0, string.ascii_lowercase + string.digits, 4, 8)
+STRONG_RECIPE = (1, string.ascii_letters + string.digits + string.punctuation, 12, 20)
+CHUNK_SAMPLES = 100_000  # rows per generation task; fixed so results do not depend on --jobs
+
+# Out-of-core training on password files (one password per line, .gz allowed)
+STREAM_CHUNK_LINES = 200_000  # passwords per training shard (half weak, half strong)
+STREAM_TREES_PER_SHARD = 10
+STREAM_MAX_TREES = 100        # trees kept in the final forest (reservoir sample over all shards)
+STREAM_HOLDOUT = 0.05         # fraction of distinct passwords held out for evaluation
 
 def generate_synthetic_data(n_samples=2000):
     """
@@ -51,17 +61,268 @@ def generate_synthetic_data(n_samples=2000):
         
     return np.array(data), np.array(labels)
 
+def _alphabet_classes(alphabet: str) -> np.ndarray:
+    """Character class (= feature column, see features.py) of every alphabet position."""
+    return np.array([char_class(c) for c in alphabet], dtype=np.int8)
+
+def _draw_passwords(rng, n, alphabet_size, min_len, max_len):
+    """
+    Random passwords as alphabet indices: an (n, max_len) uint8 matrix plus
+    the length of each row. Positions past a row's length are padding.
+    """
+    lengths = rng.integers(min_len, max_len + 1, size=n)
+    chars = rng.integers(0, alphabet_size, size=(n, max_len), dtype=np.uint8)
+    return chars, lengths
+
+def _features_from_indices(chars, lengths, classes):
+    """extract_features() for a whole matrix of alphabet indices, without building strings."""
+    n, max_len = chars.shape
+    valid = np.arange(max_len) < lengths[:, np.newaxis]
+    classes_per_char = np.where(valid, classes[chars], 0)
+
+    features = np.empty((n, N_FEATURES), dtype=np.int64)
+    features[:, 0] = lengths
+    for column in range(1, 5):
+        features[:, column] = np.count_nonzero(classes_per_char == column, axis=1)
+
+    # Unique chars: sort each row with padding pushed to the end, count value changes
+    ordered = np.sort(np.where(valid, chars, np.iinfo(np.uint16).max).astype(np.uint16), axis=1)
+    starts = np.ones_like(ordered, dtype=bool)
+    starts[:, 1:] = ordered[:, 1:] != ordered[:, :-1]
+    features[:, 5] = np.count_nonzero(starts & valid, axis=1)
+    return features
+
+def _synthetic_chunk(task):
+    """One generation task (runs in a worker process): features for `n` passwords of one recipe."""
+    recipe, n, seed_seq = task
+    _, alphabet, min_len, max_len = recipe
+    rng = np.random.default_rng(seed_seq)
+    chars, lengths = _draw_passwords(rng, n, len(alphabet), min_len, max_len)
+    return _features_from_indices(chars, lengths, _alphabet_classes(alphabet))
+
+def generate_synthetic_data_vectorized(n_samples=2000, seed=None, jobs=1):
+    """
+    Same dataset as generate_synthetic_data(), built with NumPy in bulk: random
+    bytes are mapped to character classes and the features are counted from
+    the class arrays directly. Work is split into fixed-size chunks spread
+    over `jobs` processes; a seed gives the same data whatever `jobs` is.
+    """
+    tasks = []
+    for recipe in (WEAK_RECIPE, STRONG_RECIPE):
+        remaining = n_samples // 2
+        while remaining > 0:
+            size = min(CHUNK_SAMPLES, remaining)
+            tasks.append((recipe, size))
+            remaining -= size
+    seeds = np.random.SeedSequence(seed).spawn(len(tasks))
+    tasks = [(recipe, size, seed_seq) for (recipe, size), seed_seq in zip(tasks, seeds)]
+
+    if jobs > 1 and len(tasks) > 1:
+        with ProcessPoolExecutor(max_workers=jobs) as pool:
+            chunks = list(pool.map(_synthetic_chunk, tasks))
+    else:
+        chunks = [_synthetic_chunk(task) for task in tasks]
+
+    if not chunks:
+        return np.empty((0, N_FEATURES), dtype=np.int64), np.empty(0, dtype=np.int64)
+    labels = [np.full(size, recipe[0], dtype=np.int64) for recipe, size, _ in tasks]
+    return np.concatenate(chunks), np.concatenate(labels)
+
+def iter_passwords(paths):
+    """Stream passwords from text files, one per line. Never holds a file in memory."""
+    for path in paths:
+        opener = gzip.open if str(path).endswith(".gz") else open
+        with opener(path, "rt", encoding="utf-8", errors="replace", newline="") as f:
+            for line in f:
+                password = line.rstrip("\r\n")
+                if password:
+                    yield password
+
+def in_holdout(password: str, holdout: float) -> bool:
+    """Stable train/holdout split by password hash: the same password always lands on the same side."""
+    return zlib.crc32(password.encode("utf-8")) < holdout * 2**32
+
+def _chunks(items, size):
+    while True:
+        chunk = list(itertools.islice(items, size))
+        if not chunk:
+            return
+        yield chunk
+
+def _training_chunks(paths, size, holdout):
+    """
+    Chunks of one corpus' training passwords, starting over at the end of
+    the corpus. Yields (chunk, number of full passes already completed).
+    """
+    passes = 0
+    while True:
+        passwords = (p for p in iter_passwords(paths) if not in_holdout(p, holdout))
+        empty = True
+        for chunk in _chunks(passwords, size):
+            empty = False
+            yield chunk, passes
+        if empty:
+            raise ValueError(f"No training passwords in {', '.join(map(str, paths))}")
+        passes += 1
+
+def iter_training_shards(weak_paths, strong_paths, chunk_lines=STREAM_CHUNK_LINES, holdout=STREAM_HOLDOUT):
+    """
+    Balanced (X, y) shards of chunk_lines rows, half from each corpus. The
+    smaller corpus is re-read as often as needed, so every line of the
+    larger one is used once.
+    """
+    weak = _training_chunks(weak_paths, chunk_lines // 2, holdout)
+    strong = _training_chunks(strong_paths, chunk_lines // 2, holdout)
+    while True:
+        (weak_chunk, weak_passes), (strong_chunk, strong_passes) = next(weak), next(strong)
+        if weak_passes and strong_passes:
+            return
+        X = np.concatenate([extract_features_batch(weak_chunk), extract_features_batch(strong_chunk)])
+        y = np.concatenate([np.zeros(len(weak_chunk), dtype=np.int64), np.ones(len(strong_chunk), dtype=np.int64)])
+        yield X, y
+
+def train_streaming(weak_paths, strong_paths, chunk_lines=STREAM_CHUNK_LINES,
+                    trees_per_shard=STREAM_TREES_PER_SHARD, max_trees=STREAM_MAX_TREES,
+                    holdout=STREAM_HOLDOUT, seed=42, n_jobs=None, max_shards=None):
+    """
+    Bagged forest over shards of corpora larger than RAM: every shard trains
+    a small forest, and a reservoir sample of at most max_trees trees over
+    all shards becomes the final RandomForestClassifier. Memory is bounded
+    by one shard plus max_trees trees, whatever the size of the files.
+    """
+    rng = np.random.default_rng(seed)
+    forest, kept, seen = None, [], 0
+    shards = iter_training_shards(weak_paths, strong_paths, chunk_lines, holdout)
+    for i, (X, y) in enumerate(itertools.islice(shards, max_shards)):
+        clf = RandomForestClassifier(n_estimators=trees_per_shard, random_state=seed + i, n_jobs=n_jobs)
+        clf.fit(X, y)
+        forest = forest or clf
+        for tree in clf.estimators_:
+            seen += 1
+            if len(kept) < max_trees:
+                kept.append(tree)
+            else:
+                slot = rng.integers(seen)
+                if slot < max_trees:
+                    kept[slot] = tree
+        print(f"   shard {i + 1}: {len(X):,} rows, keeping {len(kept)} of {seen} trees")
+
+    if forest is None:
+        raise ValueError("No training shards: are the password files empty?")
+    forest.estimators_ = kept
+    forest.n_estimators = len(kept)
+    return forest
+
+def evaluate_streaming(clf, weak_paths, strong_paths, chunk_lines=STREAM_CHUNK_LINES, holdout=STREAM_HOLDOUT):
+    """
+    Confusion counts on the held-out passwords, read in one more streaming
+    pass: counts[true label][predicted label], "Strong" meaning score > 0.5.
+    """
+    counts = np.zeros((2, 2), dtype=np.int64)
+    for label, paths in ((0, weak_paths), (1, strong_paths)):
+        passwords = (p for p in iter_passwords(paths) if in_holdout(p, holdout))
+        for chunk in _chunks(passwords, chunk_lines):
+            predicted = (clf.predict_proba(extract_features_batch(chunk))[:, 1] > 0.5).astype(np.int64)
+            counts[label] += np.bincount(predicted, minlength=2)
+    return counts
+
+def export_compiled_forest(clf, path=COMPILED_MODEL_PATH):
+    """
+    Flattens the fitted forest into the array format the API serves from
+    (see app/ml/forest.py) and checks it reproduces predict_proba exactly.
+    """
+    forest = CompiledForest.from_sklearn(clf)
+    probe = np.random.default_rng(0).integers(0, 40, size=(2000, clf.n_features_in_))
+    if not np.array_equal(forest.predict_proba(probe), clf.predict_proba(probe)):
+        raise RuntimeError("Compiled forest does not match predict_proba")
+    forest.save(path)
+    return forest
+
+def publish_model(clf, version=None, activate=True):
+    """
+    Writes the joblib model and its compiled forest as a registry version
+    (the next free one by default) and records it in the manifest.
+    Running API workers pick up an activated version without a restart.
+    """
+    version = version or model_registry.next_version()
+    # Both artifacts carry the feature schema; the API refuses a mismatch at load time
+    clf.feature_schema_version_ = FEATURE_SCHEMA_VERSION
+    files = {
+        "joblib": f"password_strength_{version}.joblib",
+        "forest": f"password_strength_{version}.forest",
+    }
+    MODELS_DIR.mkdir(parents=True, exist_ok=True)
+
+    # Save the model (uncompressed so it can be memory-mapped). Written
+    # aside and renamed, so workers mapping the old file are not disturbed
+    joblib_path = MODELS_DIR / files["joblib"]
+    partial = joblib_path.with_name(joblib_path.name + ".partial")
+    joblib.dump(clf, partial)
+    os.replace(partial, joblib_path)
+
+    export_compiled_forest(clf, MODELS_DIR / files["forest"])
+    model_registry.add_version(version, files, activate=activate)
+    return version
+
 if __name__ == "__main__":
-    print("🤖 Generating synthetic training data...")
-    X, y = generate_synthetic_data()
-    
-    print("🧠 Training Random Forest model...")
-    clf = RandomForestClassifier(n_estimators=100, random_state=42)
-    clf.fit(X, y)
-    
-    # Ensure directory exists
-    MODEL_PATH.parent.mkdir(parents=True, exist_ok=True)
-    
-    # Save the model
-    joblib.dump(clf, MODEL_PATH)
-    print(f"✅ Model saved to: {MODEL_PATH}")
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Train the password strength model.")
+    parser.add_argument("--export-only", action="store_true",
+                        help="skip training: compile and register the existing v1 joblib model")
+    parser.add_argument("--no-activate", action="store_true",
+                        help="register the new version without making it the active one")
+    parser.add_argument("--samples", type=int, default=2000, help="synthetic training rows")
+    parser.add_argument("--generator", choices=("vectorized", "python"), default="vectorized",
+                        help="NumPy bulk generation, or the original per-password loop")
+    parser.add_argument("--jobs", type=int, default=1, help="processes generating the data")
+    parser.add_argument("--n-jobs", type=int, default=None,
+                        help="sklearn n_jobs for training (-1 = all cores)")
+    parser.add_argument("--seed", type=int, default=None,
+                        help="seed for reproducible data and training (vectorized generator)")
+    stream = parser.add_argument_group("out-of-core training on password files")
+    stream.add_argument("--weak", nargs="+", metavar="FILE", help="weak passwords, one per line (.gz ok)")
+    stream.add_argument("--strong", nargs="+", metavar="FILE", help="strong passwords, one per line (.gz ok)")
+    stream.add_argument("--chunk-lines", type=int, default=STREAM_CHUNK_LINES, help="passwords per shard")
+    stream.add_argument("--trees-per-shard", type=int, default=STREAM_TREES_PER_SHARD)
+    stream.add_argument("--max-trees", type=int, default=STREAM_MAX_TREES, help="trees in the final forest")
+    stream.add_argument("--max-shards", type=int, default=None, help="stop after this many shards")
+    stream.add_argument("--holdout", type=float, default=STREAM_HOLDOUT,
+                        help="fraction of passwords held out for evaluation")
+    args = parser.parse_args()
+    if bool(args.weak) != bool(args.strong):
+        parser.error("--weak and --strong must be given together")
+
+    if args.export_only:
+        clf = joblib.load(MODEL_PATH)
+        version = "v1"
+    elif args.weak:
+        print(f"🧠 Training on {len(args.weak) + len(args.strong)} password files in shards "
+              f"of {args.chunk_lines:,}...")
+        seed = 42 if args.seed is None else args.seed
+        clf = train_streaming(args.weak, args.strong, args.chunk_lines, args.trees_per_shard, args.max_trees,
+                              args.holdout, seed=seed, n_jobs=args.n_jobs, max_shards=args.max_shards)
+        print("📊 Evaluating on the held-out passwords...")
+        counts = evaluate_streaming(clf, args.weak, args.strong, args.chunk_lines, args.holdout)
+        total = counts.sum()
+        if total:
+            print(f"   accuracy {np.trace(counts) / total:.4f} on {total:,} passwords "
+                  f"(weak recall {counts[0, 0] / max(counts[0].sum(), 1):.4f}, "
+                  f"strong recall {counts[1, 1] / max(counts[1].sum(), 1):.4f})")
+        else:
+            print("   no held-out passwords (is --holdout 0?)")
+        version = None
+    else:
+        print(f"🤖 Generating {args.samples:,} synthetic training samples ({args.generator})...")
+        if args.generator == "python":
+            X, y = generate_synthetic_data(args.samples)
+        else:
+            X, y = generate_synthetic_data_vectorized(args.samples, seed=args.seed, jobs=args.jobs)
+
+        print("🧠 Training Random Forest model...")
+        clf = RandomForestClassifier(n_estimators=100, random_state=42 if args.seed is None else args.seed,
+                                     n_jobs=args.n_jobs)
+        clf.fit(X, y)
+        version = None
+
+    version = publish_model(clf, version=version, activate=not args.no_activate)
+    state = "registered" if args.no_activate else "registered and active"
+    print(f"✅ Model {version} saved to {MODELS_DIR} ({state})")
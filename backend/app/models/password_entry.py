@@ -21,6 +21,8 @@ class PasswordEntry(Base):
     # 3. The Secret (Encrypted)
     # This stores the huge gibberish string returned by Fernet
     encrypted_password = Column(String, nullable=False) 
+    # Which key sealed it: 1 = global ENCRYPTION_KEY (legacy), 2 = the owner's data key
+    encryption_version = Column(Integer, nullable=False, default=2)
     
     # Optional category (e.g., "Social", "Work")
     category = Column(String, nullable=True)
@@ -28,6 +30,7 @@ class PasswordEntry(Base):
     # 4. Link to the User (The Foreign Key)
     # This says: "This entry belongs to the user with this ID"
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    owner = relationship("User", back_populates="passwords")
 
     # 5. Timestamps
     created_at = Column(DateTime, default=datetime.utcnow)
@@ -0,0 +1,38 @@
+"""Database model for refresh tokens.
+"""
+
+from datetime import datetime
+from sqlalchemy import Column, Integer, String, ForeignKey, DateTime
+
+from app.database.session import Base
+
+class RefreshToken(Base):
+    """
+    One refresh token. Only the SHA-256 of the secret is stored.
+
+    Every rotation of one login shares a family_id. A token is used once:
+    refreshing stamps used_at and issues the next token of the family.
+    Presenting a used token again means it was copied, so the whole family
+    is revoked (see TokenService.rotate).
+    """
+    __tablename__ = "refresh_tokens"
+
+    id = Column(Integer, primary_key=True, index=True)
+    token_hash = Column(String(64), unique=True, index=True, nullable=False)
+    family_id = Column(String(32), index=True, nullable=False)
+    user_id = Column(Integer, ForeignKey("users.id"), index=True, nullable=False)
+
+    # The access token issued together with this refresh token, so revoking
+    # the family can revoke it too
+    access_jti = Column(String(32), index=True, nullable=False)
+    access_expires_at = Column(DateTime, index=True, nullable=False)
+
+    created_at = Column(DateTime, default=datetime.utcnow)
+    # The end of the login session: rotated tokens inherit it
+    expires_at = Column(DateTime, index=True, nullable=False)
+    used_at = Column(DateTime, nullable=True)
+    revoked_at = Column(DateTime, nullable=True, index=True)
+
+
+    def __repr__(self):
+        return f"<RefreshToken(id={self.id}, user_id={self.user_id}, family_id={self.family_id})>"
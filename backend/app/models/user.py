@@ -23,6 +23,8 @@ class User(Base):
     # Securtiy Fieds
     # NOTE: This is the hashed master password
     hashed_master_password = Column(String, nullable=False)
+    # This user's data key, encrypted by the key-encryption key (see app/core/envelope.py)
+    wrapped_data_key = Column(String, nullable=True)
 
     is_active = Column(Boolean, default=True)
     is_superuser = Column(Boolean, default=False)
@@ -37,6 +37,39 @@ class Token(BaseModel):
     """
     access_token: str
     token_type: str = "bearer"
+    # Trade it at /api/auth/refresh for the next pair instead of logging in again
+    refresh_token: Optional[str] = None
+    expires_in: Optional[int] = None    # access token lifetime in seconds
+
+
+# --- 3b. Refresh / Logout Request Body (Input) ---
+class RefreshRequest(BaseModel):
+    """
+    Schema for renewing tokens (and for ending a session at logout).
+    """
+    refresh_token: str = Field(..., min_length=1, max_length=200)
+
+# --- 3c. Account Changes (Input) ---
+class PasswordChange(BaseModel):
+    """
+    Schema for changing the master password (the current one is required).
+    """
+    current_master_password: str = Field(..., max_length=100)
+    new_master_password: str = Field(..., min_length=12, max_length=100)
+
+
+class AccountDelete(BaseModel):
+    """
+    Schema for deleting one's own account (confirmed with the master password).
+    """
+    master_password: str = Field(..., max_length=100)
+
+
+class ActiveUpdate(BaseModel):
+    """
+    Schema for an admin deactivating (or reactivating) an account.
+    """
+    is_active: bool
 
 # --- 4. Token Payload Data (Internal) ---
 class TokenData(BaseModel):
@@ -4,16 +4,141 @@ Uses K-Anonymity model to securely check passwords.
 
 """
 
+import asyncio
 import hashlib
 import httpx
-import logging 
+import logging
+import time
+from collections import deque
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from app.config import settings
+from app.services.breach_filter import BreachFilter, BreachFilterError
+from app.services.breach_index import BreachIndex, BreachIndexError
+from app.services.range_cache import DiskRangeCache, MemoryRangeCache, RangeBlock
 
 #Logger is configured to use what is happening
 logger = logging.getLogger(__name__)
 
+class BreachLookupError(Exception):
+    """A breach lookup could not be completed (as opposed to 'not breached')."""
+
+
+class CircuitBreaker:
+    """
+    Stops calling the API after repeated failures.
+
+    closed    -> calls go through; `failure_threshold` failures in a row open it
+    open      -> calls fail immediately for `reset_seconds`
+    half_open -> one probe call is let through; success closes, failure re-opens
+    """
+
+    def __init__(self, failure_threshold: int, reset_seconds: float):
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self.state = "closed"
+        self.failures = 0
+        self.trips = 0
+        self.rejections = 0
+        self._opened_at = 0.0
+        self._probe_started_at: Optional[float] = None
+
+    def allow(self) -> bool:
+        now = time.monotonic()
+        if self.state == "open" and now - self._opened_at >= self.reset_seconds:
+            self.state = "half_open"
+            self._probe_started_at = None
+        if self.state == "half_open":
+            # A probe that never reported back (e.g. cancelled) does not block forever
+            if self._probe_started_at is None or now - self._probe_started_at >= self.reset_seconds:
+                self._probe_started_at = now
+                return True
+        if self.state == "closed":
+            return True
+        self.rejections += 1
+        return False
+
+    def record_success(self):
+        self.state = "closed"
+        self.failures = 0
+        self._probe_started_at = None
+
+    def record_failure(self):
+        self.failures += 1
+        if self.state == "half_open" or self.failures >= self.failure_threshold:
+            if self.state != "open":
+                self.trips += 1
+            self.state = "open"
+            self._opened_at = time.monotonic()
+            self._probe_started_at = None
+
+    def stats(self) -> dict:
+        return {
+            "state": self.state,
+            "consecutive_failures": self.failures,
+            "trips": self.trips,
+            "rejections": self.rejections,
+        }
+
+
+class LatencyTracker:
+    """Rolling window of successful fetch latencies, used to time hedged requests."""
+
+    MIN_SAMPLES = 20
+
+    def __init__(self, size: int = 200):
+        self._samples = deque(maxlen=size)
+
+    def add(self, seconds: float):
+        self._samples.append(seconds)
+
+    def percentile(self, pct: float) -> Optional[float]:
+        if len(self._samples) < self.MIN_SAMPLES:
+            return None
+        ordered = sorted(self._samples)
+        return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100.0))]
+
+
 class BreachChecker:
     """Service to check credentials against public breach databases using K-Anonymity."""
-    HIBP_PASSWORD_API =  "https://api.pwnedpasswords.com/range/"
+    HIBP_PASSWORD_API = settings.HIBP_API_URL
+    MODES = ("online", "offline", "hybrid")
+
+    def __init__(self):
+        # One long-lived client for the whole process. Reusing it keeps TCP/TLS
+        # connections alive between lookups instead of re-handshaking every call.
+        self._client: Optional[httpx.AsyncClient] = None
+
+        # Range cache tiers. The disk tier is opened in startup() because it touches the filesystem.
+        self._memory_cache: Optional[MemoryRangeCache] = None
+        self._disk_cache: Optional[DiskRangeCache] = None
+        if settings.HIBP_CACHE_ENABLED:
+            self._memory_cache = MemoryRangeCache(
+                settings.HIBP_MEMORY_CACHE_SIZE,
+                settings.HIBP_CACHE_TTL_SECONDS,
+                settings.HIBP_CACHE_STALE_SECONDS,
+            )
+
+        # Local memory-mapped index, used in "offline" and "hybrid" mode
+        self.mode = settings.BREACH_CHECK_MODE
+        self._index: Optional[BreachIndex] = None
+
+        # Optional Bloom filter that short-circuits definite misses
+        self._filter: Optional[BreachFilter] = None
+
+        # Single-flight: one pending load per prefix, shared by every concurrent caller
+        self._inflight: Dict[str, "asyncio.Task[RangeBlock]"] = {}
+        self.range_loads = 0
+        self.coalesced_waiters = 0
+
+        # Resilience: circuit breaker, hedged requests, stale-while-revalidate
+        self._breaker = CircuitBreaker(settings.HIBP_BREAKER_FAILURE_THRESHOLD, settings.HIBP_BREAKER_RESET_SECONDS)
+        self._latencies = LatencyTracker()
+        self._revalidating: Dict[str, "asyncio.Task[RangeBlock]"] = {}
+        self.hedges_sent = 0
+        self.hedges_won = 0
+        self.stale_served = 0
+        self.revalidation_failures = 0
 
     @staticmethod
     def _sha1_hash(password: str) -> str:
@@ -21,47 +146,367 @@ class BreachChecker:
         sha1 = hashlib.sha1(password.encode("utf-8")).hexdigest()
         return sha1.upper()
 
-    
-    async def check_password_breach(self, password: str) -> int:
-        """Check if a password has been breached using HIBP API.
-        Returns the Number of Times it has been seen"""
+    @staticmethod
+    def _build_client() -> httpx.AsyncClient:
+        """Create the pooled HTTP client from the HIBP_* settings."""
+        http2 = settings.HIBP_HTTP2
+        if http2:
+            try:
+                import h2  # noqa: F401  (httpx needs it for HTTP/2)
+            except ImportError:
+                logger.warning("HIBP_HTTP2 is enabled but 'h2' is not installed. Falling back to HTTP/1.1.")
+                http2 = False
 
-        #1. Hash the Password
-        full_hash = self._sha1_hash(password)
+        return httpx.AsyncClient(
+            http2=http2,
+            limits=httpx.Limits(
+                max_connections=settings.HIBP_MAX_CONNECTIONS,
+                max_keepalive_connections=settings.HIBP_MAX_KEEPALIVE_CONNECTIONS,
+                keepalive_expiry=settings.HIBP_KEEPALIVE_EXPIRY,
+            ),
+            timeout=httpx.Timeout(
+                connect=settings.HIBP_CONNECT_TIMEOUT,
+                read=settings.HIBP_READ_TIMEOUT,
+                write=settings.HIBP_WRITE_TIMEOUT,
+                pool=settings.HIBP_POOL_TIMEOUT,
+            ),
+            headers={"User-Agent": f"{settings.APP_NAME}/{settings.APP_VERSION}"},
+        )
 
-        #2. Split: First 5 chars (prefix) and the rest (suffix)
-        prefix = full_hash[:5]
-        suffix = full_hash[5:]
+    async def startup(self):
+        """Open the shared HTTP client, caches and index (called from the FastAPI startup hook)."""
+        if self.mode not in self.MODES:
+            raise ValueError(f"BREACH_CHECK_MODE must be one of {self.MODES}, got {self.mode!r}")
 
-        #3. Query the HIBP API with the prefix
+        if self.mode != "online" and self._index is None:
+            try:
+                self._index = BreachIndex(settings.BREACH_INDEX_PATH)
+                logger.info(f"Breach index loaded: {self._index.count:,} hashes from {settings.BREACH_INDEX_PATH}")
+            except BreachIndexError as e:
+                if self.mode == "offline":
+                    logger.error(f"{e}. Breach checks will fail until an index is built.")
+                else:
+                    logger.warning(f"{e}. Falling back to the online API.")
+
+        if settings.BREACH_FILTER_PATH and self._filter is None:
+            try:
+                self._filter = BreachFilter(settings.BREACH_FILTER_PATH)
+                logger.info(f"Breach filter loaded from {settings.BREACH_FILTER_PATH}")
+            except BreachFilterError as e:
+                logger.warning(f"{e}. Every check will go to the full lookup.")
+
+        if self._client is None:
+            self._client = self._build_client()
+
+        if settings.HIBP_CACHE_ENABLED and settings.HIBP_DISK_CACHE_PATH and self._disk_cache is None:
+            try:
+                self._disk_cache = DiskRangeCache(
+                    settings.HIBP_DISK_CACHE_PATH,
+                    settings.HIBP_DISK_CACHE_MAX_ENTRIES,
+                    settings.HIBP_CACHE_TTL_SECONDS,
+                    settings.HIBP_CACHE_STALE_SECONDS,
+                )
+            except Exception as e:
+                logger.error(f"Could not open breach range cache at {settings.HIBP_DISK_CACHE_PATH}: {e}")
+
+    async def shutdown(self):
+        """Close the shared HTTP client and its pooled connections."""
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+        if self._disk_cache is not None:
+            self._disk_cache.close()
+            self._disk_cache = None
+        if self._index is not None:
+            self._index.close()
+            self._index = None
+        if self._filter is not None:
+            self._filter.close()
+            self._filter = None
+
+    def _get_client(self) -> httpx.AsyncClient:
+        """Return the shared client, creating it lazily when used outside the app lifecycle."""
+        if self._client is None:
+            self._client = self._build_client()
+        return self._client
+
+
+    async def _fetch_once(self, prefix: str) -> RangeBlock:
+        """One GET for a 5-char prefix against the HIBP API."""
         url = f"{self.HIBP_PASSWORD_API}{prefix}"
+        started = time.monotonic()
+        response = await self._get_client().get(url)
+        response.raise_for_status()
+        self._latencies.add(time.monotonic() - started)
+        # The API retirns lines like: "SUFFIX:COUNT"
+        return RangeBlock.from_text(prefix, response.text)
+
+    def _hedge_delay(self) -> Optional[float]:
+        """How long to wait before sending a hedge request (None = don't hedge)."""
+        if not settings.HIBP_HEDGE_ENABLED:
+            return None
+        threshold = self._latencies.percentile(settings.HIBP_HEDGE_PERCENTILE)
+        if threshold is None:
+            return None
+        return max(threshold, settings.HIBP_HEDGE_MIN_DELAY)
+
+    async def _fetch_hedged(self, prefix: str) -> RangeBlock:
+        """
+        Fetch a range, sending one extra GET if the first is slower than usual.
+        Whichever succeeds first wins; the other is cancelled.
+        """
+        delay = self._hedge_delay()
+        if delay is None:
+            return await self._fetch_once(prefix)
 
+        tasks = [asyncio.ensure_future(self._fetch_once(prefix))]
         try:
-            async with httpx.AsyncClient() as client:
-                response = await client.get(url, timeout=10.0)
-                response.raise_for_status()
+            done, _ = await asyncio.wait(tasks, timeout=delay)
+            if not done:
+                self.hedges_sent += 1
+                tasks.append(asyncio.ensure_future(self._fetch_once(prefix)))
 
-                #4. Process the response (list of suffixes)
-                # The API retirns lines like: "SUFFIX:COUNT" "1E4C9"
-                hashes = (line.split(":") for line in response.text.splitlines())
+            pending = set(tasks)
+            error: Optional[BaseException] = None
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        if task is not tasks[0]:
+                            self.hedges_won += 1
+                        return task.result()
+                    error = error or task.exception()
+            raise error
+        finally:
+            for task in tasks:
+                if not task.done():
+                    task.cancel()
 
-                #5. Check if our suffix is in the returned list
+    @staticmethod
+    def _is_upstream_failure(error: Exception) -> bool:
+        """Errors that mean HIBP is unhealthy (as opposed to a bad request)."""
+        if isinstance(error, httpx.HTTPStatusError):
+            code = error.response.status_code
+            return code >= 500 or code == 429
+        return isinstance(error, (httpx.RequestError, asyncio.TimeoutError))
 
-                for h_suffix, count in hashes:
-                    if  h_suffix == suffix:
-                        logger.warning(f"Password found in breach database {count} times.")
-                        return int(count)  
-            
-            return 0 # Not found
+    async def _fetch_range(self, prefix: str) -> RangeBlock:
+        """Download and parse a range, guarded by the circuit breaker and an overall deadline."""
+        if not self._breaker.allow():
+            raise BreachLookupError("Breach API is unavailable (circuit open)")
+        try:
+            block = await asyncio.wait_for(self._fetch_hedged(prefix), settings.HIBP_TOTAL_TIMEOUT)
+        except Exception as e:
+            if self._is_upstream_failure(e):
+                self._breaker.record_failure()
+            else:
+                self._breaker.record_success()  # the API answered, just not with a range
+            raise
+        self._breaker.record_success()
+        return block
 
-        except httpx.RequestError as e:
-            logger.error(f"Network error checking breach API: {e}")
-            return 0
+    async def _get_range(self, prefix: str) -> RangeBlock:
+        """Return the range for a prefix: memory cache, then disk cache, then the API."""
+        if self._memory_cache is not None:
+            cached = self._memory_cache.get(prefix)
+            if cached is not None:
+                block, _, fresh = cached
+                if not fresh:
+                    # Stale-while-revalidate: answer now, refresh in the background
+                    self.stale_served += 1
+                    self._revalidate(prefix)
+                return block
+
+        # Coalesce concurrent misses for the same prefix into a single load.
+        # The load runs as its own task, so a caller that gets cancelled (e.g. the
+        # client disconnected) does not cancel it for everyone else.
+        task = self._inflight.get(prefix)
+        if task is None:
+            self.range_loads += 1
+            task = asyncio.ensure_future(self._load_range(prefix))
+            self._inflight[prefix] = task
+            task.add_done_callback(lambda t: self._finish_load(self._inflight, prefix, t))
+        else:
+            self.coalesced_waiters += 1
+        return await asyncio.shield(task)
+
+    @staticmethod
+    def _finish_load(registry: dict, prefix: str, task: "asyncio.Task[RangeBlock]"):
+        if registry.get(prefix) is task:
+            del registry[prefix]
+        if not task.cancelled():
+            task.exception()  # mark as retrieved even if every waiter went away
+
+    def _revalidate(self, prefix: str):
+        """Refresh a stale range in the background (at most one refresh per prefix)."""
+        if prefix in self._revalidating or prefix in self._inflight:
+            return
+        task = asyncio.ensure_future(self._refresh_range(prefix))
+        self._revalidating[prefix] = task
+        task.add_done_callback(lambda t: self._finish_load(self._revalidating, prefix, t))
+
+    async def _refresh_range(self, prefix: str) -> RangeBlock:
+        """Fetch a range from the API and store it in both cache tiers."""
+        try:
+            block = await self._fetch_range(prefix)
         except Exception as e:
-            logger.error(f"Unexpected error in breach checker: {e}")
+            self.revalidation_failures += 1
+            logger.warning(f"Could not refresh breach range: {self._describe_error(e)}")
+            raise
+
+        if self._memory_cache is not None:
+            self._memory_cache.put(prefix, block)
+        if self._disk_cache is not None:
+            try:
+                await asyncio.to_thread(self._disk_cache.put, prefix, block)
+            except Exception as e:
+                logger.error(f"Breach range cache write failed: {e}")
+        return block
+
+    async def _load_range(self, prefix: str) -> RangeBlock:
+        """Memory-cache miss path: disk cache, then the API."""
+        if self._disk_cache is not None:
+            try:
+                cached = await asyncio.to_thread(self._disk_cache.get, prefix)
+            except Exception as e:
+                logger.error(f"Breach range cache read failed: {e}")
+                cached = None
+            if cached is not None:
+                block, fetched_at, fresh = cached
+                if self._memory_cache is not None:
+                    self._memory_cache.put(prefix, block, fetched_at)
+                if not fresh:
+                    self.stale_served += 1
+                    self._revalidate(prefix)
+                return block
+
+        return await self._refresh_range(prefix)
+
+    def _lookup_locally(self, digest: bytes) -> Optional[int]:
+        """
+        Answer from the Bloom filter or the offline index.
+        Returns None when the online API has to be asked.
+        """
+        if self._filter is not None and not self._filter.might_contain(digest):
             return 0
-        
+        if self._index is not None:
+            return self._index.lookup(digest)
+        if self.mode == "offline":
+            raise BreachLookupError("BREACH_CHECK_MODE is 'offline' but no breach index is loaded")
+        return None
+
+    @staticmethod
+    def _describe_error(error: Exception) -> str:
+        """Short, client-safe reason for a failed lookup."""
+        if isinstance(error, httpx.HTTPStatusError):
+            return f"Breach API returned HTTP {error.response.status_code}"
+        if isinstance(error, (httpx.TimeoutException, asyncio.TimeoutError)):
+            return "Breach API timed out"
+        if isinstance(error, httpx.RequestError):
+            return "Breach API unreachable"
+        if isinstance(error, BreachLookupError):
+            return str(error)
+        return "Unexpected error during breach lookup"
+
+    async def check_password_breach(self, password: str) -> Optional[int]:
+        """Check if a password has been breached using HIBP API.
+        Returns the Number of Times it has been seen, or None if it could
+        not be checked (API down and nothing cached)."""
+
+        #1. Hash the Password
+        full_hash = self._sha1_hash(password)
+        digest = bytes.fromhex(full_hash)
+
+        try:
+            #2. Bloom filter / offline index. Nothing leaves the process.
+            count = self._lookup_locally(digest)
+            if count is None:
+                #3. Online: only the first 5 chars (prefix) are sent,
+                # then we binary search the returned range for our full hash
+                block = await self._get_range(full_hash[:5])
+                count = block.lookup(digest)
+
+            if count:
+                logger.warning(f"Password found in breach database {count} times.")
+            return count
+
+        except Exception as e:
+            logger.error(f"Breach check failed: {self._describe_error(e)}")
+            return None
+
+    async def check_passwords_breach(self, passwords: Sequence[str]) -> List[dict]:
+        """
+        Check many passwords at once.
+
+        Passwords sharing a 5-char prefix are answered from a single range
+        fetch, and distinct prefixes are fetched concurrently (bounded by
+        HIBP_BATCH_CONCURRENCY). Returns one dict per input, in input order:
+        {"breach_count": int or None, "error": str or None}
+        """
+        results: List[Optional[dict]] = [None] * len(passwords)
+        by_prefix: Dict[str, List[Tuple[int, bytes]]] = {}
+
+        #1. Hash everything and answer what we can locally
+        for i, password in enumerate(passwords):
+            full_hash = self._sha1_hash(password)
+            digest = bytes.fromhex(full_hash)
+            try:
+                count = self._lookup_locally(digest)
+            except Exception as e:
+                results[i] = {"breach_count": None, "error": self._describe_error(e)}
+                continue
+            if count is None:
+                by_prefix.setdefault(full_hash[:5], []).append((i, digest))
+            else:
+                results[i] = {"breach_count": count, "error": None}
+
+        #2. Fetch each distinct prefix once, a few at a time
+        semaphore = asyncio.Semaphore(settings.HIBP_BATCH_CONCURRENCY)
+
+        async def resolve(prefix: str, items: List[Tuple[int, bytes]]):
+            try:
+                async with semaphore:
+                    block = await self._get_range(prefix)
+            except Exception as e:
+                reason = self._describe_error(e)
+                logger.error(f"Breach lookup failed for {len(items)} batch item(s): {reason}")
+                for i, _ in items:
+                    results[i] = {"breach_count": None, "error": reason}
+                return
+            for i, digest in items:
+                results[i] = {"breach_count": block.lookup(digest), "error": None}
+
+        await asyncio.gather(*(resolve(prefix, items) for prefix, items in by_prefix.items()))
+        return results
+
+    def stats(self) -> dict:
+        """Lookup mode, index, cache and resilience counters (None when a part is disabled)."""
+        return {
+            "mode": self.mode,
+            "index_hashes": self._index.count if self._index else None,
+            "filter": self._filter.stats() if self._filter else None,
+            "memory_cache": self._memory_cache.stats() if self._memory_cache else None,
+            "disk_cache": self._disk_cache.stats() if self._disk_cache else None,
+            "single_flight": {
+                "range_loads": self.range_loads,
+                "coalesced_waiters": self.coalesced_waiters,
+                "in_flight": len(self._inflight),
+            },
+            "circuit_breaker": self._breaker.stats(),
+            "hedging": {
+                "enabled": settings.HIBP_HEDGE_ENABLED,
+                "delay_seconds": self._hedge_delay(),
+                "sent": self.hedges_sent,
+                "won": self.hedges_won,
+            },
+            "stale_while_revalidate": {
+                "stale_served": self.stale_served,
+                "revalidating": len(self._revalidating),
+                "revalidation_failures": self.revalidation_failures,
+            },
+        }
+
 # Export Instance
 breach_checker = BreachChecker()
- 
+
 
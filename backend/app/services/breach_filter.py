@@ -0,0 +1,205 @@
+"""
+Breach Bloom Filter
+Compact pre-screen that answers "definitely not breached" without a lookup.
+
+The filter is built from the breach corpus (a HIBP text dump or an offline
+index) and memory-mapped at startup. A miss is certain, a hit only means
+"maybe", so the authoritative lookup still runs for those.
+
+File layout (little-endian): 64-byte header (magic, version, k, m bits, n items)
+followed by the m-bit array.
+
+Build one with:
+  python -m app.services.breach_filter build ./data/pwned_sha1.idx ./data/pwned_sha1.bloom --fp-rate 0.01
+"""
+
+import argparse
+import math
+import mmap
+import struct
+import time
+from pathlib import Path
+from typing import Tuple
+
+from app.services.breach_index import MAGIC as INDEX_MAGIC, RECORDS_OFFSET, RECORD_SIZE, HEADER as INDEX_HEADER
+
+MAGIC = b"PWNDBLM1"
+VERSION = 1
+HEADER = struct.Struct("<8sIIQQ32x")   # magic, version, k, m (bits), n (items)
+CHUNK = 1_000_000                       # digests per vectorised build step
+
+
+class BreachFilterError(Exception):
+    """Raised when a filter file is missing, corrupt or cannot be built."""
+
+
+def optimal_parameters(n_items: int, fp_rate: float, max_bytes: int = 0) -> Tuple[int, int, float]:
+    """
+    Size a filter for `n_items` at `fp_rate`, capped at `max_bytes` (0 = no cap).
+    Returns (m bits, k hashes, expected false-positive rate).
+    """
+    n_items = max(n_items, 1)
+    m = math.ceil(-n_items * math.log(fp_rate) / (math.log(2) ** 2))
+    if max_bytes and m > max_bytes * 8:
+        m = max_bytes * 8
+    m = max(64, (m + 7) // 8 * 8)
+    k = max(1, round(m / n_items * math.log(2)))
+    expected = (1 - math.exp(-k * n_items / m)) ** k
+    return m, k, expected
+
+
+def _positions(digest: bytes, k: int, m: int):
+    """
+    Bit positions for a SHA-1 digest (double hashing). The digest is already
+    uniformly random, so its first 16 bytes serve as the two base hashes.
+    """
+    a = int.from_bytes(digest[0:8], "little") % m
+    b = (int.from_bytes(digest[8:16], "little") | 1) % m
+    for _ in range(k):
+        yield a
+        a = (a + b) % m
+
+
+class BreachFilter:
+    """Read-only, memory-mapped Bloom filter with short-circuit counters."""
+
+    def __init__(self, path: str):
+        self.path = path
+        try:
+            self._file = open(path, "rb")
+        except OSError as e:
+            raise BreachFilterError(f"Cannot open breach filter {path}: {e}") from e
+        try:
+            self._mm = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        except (OSError, ValueError) as e:
+            # An empty file cannot be mapped
+            self._file.close()
+            raise BreachFilterError(f"Cannot open breach filter {path}: {e}") from e
+
+        try:
+            magic, version, self.k, self.m, self.n = HEADER.unpack_from(self._mm, 0)
+        except struct.error as e:
+            # Shorter than the header, e.g. a truncated build
+            self.close()
+            raise BreachFilterError(f"{path} is not a breach filter: {e}") from e
+        if magic != MAGIC or version != VERSION or len(self._mm) != HEADER.size + self.m // 8:
+            self.close()
+            raise BreachFilterError(f"{path} is not a version {VERSION} breach filter")
+
+        self.checks = 0
+        self.short_circuits = 0
+
+    def might_contain(self, digest: bytes) -> bool:
+        """False means the digest is definitely not in the corpus."""
+        self.checks += 1
+        mm = self._mm
+        for pos in _positions(digest, self.k, self.m):
+            if not mm[HEADER.size + (pos >> 3)] & (1 << (pos & 7)):
+                self.short_circuits += 1
+                return False
+        return True
+
+    def close(self):
+        self._mm.close()
+        self._file.close()
+
+    def stats(self) -> dict:
+        expected = (1 - math.exp(-self.k * self.n / self.m)) ** self.k
+        return {
+            "path": self.path,
+            "items": self.n,
+            "size_bytes": self.m // 8,
+            "hashes": self.k,
+            "expected_fp_rate": expected,
+            "checks": self.checks,
+            "short_circuits": self.short_circuits,
+            "short_circuit_ratio": self.short_circuits / self.checks if self.checks else 0.0,
+        }
+
+
+# --- Build tool ---
+
+def _digest_chunks_from_dump(source: str):
+    """Yield uint8 arrays of shape (n, 20) from a 'HASH:COUNT' text dump."""
+    import numpy as np
+
+    with open(source, "r", encoding="ascii") as f:
+        while True:
+            lines = f.readlines(CHUNK * 50)
+            if not lines:
+                return
+            hex_digests = "".join(line[:40] for line in lines if line.strip())
+            yield np.frombuffer(bytes.fromhex(hex_digests), dtype=np.uint8).reshape(-1, 20)
+
+
+def _digest_chunks_from_index(source: str):
+    """Yield uint8 arrays of shape (n, 20) straight out of an offline index file."""
+    import numpy as np
+
+    with open(source, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        count = INDEX_HEADER.unpack_from(mm, 0)[3]
+        records = np.frombuffer(mm, dtype=np.uint8, offset=RECORDS_OFFSET, count=count * RECORD_SIZE)
+        records = records.reshape(-1, RECORD_SIZE)
+        for start in range(0, count, CHUNK):
+            yield np.array(records[start:start + CHUNK, :20])
+        del records
+
+
+def _count_items(source: str, is_index: bool) -> int:
+    if is_index:
+        with open(source, "rb") as f:
+            return INDEX_HEADER.unpack(f.read(INDEX_HEADER.size))[3]
+    with open(source, "rb") as f:
+        return sum(1 for line in f if line.strip())
+
+
+def build_filter(source: str, target: str, fp_rate: float = 0.01, max_bytes: int = 0) -> dict:
+    """
+    Build a filter file from a text dump or an offline index. Input is streamed
+    in chunks; the bit array (the filter itself) is the only large allocation.
+    """
+    import numpy as np
+
+    with open(source, "rb") as f:
+        is_index = f.read(len(INDEX_MAGIC)) == INDEX_MAGIC
+
+    n_items = _count_items(source, is_index)
+    m, k, expected = optimal_parameters(n_items, fp_rate, max_bytes)
+    bits = np.zeros(m // 8, dtype=np.uint8)
+
+    chunks = _digest_chunks_from_index(source) if is_index else _digest_chunks_from_dump(source)
+    for digests in chunks:
+        # Same arithmetic as _positions(), kept below 2**64 so uint64 never wraps
+        a = digests[:, 0:8].copy().view("<u8").ravel() % np.uint64(m)
+        b = (digests[:, 8:16].copy().view("<u8").ravel() | np.uint64(1)) % np.uint64(m)
+        for _ in range(k):
+            np.bitwise_or.at(bits, a >> np.uint64(3), np.left_shift(1, (a & np.uint64(7))).astype(np.uint8))
+            a = (a + b) % np.uint64(m)
+
+    target_path = Path(target)
+    target_path.parent.mkdir(parents=True, exist_ok=True)
+    with open(target_path, "wb") as out:
+        out.write(HEADER.pack(MAGIC, VERSION, k, m, n_items))
+        out.write(bits.tobytes())
+
+    return {"items": n_items, "size_bytes": m // 8, "hashes": k, "expected_fp_rate": expected}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build a Bloom filter pre-screen for breach checks.")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    build_cmd = commands.add_parser("build", help="build from a 'HASH:COUNT' dump or an offline index")
+    build_cmd.add_argument("source")
+    build_cmd.add_argument("target")
+    build_cmd.add_argument("--fp-rate", type=float, default=0.01, help="target false-positive rate")
+    build_cmd.add_argument("--max-mb", type=float, default=0, help="memory budget for the filter (0 = unlimited)")
+
+    args = parser.parse_args()
+    print(f"🧮 Building breach filter from {args.source} ...")
+    started = time.time()
+    info = build_filter(args.source, args.target, args.fp_rate, int(args.max_mb * 1024 * 1024))
+    print(f"✅ {info['items']:,} items, {info['size_bytes'] / 1e6:.1f} MB, k={info['hashes']}, "
+          f"expected false-positive rate {info['expected_fp_rate']:.4%} ({time.time() - started:.1f}s)")
+    if info["expected_fp_rate"] > args.fp_rate * 1.01:
+        print("⚠️ The memory budget is too small for the requested false-positive rate.")
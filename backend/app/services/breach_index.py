@@ -0,0 +1,236 @@
+"""
+Offline Breach Index
+A local, memory-mapped copy of the Pwned Passwords SHA-1 list.
+
+File layout (all integers little-endian):
+  header   64 bytes   magic, version, record count
+  fan-out  65537 x u64  index of the first record for each 2-byte digest prefix
+  records  N x 24 bytes 20-byte SHA-1 digest + u32 count, sorted by digest
+
+The importer streams the downloadable "HASH:COUNT" text dump in constant
+memory. Build an index with:
+  python -m app.services.breach_index build pwnedpasswords.txt ./data/pwned_sha1.idx
+"""
+
+import argparse
+import heapq
+import mmap
+import os
+import struct
+import tempfile
+import time
+from pathlib import Path
+from typing import Iterator, List, Tuple
+
+MAGIC = b"PWNDIDX1"
+VERSION = 1
+HEADER = struct.Struct("<8sIIQ40x")          # magic, version, record size, record count
+FANOUT_ENTRIES = 1 << 16                      # buckets keyed by the first 2 digest bytes
+FANOUT_OFFSET = HEADER.size
+RECORDS_OFFSET = FANOUT_OFFSET + (FANOUT_ENTRIES + 1) * 8
+RECORD = struct.Struct("<20sI")
+RECORD_SIZE = RECORD.size
+MAX_COUNT = 0xFFFFFFFF
+
+# Records held in memory per sorted run when the input is not already sorted (~130 MB)
+DEFAULT_RUN_SIZE = 2_000_000
+
+
+class BreachIndexError(Exception):
+    """Raised when an index file is missing, corrupt or cannot be built."""
+
+
+class BreachIndex:
+    """Read-only view over an index file. Lookups are a binary search inside one fan-out bucket."""
+
+    def __init__(self, path: str):
+        self.path = path
+        try:
+            self._file = open(path, "rb")
+        except OSError as e:
+            raise BreachIndexError(f"Cannot open breach index {path}: {e}") from e
+
+        try:
+            self._mm = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+            magic, version, record_size, count = HEADER.unpack_from(self._mm, 0)
+        except (ValueError, struct.error) as e:
+            self._file.close()
+            raise BreachIndexError(f"{path} is not a breach index: {e}") from e
+
+        if magic != MAGIC or version != VERSION or record_size != RECORD_SIZE:
+            self.close()
+            raise BreachIndexError(f"{path} is not a version {VERSION} breach index")
+        if len(self._mm) != RECORDS_OFFSET + count * RECORD_SIZE:
+            self.close()
+            raise BreachIndexError(f"{path} is truncated")
+        self.count = count
+
+    def lookup(self, digest: bytes) -> int:
+        """Return the breach count for a 20-byte SHA-1 digest (0 if absent)."""
+        mm = self._mm
+        lo, hi = struct.unpack_from("<QQ", mm, FANOUT_OFFSET + ((digest[0] << 8) | digest[1]) * 8)
+        while lo < hi:
+            mid = (lo + hi) >> 1
+            offset = RECORDS_OFFSET + mid * RECORD_SIZE
+            probe = mm[offset:offset + 20]
+            if probe < digest:
+                lo = mid + 1
+            elif probe > digest:
+                hi = mid
+            else:
+                return int.from_bytes(mm[offset + 20:offset + RECORD_SIZE], "little")
+        return 0
+
+    def close(self):
+        self._mm.close()
+        self._file.close()
+
+
+# --- Importer ---
+
+def _parse_dump(source: str) -> Iterator[Tuple[bytes, int]]:
+    """Yield (digest, count) from a 'HASH:COUNT' text dump, one line at a time."""
+    with open(source, "r", encoding="ascii", errors="replace") as f:
+        for line_no, line in enumerate(f, 1):
+            line = line.strip()
+            if not line:
+                continue
+            hex_hash, _, count = line.partition(":")
+            if len(hex_hash) != 40:
+                raise BreachIndexError(f"{source}:{line_no}: expected a 40-char SHA-1 hash, got {hex_hash[:48]!r}")
+            try:
+                yield bytes.fromhex(hex_hash), min(int(count or 1), MAX_COUNT)
+            except ValueError as e:
+                raise BreachIndexError(f"{source}:{line_no}: {e}") from e
+
+
+class _UnsortedInput(Exception):
+    """Internal signal: the dump is not ordered by hash, fall back to an external sort."""
+
+
+def _write_index(records: Iterator[Tuple[bytes, int]], target: str, progress_every: int) -> int:
+    """Write sorted records to `target`. Raises _UnsortedInput if they are out of order."""
+    buckets = [0] * FANOUT_ENTRIES
+    count = 0
+    previous = b""
+    pending = None  # (digest, count) not yet written, so duplicates can be merged
+    started = time.time()
+
+    with open(target, "wb") as out:
+        out.seek(RECORDS_OFFSET)
+        pack = RECORD.pack
+        for digest, seen in records:
+            if digest < previous:
+                raise _UnsortedInput()
+            if digest == previous:
+                pending = (digest, min(pending[1] + seen, MAX_COUNT))
+                continue
+            if pending is not None:
+                out.write(pack(*pending))
+            pending = (digest, seen)
+            previous = digest
+            buckets[(digest[0] << 8) | digest[1]] += 1
+            count += 1
+            if progress_every and count % progress_every == 0:
+                print(f"   ... {count:,} hashes ({count / (time.time() - started):,.0f}/s)")
+        if pending is not None:
+            out.write(pack(*pending))
+
+        # Fan-out: cumulative start index of every bucket, plus the total at the end
+        fanout = [0] * (FANOUT_ENTRIES + 1)
+        for i, size in enumerate(buckets):
+            fanout[i + 1] = fanout[i] + size
+        out.seek(0)
+        out.write(HEADER.pack(MAGIC, VERSION, RECORD_SIZE, count))
+        out.write(struct.pack(f"<{FANOUT_ENTRIES + 1}Q", *fanout))
+    return count
+
+
+def _read_run(path: str) -> Iterator[Tuple[bytes, int]]:
+    with open(path, "rb") as f:
+        while True:
+            chunk = f.read(RECORD_SIZE * 4096)
+            if not chunk:
+                return
+            yield from RECORD.iter_unpack(chunk)
+
+
+def _sorted_runs(source: str, run_size: int, tmp_dir: str) -> List[str]:
+    """Split the dump into sorted binary runs of at most `run_size` records each."""
+    runs = []
+    batch = []  # packed records: they sort by digest because the digest comes first
+
+    def flush():
+        batch.sort()
+        fd, run_path = tempfile.mkstemp(suffix=".run", dir=tmp_dir)
+        with os.fdopen(fd, "wb") as f:
+            f.write(b"".join(batch))
+        runs.append(run_path)
+        batch.clear()
+
+    pack = RECORD.pack
+    for digest, seen in _parse_dump(source):
+        batch.append(pack(digest, seen))
+        if len(batch) >= run_size:
+            flush()
+    if batch:
+        flush()
+    return runs
+
+
+def build_index(source: str, target: str, run_size: int = DEFAULT_RUN_SIZE, progress_every: int = 10_000_000) -> int:
+    """
+    Convert a HIBP 'HASH:COUNT' dump into an index file. Returns the number of hashes.
+
+    Dumps ordered by hash are written in a single streaming pass. Anything else
+    (e.g. the older "ordered by prevalence" files) goes through an external
+    merge sort with at most `run_size` records in memory.
+    """
+    target_path = Path(target)
+    target_path.parent.mkdir(parents=True, exist_ok=True)
+    partial = str(target_path) + ".partial"
+
+    try:
+        try:
+            count = _write_index(_parse_dump(source), partial, progress_every)
+        except _UnsortedInput:
+            print("   Input is not ordered by hash, switching to external sort...")
+            with tempfile.TemporaryDirectory(dir=target_path.parent) as tmp_dir:
+                runs = _sorted_runs(source, run_size, tmp_dir)
+                print(f"   Merging {len(runs)} sorted run(s)...")
+                merged = heapq.merge(*(_read_run(run) for run in runs))
+                count = _write_index(merged, partial, progress_every)
+        os.replace(partial, target_path)
+    finally:
+        if os.path.exists(partial):
+            os.remove(partial)
+    return count
+
+
+if __name__ == "__main__":
+    import hashlib
+
+    parser = argparse.ArgumentParser(description="Build or query an offline Pwned Passwords index.")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    build_cmd = commands.add_parser("build", help="import a 'HASH:COUNT' SHA-1 dump")
+    build_cmd.add_argument("source", help="text dump downloaded from Have I Been Pwned")
+    build_cmd.add_argument("target", help="index file to write")
+    build_cmd.add_argument("--run-size", type=int, default=DEFAULT_RUN_SIZE,
+                           help="records per in-memory sort run for unsorted input")
+
+    check_cmd = commands.add_parser("check", help="look up a password in an index")
+    check_cmd.add_argument("index")
+    check_cmd.add_argument("password")
+
+    args = parser.parse_args()
+    if args.command == "build":
+        print(f"📥 Importing {args.source} ...")
+        started = time.time()
+        total = build_index(args.source, args.target, run_size=args.run_size)
+        print(f"✅ Indexed {total:,} hashes into {args.target} in {time.time() - started:.1f}s")
+    else:
+        index = BreachIndex(args.index)
+        seen = index.lookup(hashlib.sha1(args.password.encode("utf-8")).digest())
+        print(f"Seen {seen} times" if seen else "Not found")
+        index.close()
@@ -6,7 +6,7 @@ from sqlalchemy.orm import Session
 
 from app.models.password_entry import PasswordEntry
 from app.schema.password import PasswordCreate, PasswordUpdate
-from app.core.security import encryption_manager
+from app.core.security import ENVELOPE_ENCRYPTION_VERSION, encryption_manager
 
 class PasswordService:
     """
@@ -44,8 +44,8 @@ class PasswordService:
         
         CRITICAL: Encrypts the plain text password before saving.
         """
-        # 1. Encrypt the plain text password
-        encrypted_blob = encryption_manager.encrypt(password_in.password)
+        # 1. Encrypt the plain text password (with the user's own data key)
+        encrypted_blob = encryption_manager.encrypt_for_user(db, user_id, password_in.password)
         
         # 2. Create the database model
         db_password = PasswordEntry(
@@ -53,6 +53,7 @@ class PasswordService:
             username=password_in.username,
             category=password_in.category,
             encrypted_password=encrypted_blob, # Store ciphertext
+            encryption_version=ENVELOPE_ENCRYPTION_VERSION,
             user_id=user_id # Link to the logged-in user
         )
         
@@ -81,10 +82,11 @@ class PasswordService:
         
         # Special handling if the user is changing the password
         if "password" in update_data:
-            # Encrypt the NEW password
-            encrypted_blob = encryption_manager.encrypt(update_data["password"])
+            # Encrypt the NEW password (a legacy entry moves to the data key here too)
+            encrypted_blob = encryption_manager.encrypt_for_user(db, db_password.user_id, update_data["password"])
             # Update the specific DB field
             db_password.encrypted_password = encrypted_blob
+            db_password.encryption_version = ENVELOPE_ENCRYPTION_VERSION
             # Remove 'password' from update_data so we don't try to save it to a non-existent column
             del update_data["password"]
             
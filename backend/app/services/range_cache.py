@@ -0,0 +1,239 @@
+"""
+HIBP Range Cache
+Caches parsed range responses so popular prefixes are downloaded once.
+
+Tier 1: bounded in-process LRU with TTL (one per worker).
+Tier 2: SQLite file on disk, shared by every uvicorn worker and kept across restarts.
+
+Entries older than the TTL are still returned for `stale_seconds` more, flagged
+as not fresh, so the checker can serve them while it revalidates.
+"""
+
+import array
+import logging
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+DIGEST_SIZE = 20  # SHA-1 digest length in bytes
+
+
+class RangeBlock:
+    """
+    One parsed range response in compact form.
+
+    `digests` holds the full 20-byte SHA-1 digests back to back, sorted,
+    and `counts` the matching breach counts, so a lookup is a binary search
+    over fixed-width records instead of re-splitting the response text.
+    """
+    __slots__ = ("digests", "counts")
+
+    def __init__(self, digests: bytes, counts: array.array):
+        self.digests = digests
+        self.counts = counts
+
+    @classmethod
+    def from_text(cls, prefix: str, text: str) -> "RangeBlock":
+        """Parse an API body of 'SUFFIX:COUNT' lines for the given 5-char prefix."""
+        rows = []
+        for line in text.splitlines():
+            suffix, _, count = line.partition(":")
+            if not count:
+                continue
+            count = int(count)
+            if count == 0:
+                # Padding entries (Add-Padding header) are never real hashes
+                continue
+            rows.append((bytes.fromhex(prefix + suffix.strip()), count))
+        rows.sort()
+        return cls(b"".join(d for d, _ in rows), array.array("I", (c for _, c in rows)))
+
+    @classmethod
+    def from_bytes(cls, digests: bytes, counts: bytes) -> "RangeBlock":
+        """Rebuild a block from its stored form (see `counts_bytes`)."""
+        parsed = array.array("I")
+        parsed.frombytes(counts)
+        return cls(digests, parsed)
+
+    def counts_bytes(self) -> bytes:
+        # Native byte order: the disk cache is local to one machine
+        return self.counts.tobytes()
+
+    def __len__(self) -> int:
+        return len(self.counts)
+
+    def lookup(self, digest: bytes) -> int:
+        """Return the breach count for a full 20-byte digest (0 if absent)."""
+        data = self.digests
+        lo, hi = 0, len(self.counts)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            probe = data[mid * DIGEST_SIZE:(mid + 1) * DIGEST_SIZE]
+            if probe < digest:
+                lo = mid + 1
+            elif probe > digest:
+                hi = mid
+            else:
+                return self.counts[mid]
+        return 0
+
+
+class MemoryRangeCache:
+    """Bounded LRU of RangeBlocks with a TTL. Only used from the event loop."""
+
+    def __init__(self, max_entries: int, ttl_seconds: float, stale_seconds: float = 0):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.stale_seconds = stale_seconds
+        self._entries: "OrderedDict[str, Tuple[float, RangeBlock]]" = OrderedDict()
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, prefix: str) -> Optional[Tuple[RangeBlock, float, bool]]:
+        """Return (block, fetched_at, fresh) or None."""
+        entry = self._entries.get(prefix)
+        if entry is None:
+            self.misses += 1
+            return None
+
+        fetched_at, block = entry
+        age = time.time() - fetched_at
+        if age > self.ttl_seconds + self.stale_seconds:
+            del self._entries[prefix]
+            self.expirations += 1
+            self.misses += 1
+            return None
+
+        self._entries.move_to_end(prefix)
+        fresh = age <= self.ttl_seconds
+        if fresh:
+            self.hits += 1
+        else:
+            self.stale_hits += 1
+        return block, fetched_at, fresh
+
+    def put(self, prefix: str, block: RangeBlock, fetched_at: Optional[float] = None):
+        self._entries[prefix] = (fetched_at or time.time(), block)
+        self._entries.move_to_end(prefix)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def stats(self) -> dict:
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "stale_hits": self.stale_hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+        }
+
+
+class DiskRangeCache:
+    """
+    SQLite-backed range store keyed by prefix.
+
+    WAL mode lets every worker read concurrently while one writes. Calls are
+    blocking, so the checker runs them in a worker thread. Counters are per
+    process.
+    """
+
+    TRIM_EVERY = 256  # puts between size checks
+
+    def __init__(self, path: str, max_entries: int, ttl_seconds: float, stale_seconds: float = 0):
+        self.path = path
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.stale_seconds = stale_seconds
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self._puts = 0
+        self._lock = threading.Lock()
+
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(path, timeout=5.0, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS hibp_ranges ("
+            " prefix TEXT PRIMARY KEY,"
+            " fetched_at REAL NOT NULL,"
+            " digests BLOB NOT NULL,"
+            " counts BLOB NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS ix_hibp_ranges_fetched_at ON hibp_ranges (fetched_at)")
+
+    def get(self, prefix: str) -> Optional[Tuple[RangeBlock, float, bool]]:
+        """Return (block, fetched_at, fresh) or None."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT fetched_at, digests, counts FROM hibp_ranges WHERE prefix = ?", (prefix,)
+            ).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+
+            fetched_at, digests, counts = row
+            age = time.time() - fetched_at
+            if age > self.ttl_seconds + self.stale_seconds:
+                self._conn.execute("DELETE FROM hibp_ranges WHERE prefix = ?", (prefix,))
+                self.expirations += 1
+                self.misses += 1
+                return None
+
+            fresh = age <= self.ttl_seconds
+            if fresh:
+                self.hits += 1
+            else:
+                self.stale_hits += 1
+            return RangeBlock.from_bytes(digests, counts), fetched_at, fresh
+
+    def put(self, prefix: str, block: RangeBlock, fetched_at: Optional[float] = None):
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO hibp_ranges (prefix, fetched_at, digests, counts) VALUES (?, ?, ?, ?)",
+                (prefix, fetched_at or time.time(), block.digests, block.counts_bytes()),
+            )
+            self._puts += 1
+            if self._puts % self.TRIM_EVERY == 0:
+                self._trim()
+
+    def _trim(self):
+        """Drop the oldest ranges once the store grows past max_entries."""
+        (total,) = self._conn.execute("SELECT COUNT(*) FROM hibp_ranges").fetchone()
+        excess = total - self.max_entries
+        if excess > 0:
+            self._conn.execute(
+                "DELETE FROM hibp_ranges WHERE prefix IN "
+                "(SELECT prefix FROM hibp_ranges ORDER BY fetched_at LIMIT ?)",
+                (excess,),
+            )
+            self.evictions += excess
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    def stats(self) -> dict:
+        return {
+            "path": self.path,
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "stale_hits": self.stale_hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+        }
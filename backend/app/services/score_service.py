@@ -35,19 +35,17 @@ class ScoreService:
         plain_passwords = []
         weak_count = 0
         
-        for entry in entries:
-            try:
-                # Decrypt
-                plain = encryption_manager.decrypt(entry.encrypted_password)
-                plain_passwords.append(plain)
-                
-                # Simple strength check (Phase 4 rules)
-                # (In Phase 5, we will replace this with the ML model!)
-                if len(plain) < 10:
-                    weak_count += 1
-            except Exception:
-                # If decryption fails for some reason, skip
+        # One bulk call for the whole vault (spread over the pool for big vaults)
+        for result in encryption_manager.decrypt_entries(db, entries):
+            # If decryption fails for some reason, skip
+            if not result.ok:
                 continue
+            plain_passwords.append(result.value)
+
+            # Simple strength check (Phase 4 rules)
+            # (In Phase 5, we will replace this with the ML model!)
+            if len(result.value) < 10:
+                weak_count += 1
                 
         # 3. Check for Reuse
         # Counter creates a map: {'pass123': 2, 'secure': 1}
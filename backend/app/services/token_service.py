@@ -0,0 +1,244 @@
+"""
+Token services - access/refresh token pairs, rotation and revocation
+
+A login (bcrypt) yields a short-lived access token and a refresh token.
+Renewing the access token afterwards costs a SHA-256, two indexed queries
+and an HMAC signature, never a master password verification. Clients
+therefore pay bcrypt once per REFRESH_TOKEN_EXPIRE_DAYS, not once per
+ACCESS_TOKEN_EXPIRE_MINUTES.
+
+Refresh tokens are opaque random strings; only their SHA-256 is stored.
+Each one works once: /refresh marks it used and returns the next token of
+the same family. If a used token comes back, a copy is in someone else's
+hands, so every token of the family is revoked, including the access
+tokens issued with them (app/core/revocation.py).
+"""
+
+import asyncio
+import hashlib
+import secrets
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import or_
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.core.jwt import create_access_token
+from app.core.revocation import RevocationSet, revoked_tokens
+from app.database.session import SessionLocal
+from app.models.refresh_token import RefreshToken
+from app.models.user import User
+
+
+def _epoch(moment: datetime) -> float:
+    """Naive UTC datetime (how the models store time) -> epoch seconds."""
+    return moment.replace(tzinfo=timezone.utc).timestamp()
+
+
+class TokenService:
+    """Issues, rotates and revokes token pairs"""
+
+    # Rows whose session and access token have both ended are deleted this often
+    PURGE_INTERVAL = timedelta(hours=1)
+
+    def __init__(self, revocations: Optional[RevocationSet] = None):
+        self.revocations = revoked_tokens if revocations is None else revocations
+        self._sync_task: Optional[asyncio.Task] = None
+        self._next_purge = datetime.utcnow()
+        self.issued = 0
+        self.rotated = 0
+        self.reuse_detected = 0
+
+    @staticmethod
+    def _hash(refresh_token: str) -> str:
+        return hashlib.sha256(refresh_token.encode("utf-8")).hexdigest()
+
+    def _find(self, db: Session, refresh_token: str) -> Optional[RefreshToken]:
+        return db.query(RefreshToken).filter(RefreshToken.token_hash == self._hash(refresh_token)).first()
+
+    # --- Issuing ---
+    def _add_pair(self, db: Session, user_id: int, family_id: str, session_ends: datetime) -> dict:
+        """Stage a new access/refresh pair in `db`; the caller commits."""
+        access_lifetime = timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
+        jti = secrets.token_hex(16)
+        access_token = create_access_token(
+            data={"sub": str(user_id), "jti": jti},
+            expires_delta=access_lifetime
+        )
+        refresh_token = secrets.token_urlsafe(32)
+        db.add(RefreshToken(
+            token_hash=self._hash(refresh_token),
+            family_id=family_id,
+            user_id=user_id,
+            access_jti=jti,
+            access_expires_at=datetime.utcnow() + access_lifetime,
+            expires_at=session_ends,
+        ))
+        self.issued += 1
+        return {
+            "access_token": access_token,
+            "token_type": "bearer",
+            "refresh_token": refresh_token,
+            "expires_in": int(access_lifetime.total_seconds()),
+        }
+
+    def issue(self, db: Session, user_id: int) -> dict:
+        """A new login session: the first pair of a new family."""
+        session_ends = datetime.utcnow() + timedelta(days=settings.REFRESH_TOKEN_EXPIRE_DAYS)
+        pair = self._add_pair(db, user_id, secrets.token_hex(16), session_ends)
+        db.commit()
+        return pair
+
+    def rotate(self, db: Session, refresh_token: str) -> Optional[dict]:
+        """
+        Trade a refresh token for the next pair of its family.
+
+        Returns None for unknown, expired or revoked tokens, and for tokens
+        already used. The last case revokes the whole family.
+        """
+        token = self._find(db, refresh_token)
+        now = datetime.utcnow()
+        if token is None or token.revoked_at is not None or token.expires_at <= now:
+            return None
+
+        # Claim it: of two requests racing with the same token, one wins
+        claimed = db.query(RefreshToken).filter(
+            RefreshToken.id == token.id,
+            RefreshToken.used_at.is_(None),
+            RefreshToken.revoked_at.is_(None),
+        ).update({RefreshToken.used_at: now}, synchronize_session=False)
+        if claimed != 1:
+            db.rollback()
+            self.reuse_detected += 1
+            self.revoke_family(db, token.family_id)
+            return None
+
+        if not db.query(User.is_active).filter(User.id == token.user_id).scalar():
+            db.rollback()
+            return None
+
+        pair = self._add_pair(db, token.user_id, token.family_id, token.expires_at)
+        db.commit()
+        self.rotated += 1
+        return pair
+
+    # --- Revoking ---
+    def _revoke_rows(self, db: Session, tokens) -> int:
+        now = datetime.utcnow()
+        for token in tokens:
+            if token.revoked_at is None:
+                token.revoked_at = now
+            if token.access_expires_at > now:
+                self.revocations.revoke(token.access_jti, _epoch(token.access_expires_at))
+        db.commit()
+        return len(tokens)
+
+    def revoke_family(self, db: Session, family_id: str) -> int:
+        """End one login session: its refresh tokens and live access tokens."""
+        tokens = db.query(RefreshToken).filter(RefreshToken.family_id == family_id).all()
+        return self._revoke_rows(db, tokens)
+
+    def revoke_user(self, db: Session, user_id: int, delete: bool = False) -> int:
+        """
+        End every session of a user (deactivation, password change).
+
+        With delete=True the rows are removed afterwards, for account
+        deletion. Other workers then only learn of it through the principal
+        cache, within PRINCIPAL_CACHE_TTL_SECONDS.
+        """
+        now = datetime.utcnow()
+        tokens = db.query(RefreshToken).filter(
+            RefreshToken.user_id == user_id,
+            or_(RefreshToken.revoked_at.is_(None), RefreshToken.access_expires_at > now),
+        ).all()
+        count = self._revoke_rows(db, tokens)
+        if delete:
+            db.query(RefreshToken).filter(RefreshToken.user_id == user_id).delete(synchronize_session=False)
+            db.commit()
+        return count
+
+    def logout(self, db: Session, claims: dict, refresh_token: Optional[str] = None):
+        """End the session the access token (and optionally the refresh token) belongs to."""
+        jti = claims.get("jti")
+        if jti:
+            self.revocations.revoke(jti, claims.get("exp", 0))
+            token = db.query(RefreshToken).filter(RefreshToken.access_jti == jti).first()
+            if token is not None:
+                self.revoke_family(db, token.family_id)
+        if refresh_token:
+            token = self._find(db, refresh_token)
+            # Only the owner may end a session with its refresh token
+            if token is not None and str(token.user_id) == claims.get("sub"):
+                self.revoke_family(db, token.family_id)
+
+    # --- Keeping every worker's revocation set current ---
+    def sync(self, db: Session) -> int:
+        """Load every revocation whose access token is still alive. Cheap: at most one access lifetime's worth."""
+        now = datetime.utcnow()
+        rows = db.query(RefreshToken.access_jti, RefreshToken.access_expires_at).filter(
+            RefreshToken.revoked_at.isnot(None),
+            RefreshToken.access_expires_at > now,
+        ).all()
+        for jti, access_expires_at in rows:
+            self.revocations.revoke(jti, _epoch(access_expires_at))
+        if now >= self._next_purge:
+            self.purge(db)
+        return len(rows)
+
+    def purge(self, db: Session) -> int:
+        """Delete rows that can no longer refresh anything nor be revoked."""
+        now = datetime.utcnow()
+        deleted = db.query(RefreshToken).filter(
+            RefreshToken.expires_at <= now,
+            RefreshToken.access_expires_at <= now,
+        ).delete(synchronize_session=False)
+        db.commit()
+        self._next_purge = now + self.PURGE_INTERVAL
+        self.revocations.purge()
+        return deleted
+
+    def _sync_in_new_session(self) -> int:
+        db = SessionLocal()
+        try:
+            return self.sync(db)
+        finally:
+            db.close()
+
+    async def start(self):
+        """Load revocations, then keep reloading them (called from the FastAPI startup hook)."""
+        await run_in_threadpool(self._sync_in_new_session)
+        if settings.REVOCATION_SYNC_SECONDS > 0 and self._sync_task is None:
+            self._sync_task = asyncio.ensure_future(self._sync_loop())
+
+    async def _sync_loop(self):
+        while True:
+            await asyncio.sleep(settings.REVOCATION_SYNC_SECONDS)
+            try:
+                await run_in_threadpool(self._sync_in_new_session)
+            except Exception as e:
+                # Keep the last known set; the next round tries again
+                print(f"⚠️ Revocation sync failed: {e}")
+
+    async def stop(self):
+        if self._sync_task is not None:
+            self._sync_task.cancel()
+            try:
+                await self._sync_task
+            except asyncio.CancelledError:
+                pass
+            self._sync_task = None
+
+    def stats(self) -> dict:
+        return {
+            "issued": self.issued,
+            "rotated": self.rotated,
+            "reuse_detected": self.reuse_detected,
+            "revocations": self.revocations.stats(),
+            "sync_seconds": settings.REVOCATION_SYNC_SECONDS,
+        }
+
+
+# Export instance
+token_service = TokenService()
@@ -2,39 +2,65 @@
 User services - Business logic for user management
 """
 
+import asyncio
+import logging
+from typing import Optional, Set
+from fastapi.concurrency import run_in_threadpool
 from sqlalchemy.orm import Session
+from app.config import settings
+from app.database.session import SessionLocal
 from app.models.user import User
 from app.schema.auth import UserRegister
-from app.core.hashing import hasher
+from app.core.hashing import HashingBusy, bcrypt_pool, hasher
+from app.core.envelope import data_key_manager
+from app.core.principals import principal_cache
+from app.services.token_service import token_service
+
+logger = logging.getLogger(__name__)
 
 class UserService:
     """Services class for managing CRUD operations """
+    # Rehashes to the current BCRYPT_ROUNDS run after the login response;
+    # the set keeps the running tasks referenced until they finish
+    _rehash_tasks: Set[asyncio.Task] = set()
+    rehashed = 0
+    rehash_skipped = 0
+    rehash_failed = 0
+
+    @staticmethod
+    def get_user_by_id(db: Session, user_id: int):
+        """Fetch a user by primary key"""
+        return db.query(User).filter(User.id == user_id).first()
+
     @staticmethod
     def get_user_by_email(db: Session, email: str):
         """Fetch a user by email"""
         return db.query(User).filter(User.email == email).first()
     
+    @staticmethod
     def get_user_by_username(db: Session, username: str):
         """Fetch a user by username"""
         return db.query(User).filter(User.username == username).first()
 
     @staticmethod
-    def create_user(db: Session, user_in: UserRegister):
+    def create_user(db: Session, user_in: UserRegister, hashed_password: Optional[str] = None):
         """
         Create a new user in the database.
         
-        1. Hashes the master password using Bcrypt.
+        1. Hashes the master password using Bcrypt (unless the caller already did, off the event loop).
         2. Creates the User database object.
         3. Saves it to the database.
         """
         # 1. Hash the password using our security utility
-        hashed_password = hasher.get_password_hash(user_in.master_password)
+        hashed_password = hashed_password or hasher.get_password_hash(user_in.master_password)
         
         # 2. Create the User model instance
         db_user = User(
             email=user_in.email,
             username=user_in.username,
-            hashed_password=hashed_password
+            hashed_master_password=hashed_password,
+            # A fresh data key for the vault, wrapped by the key-encryption key
+            wrapped_data_key=data_key_manager.new_wrapped_key(),
             # is_active and is_superuser default to standard values defined in the Model
         )
         
@@ -47,6 +73,43 @@ class UserService:
         
         return db_user
     
+    # --- Account changes: each one drops the cached principal (see app/core/principals.py)
+    # and, except reactivation, ends the user's login sessions (see app/services/token_service.py) ---
+    @staticmethod
+    def set_active(db: Session, user: User, is_active: bool) -> User:
+        """Deactivate (or reactivate) an account; its tokens stop working at once on this worker."""
+        user.is_active = is_active
+        db.commit()
+        principal_cache.invalidate(user.id)
+        if not is_active:
+            token_service.revoke_user(db, user.id)
+        return user
+
+    @staticmethod
+    def change_master_password(db: Session, user: User, hashed_master_password: str) -> User:
+        """
+        Store a new master password hash and end every login session.
+
+        The caller hashes on bcrypt_pool first (see POST /api/auth/change-password).
+        """
+        user.hashed_master_password = hashed_master_password
+        db.commit()
+        principal_cache.invalidate(user.id)
+        token_service.revoke_user(db, user.id)
+        return user
+
+    @staticmethod
+    def delete_user(db: Session, user: User):
+        """Delete an account together with its vault entries, sessions and cached keys."""
+        user_id = user.id
+        token_service.revoke_user(db, user_id, delete=True)
+        for entry in user.passwords:
+            db.delete(entry)
+        db.delete(user)
+        db.commit()
+        principal_cache.invalidate(user_id)
+        data_key_manager.forget(user_id)
+
     @staticmethod
     def authenticate_user(db: Session, username: str, master_password: str):
         """
@@ -56,9 +119,100 @@ class UserService:
         """
         user = UserService.get_user_by_username(db, username)
         if not user:
+            # Same bcrypt time as a wrong password: no username probing by timing
+            hasher.verify_dummy(master_password)
+            return None
+        if not user.verify_master_password(master_password):
+            return None
+        return user
+
+    @staticmethod
+    def _fetch_user(username: str):
+        """
+        Look the user up on a short-lived session of its own. Logins can
+        wait seconds in the bcrypt queue, and holding a pooled DB
+        connection meanwhile would let a login flood drain the pool the
+        vault routes need. The user comes back detached, attributes loaded.
+        """
+        db = SessionLocal()
+        try:
+            return UserService.get_user_by_username(db, username)
+        finally:
+            db.close()
+
+    @staticmethod
+    async def authenticate_user_async(username: str, master_password: str):
+        """
+        Same as authenticate_user, for async routes: the lookup runs in the
+        threadpool and bcrypt on its own pool. Raises HashingBusy when that
+        pool's queue is full, before any database work.
+        """
+        bcrypt_pool.check_capacity()
+        user = await run_in_threadpool(UserService._fetch_user, username)
+        if not user:
+            await bcrypt_pool.verify_dummy(master_password)
             return None
-        if not hasher.verify_master_password(master_password):
+        if not await bcrypt_pool.verify(master_password, user.hashed_master_password):
             return None
+        if settings.BCRYPT_REHASH_ON_LOGIN and hasher.needs_update(user.hashed_master_password):
+            UserService._schedule_rehash(user, master_password)
         return user
+
+    @staticmethod
+    def _schedule_rehash(user: User, master_password: str):
+        """Upgrade the user's hash to the current cost without delaying the login."""
+        task = asyncio.get_running_loop().create_task(
+            UserService._rehash(user.id, user.hashed_master_password, master_password)
+        )
+        UserService._rehash_tasks.add(task)
+        task.add_done_callback(UserService._rehash_tasks.discard)
+
+    @staticmethod
+    async def _rehash(user_id: int, old_hash: str, master_password: str):
+        try:
+            new_hash = await bcrypt_pool.hash(master_password)
+            stored = await run_in_threadpool(UserService._store_rehash, user_id, old_hash, new_hash)
+        except HashingBusy:
+            # Logins come first; the next successful login tries again
+            UserService.rehash_skipped += 1
+            return
+        except Exception as e:
+            # Nobody awaits this task: a locked database or a pool shut down
+            # mid-rehash must be counted and logged here. The old hash stays valid.
+            UserService.rehash_failed += 1
+            logger.error(f"Rehash for user {user_id} failed: {e!r}")
+            return
+        if stored:
+            UserService.rehashed += 1
+
+    @staticmethod
+    def _store_rehash(user_id: int, old_hash: str, new_hash: str) -> bool:
+        """
+        Swap in the new hash only if the stored one is still the hash that
+        was verified, so a password change made meanwhile is never undone.
+        """
+        db = SessionLocal()
+        try:
+            updated = db.query(User).filter(
+                User.id == user_id, User.hashed_master_password == old_hash
+            ).update(
+                # A rehash is not an account change: keep updated_at
+                {User.hashed_master_password: new_hash, User.updated_at: User.updated_at},
+                synchronize_session=False,
+            )
+            db.commit()
+            return updated == 1
+        finally:
+            db.close()
+
+    @staticmethod
+    def rehash_stats() -> dict:
+        return {
+            "rounds": settings.BCRYPT_ROUNDS,
+            "rehashed": UserService.rehashed,
+            "skipped_busy": UserService.rehash_skipped,
+            "failed": UserService.rehash_failed,
+            "in_progress": len(UserService._rehash_tasks),
+        }
     
 user_service = UserService()
\ No newline at end of file
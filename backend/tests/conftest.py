@@ -0,0 +1,29 @@
+"""
+Shared pytest setup.
+
+Makes `app` importable, gives app.config throwaway secrets and a scratch
+database (via scripts/bench_common, which the benchmarks use too), and
+provides the same local stand-in for the HIBP range API.
+"""
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+import pytest
+
+SCRIPTS_DIR = Path(__file__).resolve().parent.parent.parent / "scripts"
+sys.path.insert(0, str(SCRIPTS_DIR))
+
+import bench_common  # noqa: E402,F401  (import path + throwaway secrets)
+from bench_common import RangeServer  # noqa: E402
+
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{tempfile.mkdtemp()}/test.db")
+
+
+@pytest.fixture
+def range_server():
+    """A local HIBP range API; `breached` passwords report the given counts."""
+    server = RangeServer(breached={"password123": 251682, "letmein": 68})
+    with server:
+        yield server
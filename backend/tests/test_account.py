@@ -0,0 +1,137 @@
+"""
+Account changes through the API: a password change, account deletion and an
+admin deactivation end every session, and master passwords are only ever
+hashed or checked on bcrypt_pool (HashingBusy -> 503).
+"""
+import uuid
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.config import settings
+from app.core.hashing import HashingBusy, bcrypt_pool
+from app.core.principals import principal_cache
+from app.database.session import SessionLocal
+from app.main import app
+from app.models.user import User
+
+MASTER = "correct-horse-battery-staple"
+NEW_MASTER = "another-long-master-password"
+
+
+@pytest.fixture(scope="module")
+def client():
+    with TestClient(app) as client:
+        yield client
+
+
+@pytest.fixture(autouse=True)
+def cheap_bcrypt(monkeypatch):
+    # The cost is not under test; the lowest one keeps the suite quick
+    monkeypatch.setattr(settings, "BCRYPT_ROUNDS", 4)
+    monkeypatch.setattr(settings, "BCRYPT_REHASH_ON_LOGIN", False)
+
+
+def register(client, password: str = MASTER) -> str:
+    name = f"user-{uuid.uuid4().hex[:8]}"
+    r = client.post("/api/auth/register", json={"username": name, "email": f"{name}@example.com",
+                                                 "master_password": password})
+    assert r.status_code == 201, r.text
+    return name
+
+
+def login(client, name: str, password: str = MASTER):
+    return client.post("/api/auth/token", data={"username": name, "password": password})
+
+
+def auth(pair: dict) -> dict:
+    return {"Authorization": f"Bearer {pair['access_token']}"}
+
+
+def vault_status(client, pair: dict) -> int:
+    return client.get("/api/passwords/", headers=auth(pair)).status_code
+
+
+def test_change_password_ends_every_session(client):
+    name = register(client)
+    sessions = [login(client, name).json() for _ in range(2)]
+    completed = bcrypt_pool.completed
+
+    r = client.post("/api/auth/change-password", headers=auth(sessions[0]),
+                    json={"current_master_password": MASTER, "new_master_password": NEW_MASTER})
+    assert r.status_code == 204, r.text
+    assert bcrypt_pool.completed == completed + 2  # verify the current one, hash the new one
+
+    for pair in sessions:
+        assert vault_status(client, pair) == 401
+        assert client.post("/api/auth/refresh", json={"refresh_token": pair["refresh_token"]}).status_code == 401
+    assert login(client, name).status_code == 401
+    assert login(client, name, NEW_MASTER).status_code == 200
+
+
+def test_change_password_requires_the_current_one(client):
+    name = register(client)
+    pair = login(client, name).json()
+    r = client.post("/api/auth/change-password", headers=auth(pair),
+                    json={"current_master_password": "not-the-master-password", "new_master_password": NEW_MASTER})
+    assert r.status_code == 400
+    assert vault_status(client, pair) == 200
+    assert login(client, name).status_code == 200
+
+
+def test_change_password_is_refused_when_the_pool_is_full(client, monkeypatch):
+    name = register(client)
+    pair = login(client, name).json()
+
+    def full():
+        raise HashingBusy()
+    monkeypatch.setattr(bcrypt_pool, "check_capacity", full)
+    r = client.post("/api/auth/change-password", headers=auth(pair),
+                    json={"current_master_password": MASTER, "new_master_password": NEW_MASTER})
+    assert r.status_code == 503 and r.headers["Retry-After"] == "1"
+    assert vault_status(client, pair) == 200
+
+
+def test_delete_account(client):
+    name = register(client)
+    pair = login(client, name).json()
+    assert client.post("/api/passwords/", headers=auth(pair),
+                       json={"service": "example", "username": name, "password": "s3cret"}).status_code < 300
+
+    r = client.request("DELETE", "/api/auth/me", headers=auth(pair), json={"master_password": "wrong-password"})
+    assert r.status_code == 400
+    assert vault_status(client, pair) == 200
+
+    r = client.request("DELETE", "/api/auth/me", headers=auth(pair), json={"master_password": MASTER})
+    assert r.status_code == 204, r.text
+    assert vault_status(client, pair) == 401
+    assert login(client, name).status_code == 401
+
+
+def test_admin_deactivates_and_reactivates(client):
+    admin_name, name = register(client), register(client)
+    db = SessionLocal()
+    try:
+        admin = db.query(User).filter(User.username == admin_name).first()
+        admin.is_superuser = True
+        db.commit()
+        principal_cache.invalidate(admin.id)
+        user_id = db.query(User.id).filter(User.username == name).scalar()
+    finally:
+        db.close()
+    admin_pair, pair = login(client, admin_name).json(), login(client, name).json()
+
+    r = client.patch(f"/api/auth/users/{user_id}/active", headers=auth(pair), json={"is_active": False})
+    assert r.status_code == 403
+    r = client.patch(f"/api/auth/users/{user_id}/active", headers=auth(admin_pair), json={"is_active": False})
+    assert r.status_code == 200 and r.json()["is_active"] is False
+    assert vault_status(client, pair) == 401
+    assert client.post("/api/auth/refresh", json={"refresh_token": pair["refresh_token"]}).status_code == 401
+
+    r = client.patch(f"/api/auth/users/{user_id}/active", headers=auth(admin_pair), json={"is_active": True})
+    assert r.status_code == 200 and r.json()["is_active"] is True
+    assert vault_status(client, pair) == 401  # sessions stay ended: log in again
+    assert vault_status(client, login(client, name).json()) == 200
+
+    assert client.patch("/api/auth/users/999999/active", headers=auth(admin_pair),
+                        json={"is_active": False}).status_code == 404
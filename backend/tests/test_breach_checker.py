@@ -0,0 +1,55 @@
+"""
+BreachChecker single-flight coalescing: concurrent checks of one password
+share a single upstream range request.
+"""
+import asyncio
+
+import pytest
+
+from app.config import settings
+from app.services.breach_checker import BreachChecker
+
+CONCURRENT_CHECKS = 100
+
+
+@pytest.fixture
+def checker(range_server, monkeypatch):
+    # No cache tiers: without coalescing every caller would issue its own GET
+    monkeypatch.setattr(settings, "HIBP_CACHE_ENABLED", False)
+    checker = BreachChecker()
+    checker.HIBP_PASSWORD_API = range_server.url
+    # Keep the first fetch in flight while the other callers arrive
+    range_server.delay = 0.05
+    return checker
+
+
+async def _with_checker(checker, scenario):
+    await checker.startup()
+    try:
+        return await scenario()
+    finally:
+        await checker.shutdown()
+
+
+@pytest.mark.parametrize("password, expected", [("password123", 251682), ("not-in-any-breach-7Qx!", 0)])
+def test_concurrent_checks_make_exactly_one_upstream_call(checker, range_server, password, expected):
+    async def scenario():
+        return await asyncio.gather(*(checker.check_password_breach(password) for _ in range(CONCURRENT_CHECKS)))
+
+    counts = asyncio.run(_with_checker(checker, scenario))
+
+    assert range_server.requests == 1
+    assert counts == [expected] * CONCURRENT_CHECKS
+
+
+def test_cancelled_leader_does_not_break_the_shared_fetch(checker, range_server):
+    async def scenario():
+        leader = asyncio.ensure_future(checker.check_password_breach("letmein"))
+        await asyncio.sleep(0.01)
+        followers = [asyncio.ensure_future(checker.check_password_breach("letmein")) for _ in range(5)]
+        await asyncio.sleep(0.01)
+        leader.cancel()
+        return await asyncio.gather(*followers)
+
+    assert asyncio.run(_with_checker(checker, scenario)) == [68] * 5
+    assert range_server.requests == 1
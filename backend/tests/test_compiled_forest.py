@@ -0,0 +1,84 @@
+"""
+CompiledForest parity: after export and a reload through mmap, predict_proba
+must be identical (np.array_equal, not approximately equal) to scikit-learn's.
+"""
+import numpy as np
+import pytest
+from sklearn.ensemble import RandomForestClassifier
+
+from app.ml.features import N_FEATURES, extract_features_batch
+from app.ml.forest import CHUNK_ROWS, CompiledForest
+from app.ml.train import export_compiled_forest
+
+PASSWORDS = ["password", "P@ssw0rd!", "correct horse battery staple", "qwerty123", "Zx9!Zx9!Zx9!", "a", ""]
+
+
+def _fit(X, y):
+    return RandomForestClassifier(n_estimators=15, max_depth=10, random_state=0).fit(X, y)
+
+
+@pytest.fixture(scope="module", params=["integer features", "float features"])
+def models(request, tmp_path_factory):
+    """A small fitted forest and its compiled export, reloaded from disk."""
+    rng = np.random.default_rng(3)
+    if request.param == "integer features":
+        # Like the real feature vectors: small counts, thresholds land on x.5
+        X = rng.integers(0, 40, size=(2000, N_FEATURES))
+    else:
+        # Arbitrary float64 thresholds, to exercise sklearn's float32 input cast
+        X = rng.normal(0, 10, size=(2000, N_FEATURES))
+    y = (X[:, 0] + 2 * X[:, 1] - X[:, 3] + rng.normal(0, 5, size=len(X)) > 20).astype(int)
+    clf = _fit(X, y)
+
+    path = tmp_path_factory.mktemp("forest") / "model.forest"
+    export_compiled_forest(clf, path)
+    return clf, CompiledForest.load(path), X
+
+
+def _threshold_rows(clf, base):
+    """For every split: a row exactly on its threshold (as sklearn sees it, float32), and just either side."""
+    rows = []
+    for estimator in clf.estimators_:
+        tree = estimator.tree_
+        for feature, threshold in zip(tree.feature, tree.threshold):
+            if feature < 0:
+                continue  # leaf
+            on = np.float32(threshold)
+            for value in (on, np.nextafter(on, np.float32(-np.inf)), np.nextafter(on, np.float32(np.inf))):
+                row = base[len(rows) % len(base)].astype(np.float64)
+                row[feature] = value
+                rows.append(row)
+    return np.array(rows)
+
+
+def test_loaded_forest_is_memory_mapped(models):
+    _, forest, _ = models
+    assert forest._mmap is not None
+    assert not forest.threshold.flags.owndata
+
+
+def test_identical_on_random_rows(models):
+    clf, forest, X = models
+    rng = np.random.default_rng(11)
+    rows = rng.permutation(X)[:1500] + rng.integers(-2, 3, size=(1500, N_FEATURES))
+    assert np.array_equal(forest.predict_proba(rows), clf.predict_proba(rows))
+
+
+def test_identical_on_password_features(models):
+    clf, forest, _ = models
+    rows = extract_features_batch(PASSWORDS)
+    assert np.array_equal(forest.predict_proba(rows), clf.predict_proba(rows))
+
+
+def test_identical_on_rows_at_split_thresholds(models):
+    clf, forest, X = models
+    rows = _threshold_rows(clf, X)
+    assert len(rows) > 100
+    assert np.array_equal(forest.predict_proba(rows), clf.predict_proba(rows))
+
+
+@pytest.mark.parametrize("size", [1, CHUNK_ROWS - 1, CHUNK_ROWS, CHUNK_ROWS + 1])
+def test_identical_across_chunk_boundaries(models, size):
+    clf, forest, X = models
+    rows = np.resize(X, (size, N_FEATURES))
+    assert np.array_equal(forest.predict_proba(rows), clf.predict_proba(rows))
@@ -0,0 +1,28 @@
+"""
+Pattern-engine responses: every match kind the engine reports reads as a
+friendly phrase in the UI message, never as the raw kind name.
+"""
+from app.api.ml import PATTERN_NAMES, _predict_patterns, _to_response
+
+# One password per match kind the engine can emit
+SAMPLES = {
+    "dictionary": "password",
+    "reversed": "drowssap",
+    "l33t": "p@ssw0rd",
+    "spatial": "asdfghjkl;",
+    "sequence": "abcdefgh",
+    "date": "13/05/1987",
+    "repeat": "zzzzzzzzzz",
+}
+
+
+def test_every_pattern_kind_has_a_label():
+    assert set(SAMPLES) == set(PATTERN_NAMES)
+    for kind, password in SAMPLES.items():
+        result = _predict_patterns([password])[0]
+        assert kind in result["patterns"], (password, result["patterns"])
+        assert set(result["patterns"]) <= set(PATTERN_NAMES)
+
+        message = _to_response(result)["message"]
+        assert PATTERN_NAMES[kind] in message
+        assert PATTERN_NAMES[kind] != kind
@@ -0,0 +1,51 @@
+"""
+Background rehash-on-login: a failure inside the fire-and-forget task is
+counted and logged, never left as an unretrieved task exception.
+"""
+import asyncio
+import logging
+
+import pytest
+from sqlalchemy.exc import OperationalError
+
+from app.core.hashing import bcrypt_pool
+from app.services.user_services import UserService
+
+
+async def _fake_hash(master_password: str) -> str:
+    return "$2b$12$" + "x" * 53
+
+
+def _locked_database(*args):
+    raise OperationalError("UPDATE users ...", {}, Exception("database is locked"))
+
+
+async def _pool_shut_down(master_password: str) -> str:
+    raise RuntimeError("cannot schedule new futures after shutdown")
+
+
+@pytest.mark.parametrize("hash_fn, store_fn", [
+    (_fake_hash, _locked_database),
+    (_pool_shut_down, _locked_database),
+])
+def test_rehash_failures_are_counted_and_logged(monkeypatch, caplog, hash_fn, store_fn):
+    monkeypatch.setattr(bcrypt_pool, "hash", hash_fn)
+    monkeypatch.setattr(UserService, "_store_rehash", staticmethod(store_fn))
+    failed, rehashed = UserService.rehash_failed, UserService.rehashed
+
+    async def scenario():
+        loop = asyncio.get_running_loop()
+        unhandled = []
+        loop.set_exception_handler(lambda loop, context: unhandled.append(context))
+        task = loop.create_task(UserService._rehash(1, "$2b$10$old", "correct-horse-battery-staple"))
+        await task
+        return task, unhandled
+
+    with caplog.at_level(logging.ERROR, logger="app.services.user_services"):
+        task, unhandled = asyncio.run(scenario())
+
+    assert task.exception() is None and not unhandled
+    assert UserService.rehash_failed == failed + 1
+    assert UserService.rehashed == rehashed
+    assert UserService.rehash_stats()["failed"] == UserService.rehash_failed
+    assert "Rehash for user 1 failed" in caplog.text
@@ -0,0 +1,151 @@
+"""
+Principal cache check: SQL queries per authenticated request, before and after
+
+Drives the app in-process (TestClient) on a throwaway SQLite database and
+counts the statements sent to the engine for each vault route. It compares
+principal_cache disabled (one users query per request, the old behaviour)
+with the cache enabled. Then it asserts that:
+
+  - deactivating, deleting or changing the credentials of a user takes
+    effect on the very next request, through UserService's invalidation
+    (deactivation also ends the user's sessions: reactivated users log in again)
+  - an entry never outlives the token that loaded it
+
+Usage:
+  python scripts/bench_auth_principal.py --requests 300
+"""
+import argparse
+import os
+import tempfile
+import time
+from datetime import timedelta
+
+import bench_common  # noqa: F401  (import path + throwaway secrets)
+from bench_common import percentile
+
+os.environ["DATABASE_URL"] = f"sqlite:///{tempfile.mkdtemp()}/vault.db"
+
+from fastapi.testclient import TestClient
+from sqlalchemy import event
+
+from app.config import settings
+from app.core.jwt import create_access_token
+from app.core.principals import principal_cache
+from app.database.session import SessionLocal, engine
+from app.main import app
+from app.models.user import User
+from app.services.user_services import user_service
+
+MASTER = "correct-horse-battery-staple"
+# Count only the requests' own statements, not the background revocation sync
+settings.REVOCATION_SYNC_SECONDS = 0
+statements = []
+
+
+@event.listens_for(engine, "before_cursor_execute")
+def count_statement(conn, cursor, statement, parameters, context, executemany):
+    statements.append(statement)
+
+
+def register(client, name: str):
+    r = client.post("/api/auth/register", json={"username": name, "email": f"{name}@example.com",
+                                                 "master_password": MASTER})
+    assert r.status_code == 201, r.text
+    return login(client, name)
+
+
+def login(client, name: str):
+    r = client.post("/api/auth/token", data={"username": name, "password": MASTER})
+    assert r.status_code == 200, r.text
+    return r.json()["access_token"]
+
+
+def measure(client, headers, routes, n: int):
+    rows = {}
+    for label, method, path, body in routes:
+        client.request(method, path, headers=headers, json=body)  # warm-up, not counted
+        del statements[:]
+        samples = []
+        for _ in range(n):
+            start = time.perf_counter()
+            r = client.request(method, path, headers=headers, json=body)
+            samples.append(time.perf_counter() - start)
+            assert r.status_code < 300, r.text
+        rows[label] = (len(statements) / n, percentile([s * 1000 for s in samples], 50))
+    return rows
+
+
+def expect_status(client, token: str, status: int, why: str):
+    r = client.get("/api/passwords/", headers={"Authorization": f"Bearer {token}"})
+    assert r.status_code == status, f"{why}: got {r.status_code}"
+
+
+def main(args):
+    with TestClient(app) as client:
+        token = register(client, "alice")
+        headers = {"Authorization": f"Bearer {token}"}
+        ids = [client.post("/api/passwords/", headers=headers,
+                           json={"service": f"site{i}", "username": "alice", "password": f"s{i}"}).json()["id"]
+               for i in range(20)]
+        routes = [
+            ("GET  /api/passwords/", "GET", "/api/passwords/", None),
+            ("GET  /api/passwords/{id}", "GET", f"/api/passwords/{ids[0]}", None),
+            ("PUT  /api/passwords/{id}", "PUT", f"/api/passwords/{ids[1]}", {"category": "work"}),
+            ("GET  /api/security/score", "GET", "/api/security/score", None),
+        ]
+
+        size = principal_cache.max_entries
+        principal_cache.max_entries = 0  # disabled: what every request used to do
+        principal_cache.invalidate()
+        before = measure(client, headers, routes, args.requests)
+        principal_cache.max_entries = size
+        after = measure(client, headers, routes, args.requests)
+
+        print(f"\n{'route':<34} {'queries/req before':>18} {'after':>7} {'p50 before':>11} {'after':>9}")
+        for label, _, _, _ in routes:
+            (q0, t0), (q1, t1) = before[label], after[label]
+            print(f"{label:<34} {q0:>18.2f} {q1:>7.2f} {t0:>8.2f} ms {t1:>6.2f} ms")
+            assert q1 <= q0 - 0.99, f"{label}: the users query should be gone"
+        print(f"cache: {principal_cache.stats()}\n")
+
+        # Explicit invalidation through UserService
+        db = SessionLocal()
+        alice = db.query(User).filter(User.username == "alice").first()
+        expect_status(client, token, 200, "cached principal")
+        user_service.set_active(db, alice, False)
+        expect_status(client, token, 401, "deactivated user")
+        user_service.set_active(db, alice, True)
+        expect_status(client, token, 401, "sessions ended by the deactivation")
+        token = login(client, "alice")
+        expect_status(client, token, 200, "reactivated user, new login")
+        invalidations = principal_cache.invalidations
+        r = client.post("/api/auth/change-password", headers={"Authorization": f"Bearer {token}"},
+                        json={"current_master_password": MASTER, "new_master_password": MASTER})
+        assert r.status_code == 204, r.text
+        assert principal_cache.invalidations == invalidations + 1 and principal_cache.get(alice.id) is None
+        expect_status(client, token, 401, "sessions ended by the password change")
+        print("✅ deactivation and credential changes apply on the next request")
+
+        bob_token = register(client, "bob")
+        expect_status(client, bob_token, 200, "bob cached")
+        r = client.request("DELETE", "/api/auth/me", headers={"Authorization": f"Bearer {bob_token}"},
+                           json={"master_password": MASTER})
+        assert r.status_code == 204, r.text
+        expect_status(client, bob_token, 401, "deleted user")
+        print("✅ a deleted user's token stops working on the next request")
+
+        # Entries are capped at the token's exp
+        short = create_access_token({"sub": str(alice.id)}, expires_delta=timedelta(seconds=2))
+        principal_cache.invalidate(alice.id)
+        expect_status(client, short, 200, "short-lived token")
+        _, expires_at = principal_cache._entries[alice.id]
+        assert expires_at - time.monotonic() <= 2.0
+        print(f"✅ cache entry capped at the token's exp ({expires_at - time.monotonic():.1f}s left, "
+              f"TTL {principal_cache.ttl_seconds:g}s)")
+        db.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=300, help="requests per route and mode")
+    main(parser.parse_args())
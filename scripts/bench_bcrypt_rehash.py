@@ -0,0 +1,137 @@
+"""
+bcrypt cost check: calibration and transparent rehash-on-login
+
+Calibrates a cost for --target-ms on this machine, then runs logins through
+user_service.authenticate_user_async() on a throwaway SQLite database for
+users whose hashes were made at other costs (older, cheaper servers; an
+over-tuned one; a $2a$ hash). It asserts that:
+
+  - every successful login returns before its rehash and the rehash lands
+    in the background, at BCRYPT_ROUNDS, still matching the same password
+  - hashes already at BCRYPT_ROUNDS and failed logins are never rehashed
+  - a rehash never overwrites a password changed after the login
+  - an unknown username costs about as much as a wrong password
+
+Usage:
+  python scripts/bench_bcrypt_rehash.py --rounds 10 --target-ms 100
+"""
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+
+import bcrypt
+
+import bench_common  # noqa: F401  (import path + throwaway secrets)
+
+os.environ["DATABASE_URL"] = f"sqlite:///{tempfile.mkdtemp()}/vault.db"
+
+from app.config import settings
+from app.core.hashing import BCRYPT_HASH, calibrate, hasher
+from app.database.init_db import init_database
+from app.database.session import SessionLocal
+from app.models.password_entry import PasswordEntry  # noqa: F401  (registers the mapper)
+from app.models.user import User
+from app.services.user_services import UserService, user_service
+
+PASSWORD = "correct-horse-battery-staple"
+
+
+def cost(hashed: str) -> str:
+    ident, rounds = BCRYPT_HASH.match(hashed).groups()
+    return f"${ident}${rounds}"
+
+
+def make_users(specs):
+    db = SessionLocal()
+    for name, ident, rounds in specs:
+        salt = bcrypt.gensalt(rounds, prefix=ident.encode())
+        db.add(User(username=name, email=f"{name}@example.com",
+                    hashed_master_password=bcrypt.hashpw(PASSWORD.encode(), salt).decode()))
+    db.commit()
+    db.close()
+
+
+def stored_hash(name: str) -> str:
+    db = SessionLocal()
+    try:
+        return db.query(User.hashed_master_password).filter(User.username == name).scalar()
+    finally:
+        db.close()
+
+
+async def drain():
+    while UserService._rehash_tasks:
+        await asyncio.gather(*list(UserService._rehash_tasks))
+
+
+async def timed_login(name: str, password: str):
+    start = time.perf_counter()
+    user = await user_service.authenticate_user_async(name, password)
+    return user, (time.perf_counter() - start) * 1000
+
+
+async def run(args):
+    R = args.rounds
+    specs = [("old_cheap", "2b", R - 2), ("old", "2b", R - 1), ("overtuned", "2b", R + 1),
+             ("variant_2a", "2a", R), ("current", "2b", R)]
+    make_users(specs)
+    before = {name: stored_hash(name) for name, _, _ in specs}
+
+    # Wrong passwords never trigger a rehash
+    for name, _, _ in specs:
+        user, _ = await timed_login(name, "wrong-password")
+        assert user is None
+    await drain()
+    assert {name: stored_hash(name) for name, _, _ in specs} == before
+
+    print(f"{'user':<12} {'stored':>8} {'login':>9} {'after':>8}")
+    for name, _, _ in specs:
+        user, ms = await timed_login(name, PASSWORD)
+        assert user is not None
+        in_flight = len(UserService._rehash_tasks)
+        await drain()
+        after = stored_hash(name)
+        print(f"{name:<12} {cost(before[name]):>8} {ms:7.0f} ms {cost(after):>8}"
+              f"   {'rehashed in background' if in_flight else 'left alone'}")
+        assert cost(after) == f"$2b${R:02d}" and hasher.verify_password(PASSWORD, after)
+        assert (after == before[name]) == (name == "current"), name
+    assert not any(hasher.needs_update(stored_hash(name)) for name, _, _ in specs)
+    print(f"✅ every hash converged on $2b${R:02d} after one login; logins did not wait for it")
+
+    # A password change between the login and the rehash wins
+    make_users([("changer", "2b", R - 1)])
+    old = stored_hash("changer")
+    db = SessionLocal()
+    db.query(User).filter(User.username == "changer").update(
+        {User.hashed_master_password: hasher.get_password_hash("a-brand-new-password")})
+    db.commit()
+    changer_id = db.query(User.id).filter(User.username == "changer").scalar()
+    db.close()
+    assert not UserService._store_rehash(changer_id, old, hasher.get_password_hash(PASSWORD))
+    assert hasher.verify_password("a-brand-new-password", stored_hash("changer"))
+    print("✅ a stale rehash does not undo a password change")
+
+    unknown = [(await timed_login("nobody", PASSWORD))[1] for _ in range(3)]
+    wrong = [(await timed_login("current", "wrong-password"))[1] for _ in range(3)]
+    assert min(unknown) > 0.5 * min(wrong)
+    print(f"✅ unknown user {min(unknown):.0f} ms vs wrong password {min(wrong):.0f} ms")
+    print(f"   rehash stats: {user_service.rehash_stats()}")
+
+
+def main(args):
+    print(f"⏱️  Calibrating for {args.target_ms:g} ms ...")
+    result = calibrate(args.target_ms)
+    print(f"   timings: { {r: round(ms, 1) for r, ms in result['timings_ms'].items()} } -> "
+          f"BCRYPT_ROUNDS={result['rounds']}\n")
+    settings.BCRYPT_ROUNDS = args.rounds
+    init_database()
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rounds", type=int, default=10, help="BCRYPT_ROUNDS for the rehash checks")
+    parser.add_argument("--target-ms", type=float, default=100.0, help="calibration budget")
+    main(parser.parse_args())
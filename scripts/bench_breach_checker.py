@@ -0,0 +1,253 @@
+"""
+Breach checker benchmark
+
+Runs BreachChecker against a local stand-in range server and reports
+p50/p99 latency per lookup.
+
+Scenarios:
+  client  - a new AsyncClient per call (old behaviour) vs the pooled client
+  cache   - cold fetches vs memory-tier hits vs disk-tier hits (fresh worker)
+  batch   - one check per password vs check_passwords_breach, and partial failures
+  coalesce - upstream GETs caused by N concurrent checks of one password
+             (exactly one; asserted in backend/tests/test_breach_checker.py)
+  faults  - slow tail with/without hedging, outage (circuit breaker), stale-while-revalidate
+
+Usage:
+  python scripts/bench_breach_checker.py --requests 500 --concurrency 10
+"""
+import argparse
+import asyncio
+import secrets
+import tempfile
+import time
+from pathlib import Path
+
+from bench_common import RangeServer, summarize
+
+from app.config import settings
+from app.services.breach_checker import BreachChecker
+
+BREACHED = {"password123": 251682, "letmein": 68, "correcthorsebatterystaple": 3}
+
+
+def random_passwords(n: int):
+    return [secrets.token_urlsafe(12) for _ in range(n)]
+
+
+async def timed_checks(checker, passwords, concurrency: int, reset_client: bool = False):
+    """Run every check under a concurrency limit and return per-call durations."""
+    semaphore = asyncio.Semaphore(concurrency)
+    durations = []
+
+    async def one(password):
+        async with semaphore:
+            start = time.perf_counter()
+            await checker.check_password_breach(password)
+            durations.append(time.perf_counter() - start)
+            if reset_client:
+                # Emulates 'async with httpx.AsyncClient()' around every lookup
+                await checker.shutdown()
+
+    await asyncio.gather(*(one(p) for p in passwords))
+    return durations
+
+
+def make_checker(server, cache: bool = False) -> BreachChecker:
+    settings.HIBP_CACHE_ENABLED = cache
+    checker = BreachChecker()
+    checker.HIBP_PASSWORD_API = server.url
+    return checker
+
+
+async def bench_client(server, args):
+    print("\n== Pooled client vs client-per-call ==")
+    # Before: serial calls, each on a fresh connection (concurrent resets would race)
+    checker = make_checker(server)
+    before = await timed_checks(checker, random_passwords(args.requests), 1, reset_client=True)
+    summarize("client per call (c=1)", before)
+
+    for concurrency in sorted({1, args.concurrency}):
+        checker = make_checker(server)
+        await checker.startup()
+        opened = server.connections
+        after = await timed_checks(checker, random_passwords(args.requests), concurrency)
+        await checker.shutdown()
+        summarize(f"pooled client (c={concurrency})", after)
+        print(f"{'':<32} connections opened: {server.connections - opened}")
+
+
+async def bench_cache(server, args):
+    print("\n== Two-tier range cache ==")
+    passwords = random_passwords(args.requests)
+    with tempfile.TemporaryDirectory() as tmp:
+        settings.HIBP_DISK_CACHE_PATH = str(Path(tmp) / "ranges.db")
+
+        checker = make_checker(server, cache=True)
+        await checker.startup()
+        summarize("cold (fetch + store)", await timed_checks(checker, passwords, args.concurrency))
+        summarize("memory tier hits", await timed_checks(checker, passwords, args.concurrency))
+        for password, expected in BREACHED.items():
+            assert await checker.check_password_breach(password) == expected, password
+        print(f"{'':<32} {checker.stats()['memory_cache']}")
+        await checker.shutdown()
+
+        # A second worker process starts with an empty LRU but shares the disk store
+        requests_before = server.requests
+        worker = make_checker(server, cache=True)
+        await worker.startup()
+        summarize("disk tier hits (new worker)", await timed_checks(worker, passwords, args.concurrency))
+        print(f"{'':<32} {worker.stats()['disk_cache']}")
+        print(f"{'':<32} upstream requests: {server.requests - requests_before}")
+        await worker.shutdown()
+
+
+async def bench_batch(server, args):
+    print("\n== Batch endpoint backend ==")
+    # An audit-like batch: some repeated passwords, some known-breached ones
+    passwords = random_passwords(args.requests) + list(BREACHED) * 3
+    distinct_prefixes = len({BreachChecker._sha1_hash(p)[:5] for p in passwords})
+
+    checker = make_checker(server)
+    await checker.startup()
+    before = server.requests
+    start = time.perf_counter()
+    singles = [await checker.check_password_breach(p) for p in passwords]
+    print(f"one call per password            {time.perf_counter() - start:8.3f} s  "
+          f"upstream requests: {server.requests - before}")
+    await checker.shutdown()
+
+    checker = make_checker(server)
+    await checker.startup()
+    before = server.requests
+    start = time.perf_counter()
+    results = await checker.check_passwords_breach(passwords)
+    print(f"check_passwords_breach           {time.perf_counter() - start:8.3f} s  "
+          f"upstream requests: {server.requests - before} (distinct prefixes: {distinct_prefixes})")
+    assert [r["breach_count"] for r in results] == singles
+
+    server.error_rate = 0.3
+    results = await checker.check_passwords_breach(random_passwords(100))
+    server.error_rate = 0.0
+    failed = [r for r in results if r["error"]]
+    print(f"with 30% upstream errors         {len(failed)}/100 items reported as failed"
+          + (f", e.g. {failed[0]}" if failed else ""))
+    await checker.shutdown()
+
+
+async def bench_coalesce(server, args):
+    print("\n== Single-flight coalescing ==")
+    # Cache off: every caller would otherwise issue its own GET
+    checker = make_checker(server, cache=False)
+    await checker.startup()
+    server.delay = max(server.delay, 0.05)  # keep the first fetch in flight while the rest arrive
+
+    for password in ("password123", secrets.token_urlsafe(12)):
+        before = server.requests
+        counts = await asyncio.gather(*(checker.check_password_breach(password) for _ in range(args.concurrency * 10)))
+        upstream = server.requests - before
+        print(f"{args.concurrency * 10} concurrent checks -> {upstream} upstream request(s), count={counts[0]}")
+
+    # A cancelled leader must not break the shared fetch for the others
+    before = server.requests
+    leader = asyncio.ensure_future(checker.check_password_breach("letmein"))
+    await asyncio.sleep(0.01)
+    followers = [asyncio.ensure_future(checker.check_password_breach("letmein")) for _ in range(5)]
+    await asyncio.sleep(0.01)
+    leader.cancel()
+    counts = await asyncio.gather(*followers)
+    print(f"cancelled leader: {len(counts)} followers served from {server.requests - before} request(s), "
+          f"counts={set(counts)}")
+    print(f"{'':<32} {checker.stats()['single_flight']}")
+
+    server.delay = args.server_delay
+    await checker.shutdown()
+
+
+async def bench_faults(server, args):
+    print("\n== Fault injection ==")
+    saved = {k: getattr(settings, k) for k in (
+        "HIBP_HEDGE_ENABLED", "HIBP_BREAKER_RESET_SECONDS", "HIBP_CACHE_TTL_SECONDS",
+        "HIBP_DISK_CACHE_PATH", "HIBP_TOTAL_TIMEOUT")}
+    settings.HIBP_DISK_CACHE_PATH = ""
+    settings.HIBP_TOTAL_TIMEOUT = 2.0
+
+    # 1. Slow tail: 5% of responses take 300 ms
+    server.slow_rate, server.slow_delay = 0.05, 0.3
+    for hedge in (False, True):
+        settings.HIBP_HEDGE_ENABLED = hedge
+        checker = make_checker(server)
+        await checker.startup()
+        await timed_checks(checker, random_passwords(50), 1)  # warm the latency window
+        summarize(f"slow tail, hedging {'on' if hedge else 'off'}", await timed_checks(checker, random_passwords(args.requests), 1))
+        if hedge:
+            print(f"{'':<32} {checker.stats()['hedging']}")
+        await checker.shutdown()
+    server.slow_rate = 0.0
+    settings.HIBP_HEDGE_ENABLED = False
+
+    # 2. Outage: every request fails, the breaker opens and calls fail fast as "unknown"
+    settings.HIBP_BREAKER_RESET_SECONDS = 0.5
+    checker = make_checker(server)
+    await checker.startup()
+    server.error_rate = 1.0
+    before = server.requests
+    durations = []
+    for password in random_passwords(30):
+        start = time.perf_counter()
+        assert await checker.check_password_breach(password) is None
+        durations.append(time.perf_counter() - start)
+    print(f"outage: 30 checks -> {server.requests - before} upstream requests, all 'unknown'; "
+          f"breaker {checker.stats()['circuit_breaker']}")
+    summarize("fail-fast while open", durations[10:])
+
+    # 3. Recovery: after the reset window one probe goes through and closes the circuit
+    server.error_rate = 0.0
+    await asyncio.sleep(0.6)
+    assert await checker.check_password_breach("password123") == BREACHED["password123"]
+    print(f"recovered: breaker state={checker.stats()['circuit_breaker']['state']}")
+    await checker.shutdown()
+
+    # 4. Stale-while-revalidate: cached but expired ranges are served during an outage
+    settings.HIBP_CACHE_TTL_SECONDS = 0
+    checker = make_checker(server, cache=True)
+    await checker.startup()
+    assert await checker.check_password_breach("letmein") == BREACHED["letmein"]
+    server.error_rate = 1.0
+    assert await checker.check_password_breach("letmein") == BREACHED["letmein"]
+    await asyncio.sleep(0.05)  # let the background refresh fail
+    print(f"stale-while-revalidate during outage: {checker.stats()['stale_while_revalidate']}")
+    server.error_rate = 0.0
+    await checker.shutdown()
+
+    for key, value in saved.items():
+        setattr(settings, key, value)
+
+
+SCENARIOS = {
+    "client": bench_client,
+    "cache": bench_cache,
+    "batch": bench_batch,
+    "coalesce": bench_coalesce,
+    "faults": bench_faults,
+}
+
+
+async def main(args):
+    with RangeServer(breached=BREACHED) as server:
+        server.delay = args.server_delay
+        for name in args.scenarios:
+            await SCENARIOS[name](server, args)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=500)
+    parser.add_argument("--concurrency", type=int, default=10)
+    parser.add_argument("--server-delay", type=float, default=0.0, help="seconds added by the stand-in server")
+    parser.add_argument("scenarios", nargs="*", help=f"any of: {', '.join(SCENARIOS)} (default: all)")
+    args = parser.parse_args()
+    args.scenarios = args.scenarios or list(SCENARIOS)
+    unknown = set(args.scenarios) - set(SCENARIOS)
+    if unknown:
+        parser.error(f"unknown scenario(s): {', '.join(sorted(unknown))}")
+    asyncio.run(main(args))
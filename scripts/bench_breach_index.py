@@ -0,0 +1,92 @@
+"""
+Offline breach index benchmark
+
+Generates a synthetic 'HASH:COUNT' dump, imports it (both the sorted and
+the unsorted/external-sort paths), checks every lookup is correct and
+times lookups against the memory-mapped index. Then builds a Bloom filter
+from the index and measures its false-positive rate and probe time.
+
+Usage:
+  python scripts/bench_breach_index.py --hashes 2000000
+"""
+import argparse
+import hashlib
+import os
+import random
+import resource
+import tempfile
+import time
+from pathlib import Path
+
+from bench_common import percentile
+
+from app.services.breach_filter import BreachFilter, build_filter
+from app.services.breach_index import BreachIndex, build_index
+
+
+def write_dump(path: Path, n: int, ordered: bool):
+    rng = random.Random(42)
+    rows = [(os.urandom(20).hex().upper(), rng.randint(1, 10_000)) for _ in range(n)]
+    if ordered:
+        rows.sort()
+    with open(path, "w") as f:
+        for h, c in rows:
+            f.write(f"{h}:{c}\n")
+    return rows
+
+
+def main(args):
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        for ordered in (True, False):
+            dump = tmp / "dump.txt"
+            rows = write_dump(dump, args.hashes, ordered)
+            label = "sorted input" if ordered else "unsorted input"
+
+            start = time.perf_counter()
+            build_index(str(dump), str(tmp / "pwned.idx"), run_size=args.run_size, progress_every=0)
+            elapsed = time.perf_counter() - start
+            size_mb = (tmp / "pwned.idx").stat().st_size / 1e6
+            print(f"{label:<16} import {elapsed:6.2f}s  ({args.hashes / elapsed:,.0f} hashes/s, {size_mb:.1f} MB)")
+
+            index = BreachIndex(str(tmp / "pwned.idx"))
+            sample = random.sample(rows, min(args.lookups, len(rows)))
+            for h, c in sample:
+                assert index.lookup(bytes.fromhex(h)) == c
+            misses = [hashlib.sha1(os.urandom(8)).digest() for _ in range(args.lookups)]
+            assert not any(index.lookup(d) for d in misses)
+
+            hits = [bytes.fromhex(h) for h, _ in sample]
+            for name, digests in (("hits", hits), ("misses", misses)):
+                timings = []
+                for d in digests:
+                    t = time.perf_counter()
+                    index.lookup(d)
+                    timings.append(time.perf_counter() - t)
+                us = [x * 1e6 for x in timings]
+                print(f"{'':<16} lookup {name:<6} p50={percentile(us, 50):.2f} us  p99={percentile(us, 99):.2f} us")
+            index.close()
+
+        info = build_filter(str(tmp / "pwned.idx"), str(tmp / "pwned.bloom"), args.fp_rate)
+        bloom = BreachFilter(str(tmp / "pwned.bloom"))
+        assert all(bloom.might_contain(bytes.fromhex(h)) for h, _ in sample)
+        probes = [os.urandom(20) for _ in range(args.lookups)]
+        start = time.perf_counter()
+        false_positives = sum(bloom.might_contain(d) for d in probes)
+        per_probe_us = (time.perf_counter() - start) / len(probes) * 1e6
+        print(f"bloom filter     {info['size_bytes'] / 1e6:.1f} MB, k={info['hashes']}, "
+              f"expected fp {info['expected_fp_rate']:.3%}, measured fp {false_positives / len(probes):.3%}, "
+              f"{per_probe_us:.2f} us/probe")
+        bloom.close()
+
+    peak_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    print(f"peak RSS of this process (includes the generated test data): {peak_mb:.0f} MB")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--hashes", type=int, default=1_000_000)
+    parser.add_argument("--lookups", type=int, default=20_000)
+    parser.add_argument("--fp-rate", type=float, default=0.01)
+    parser.add_argument("--run-size", type=int, default=250_000, help="records per external-sort run")
+    main(parser.parse_args())
@@ -0,0 +1,157 @@
+"""
+Shared helpers for the benchmark scripts.
+
+Sets up the import path for the backend, provides throwaway secrets so
+app.config loads without a .env file, and a local stand-in for the HIBP
+range API so benchmarks never touch the real service.
+"""
+import asyncio
+import hashlib
+import os
+import random
+import sys
+import threading
+from pathlib import Path
+
+# Get the project root (the parent of 'scripts') and make 'app' importable
+project_root = Path(__file__).resolve().parent.parent
+backend_path = project_root / "backend"
+sys.path.insert(0, str(backend_path))
+
+# Benchmarks must never need real secrets
+os.environ.setdefault("ENCRYPTION_KEY", "bGV0LW1lLWJlbmNobWFyay10aGlzLWZlcm5ldC1rZXk=")
+os.environ.setdefault("JWT_SECRET_KEY", "benchmark-only-secret")
+
+
+def percentile(samples, pct: float) -> float:
+    """Nearest-rank percentile of a list of numbers."""
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    rank = max(0, min(len(ordered) - 1, int(round(pct / 100.0 * len(ordered))) - 1))
+    return ordered[rank]
+
+
+def summarize(label: str, samples_s):
+    """Print p50/p99/mean for a list of durations in seconds."""
+    ms = [s * 1000 for s in samples_s]
+    mean = sum(ms) / len(ms) if ms else 0.0
+    print(f"{label:<32} n={len(ms):<6} p50={percentile(ms, 50):8.3f} ms  "
+          f"p99={percentile(ms, 99):8.3f} ms  mean={mean:8.3f} ms")
+
+
+class RangeServer:
+    """
+    Minimal HTTP/1.1 keep-alive server that mimics GET /range/{prefix}.
+
+    Every prefix returns `lines_per_range` deterministic "SUFFIX:COUNT" lines
+    (real HIBP ranges hold ~800-1000), plus any passwords registered in
+    `breached`. Fault injection knobs can be changed while it runs:
+      delay       - seconds added to every response
+      slow_rate   - fraction of responses delayed by `slow_delay` instead
+      error_rate  - fraction of responses answered with HTTP 503
+    """
+
+    def __init__(self, breached=None, lines_per_range: int = 800):
+        self.breached = {}
+        for password, count in (breached or {}).items():
+            self.breached[hashlib.sha1(password.encode("utf-8")).hexdigest().upper()] = count
+        self.lines_per_range = lines_per_range
+        self.delay = 0.0
+        self.slow_rate = 0.0
+        self.slow_delay = 0.0
+        self.error_rate = 0.0
+        self.requests = 0
+        self.connections = 0
+        self._bodies = {}
+        self._rng = random.Random(1234)
+        self._loop = None
+        self._server = None
+        self._thread = None
+        self.port = None
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.port}/range/"
+
+    def range_body(self, prefix: str) -> bytes:
+        if prefix in self._bodies:
+            return self._bodies[prefix]
+        rows = {}
+        for i in range(self.lines_per_range):
+            digest = hashlib.sha1(f"{prefix}:{i}".encode()).hexdigest().upper()
+            rows[digest[5:]] = (i % 97) + 1
+        for full_hash, count in self.breached.items():
+            if full_hash.startswith(prefix):
+                rows[full_hash[5:]] = count
+        body = "\r\n".join(f"{s}:{c}" for s, c in sorted(rows.items())).encode()
+        self._bodies[prefix] = body
+        return body
+
+    async def _handle(self, reader, writer):
+        self.connections += 1
+        try:
+            while True:
+                head = await reader.readuntil(b"\r\n\r\n")
+                request_line = head.split(b"\r\n", 1)[0].decode()
+                path = request_line.split(" ")[1]
+                self.requests += 1
+
+                delay = self.delay
+                if self.slow_rate and self._rng.random() < self.slow_rate:
+                    delay = self.slow_delay
+                if delay:
+                    await asyncio.sleep(delay)
+
+                if self.error_rate and self._rng.random() < self.error_rate:
+                    status, body = "503 Service Unavailable", b"unavailable"
+                else:
+                    status, body = "200 OK", self.range_body(path.rsplit("/", 1)[-1].upper())
+
+                writer.write(
+                    f"HTTP/1.1 {status}\r\nContent-Type: text/plain\r\n"
+                    f"Content-Length: {len(body)}\r\n\r\n".encode() + body
+                )
+                await writer.drain()
+                if b"connection: close" in head.lower():
+                    break
+        except (asyncio.IncompleteReadError, ConnectionResetError, asyncio.CancelledError):
+            pass
+        finally:
+            writer.close()
+
+    def start(self):
+        ready = threading.Event()
+
+        def run():
+            self._loop = asyncio.new_event_loop()
+            self._server = self._loop.run_until_complete(
+                asyncio.start_server(self._handle, "127.0.0.1", 0)
+            )
+            self.port = self._server.sockets[0].getsockname()[1]
+            ready.set()
+            self._loop.run_forever()
+
+        self._thread = threading.Thread(target=run, daemon=True)
+        self._thread.start()
+        ready.wait()
+        return self
+
+    async def _shutdown(self):
+        self._server.close()
+        handlers = [t for t in asyncio.all_tasks() if t is not asyncio.current_task()]
+        for task in handlers:
+            task.cancel()
+        await asyncio.gather(*handlers, return_exceptions=True)
+
+    def stop(self):
+        if self._loop is not None:
+            asyncio.run_coroutine_threadsafe(self._shutdown(), self._loop).result(timeout=5)
+            self._loop.call_soon_threadsafe(self._loop.stop)
+            self._thread.join(timeout=5)
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
@@ -0,0 +1,94 @@
+"""
+Bulk encryption benchmark: per-item calls vs encrypt_many / decrypt_many
+
+First checks the bulk contract:
+  - results come back in input order, including across pool chunks
+  - a bad token (wrong key, tampered, not base64, wrong type) gets its own
+    error and does not abort the batch
+  - bulk output round-trips through the per-item encrypt/decrypt
+
+Then reports items/s at each batch size for:
+  loop      [encryption_manager.decrypt(t) for t in tokens]
+  serial    decrypt_many on the calling thread
+  thread    decrypt_many split over a ThreadPoolExecutor
+  process   decrypt_many split over a ProcessPoolExecutor
+
+Usage:
+  python scripts/bench_crypto_batch.py --sizes 10 1000 100000 --workers 4
+"""
+import argparse
+import os
+import random
+import string
+
+from cryptography.fernet import Fernet
+
+import bench_common  # noqa: F401  (import path + throwaway secrets)
+
+from app.core.security import EncryptionManager
+from bench_ml_predict import best_of
+
+ALPHABET = string.ascii_letters + string.digits + string.punctuation + "äöü漢字🔑"
+
+
+def manager(workers: int, executor: str = "process") -> EncryptionManager:
+    # parallel_min=1 sends every batch to the pool, so small sizes show its fixed cost
+    return EncryptionManager(batch_workers=workers, batch_executor=executor, batch_parallel_min=1)
+
+
+def check_contract(plaintexts):
+    for executor in ("thread", "process"):
+        em = manager(3, executor)
+        tokens = [r.value for r in em.encrypt_many(plaintexts)]
+        assert [em.decrypt(t) for t in tokens] == plaintexts, f"{executor}: encrypt_many round-trip"
+
+        foreign = Fernet(Fernet.generate_key()).encrypt(b"other key").decode()
+        tampered = tokens[1][:-4] + ("AAAA" if not tokens[1].endswith("AAAA") else "BBBB")
+        bad = {3: foreign, 7: tampered, 11: "not a token", 13: None}
+        batch = [bad.get(i, t) for i, t in enumerate(tokens)]
+        results = em.decrypt_many(batch)
+        assert len(results) == len(batch)
+        for i, result in enumerate(results):
+            if i in bad:
+                assert not result.ok and result.value is None, f"{executor}: item {i} should fail"
+            else:
+                assert result.ok and result.value == plaintexts[i], f"{executor}: item {i} out of order"
+        em.shutdown()
+    print(f"✅ order, per-item errors and round-trips hold for thread and process pools "
+          f"({len(plaintexts):,} items)")
+
+
+def main(args):
+    rng = random.Random(0)
+    plaintexts = ["".join(rng.choice(ALPHABET) for _ in range(rng.randint(0, 40))) for _ in range(max(args.sizes))]
+    check_contract(plaintexts[:5000])
+
+    serial = manager(0)
+    tokens = [r.value for r in serial.encrypt_many(plaintexts)]
+    threads = manager(args.workers, "thread")
+    processes = manager(args.workers, "process")
+    processes.decrypt_many(tokens[:args.workers])  # start the workers outside the timings
+    print(f"\n{args.workers} workers, {os.cpu_count()} CPU(s)")
+    for op in ("encrypt", "decrypt"):
+        print(f"\n{op:<8} {'loop':>14} {'serial':>14} {'thread':>14} {'process':>14}")
+        for n in args.sizes:
+            batch = plaintexts[:n] if op == "encrypt" else tokens[:n]
+            single = serial.encrypt if op == "encrypt" else serial.decrypt
+            bulk = f"{op}_many"
+            repeats = max(1, min(50, 20000 // n))
+            timings = [
+                best_of(repeats, lambda: [single(x) for x in batch]),
+                best_of(repeats, lambda: getattr(serial, bulk)(batch)),
+                best_of(repeats, lambda: getattr(threads, bulk)(batch)),
+                best_of(repeats, lambda: getattr(processes, bulk)(batch)),
+            ]
+            print(f"{n:<8,} " + " ".join(f"{n / t:>10,.0f} /s" for t in timings))
+    threads.shutdown()
+    processes.shutdown()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10, 1000, 100_000])
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    main(parser.parse_args())
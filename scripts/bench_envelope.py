@@ -0,0 +1,163 @@
+"""
+Envelope encryption check: migration, resume, KEK rotation and the DEK cache
+
+Builds a throwaway SQLite vault in the pre-envelope layout: no
+encryption_version or wrapped_data_key columns, and every entry sealed
+with the global key. A few entries are corrupted. Then:
+
+  - init_database() adds the missing columns, existing entries read as version 1
+  - migrate_envelope.migrate() is stopped halfway, then re-run to resume
+  - every entry decrypts to its original value through decrypt_entries(),
+    and the corrupted ones are reported and left at version 1
+  - rotate_kek.rotate() rewraps all data keys under a new KEK, so the old
+    KEK can be dropped; its time is compared with re-encrypting every entry
+  - racing first-use provisioning keeps a single data key per user
+  - key_for() latency with a cold and a warm DEK cache
+
+Usage:
+  python scripts/bench_envelope.py --users 200 --entries 50
+"""
+import argparse
+import os
+import random
+import string
+import tempfile
+import time
+
+import bench_common  # noqa: F401  (import path + throwaway secrets)
+from bench_common import summarize
+
+os.environ["DATABASE_URL"] = f"sqlite:///{tempfile.mkdtemp()}/vault.db"
+
+from cryptography.fernet import Fernet
+from sqlalchemy import text
+
+from app.core.envelope import DataKeyError, DataKeyManager
+from app.core.security import ENVELOPE_ENCRYPTION_VERSION, encryption_manager
+from app.database.init_db import init_database
+from app.database.session import Base, SessionLocal, engine
+from app.models.password_entry import PasswordEntry
+from app.models.user import User
+
+import migrate_envelope
+import rotate_kek
+
+
+def build_legacy_vault(n_users: int, per_user: int, rng: random.Random) -> dict:
+    """The old schema and old encryption. Returns entry id -> plaintext."""
+    Base.metadata.create_all(bind=engine)
+    with engine.begin() as conn:
+        conn.execute(text("ALTER TABLE users DROP COLUMN wrapped_data_key"))
+        conn.execute(text("ALTER TABLE password_entries DROP COLUMN encryption_version"))
+        conn.execute(text("INSERT INTO users (id, username, email, hashed_master_password, is_active, is_superuser) "
+                          "VALUES (:id, :u, :e, 'x', 1, 0)"),
+                     [{"id": u, "u": f"user{u}", "e": f"user{u}@example.com"} for u in range(1, n_users + 1)])
+        plaintexts = {}
+        rows = []
+        for u in range(1, n_users + 1):
+            secrets = ["".join(rng.choice(string.printable[:94]) for _ in range(rng.randint(8, 24)))
+                       for _ in range(per_user)]
+            for secret, sealed in zip(secrets, encryption_manager.encrypt_many(secrets)):
+                entry_id = len(rows) + 1
+                plaintexts[entry_id] = secret
+                rows.append({"id": entry_id, "s": f"site{entry_id}", "t": sealed.value, "u": u})
+        conn.execute(text("INSERT INTO password_entries (id, service, username, encrypted_password, user_id) "
+                          "VALUES (:id, :s, 'me', :t, :u)"), rows)
+    return plaintexts
+
+
+def main(args):
+    rng = random.Random(0)
+    plaintexts = build_legacy_vault(args.users, args.entries, rng)
+    n = len(plaintexts)
+    corrupt = set(rng.sample(sorted(plaintexts), 3))
+    with engine.begin() as conn:
+        conn.execute(text("UPDATE password_entries SET encrypted_password = 'garbage' WHERE id = :id"),
+                     [{"id": i} for i in corrupt])
+
+    init_database()
+    db = SessionLocal()
+    assert db.query(PasswordEntry).filter(PasswordEntry.encryption_version == 1).count() == n
+    print(f"✅ schema upgraded in place: {n:,} legacy entries read as version 1")
+
+    # --- Migration, interrupted halfway then resumed ---
+    quiet = lambda line: None  # noqa: E731
+    first = migrate_envelope.migrate(db, chunk=args.chunk, limit=n // 2, report=quiet)
+    left = db.query(PasswordEntry).filter(PasswordEntry.encryption_version == 1).count()
+    assert left == n - first["migrated"], "a stopped run must keep every committed chunk"
+    second = migrate_envelope.migrate(db, chunk=args.chunk, report=quiet)
+    migrated = first["migrated"] + second["migrated"]
+    seconds = first["seconds"] + second["seconds"]
+    assert migrated == n - len(corrupt) and set(second["failed_ids"]) == corrupt, (first, second)
+    print(f"✅ migrated {migrated:,} entries in two runs (stopped at {first['migrated']:,}): "
+          f"{migrated / seconds:,.0f} entries/s, {len(corrupt)} corrupt entries reported and kept")
+
+    db.expire_all()
+    entries = db.query(PasswordEntry).all()
+    results = encryption_manager.decrypt_entries(db, entries)
+    for entry, result in zip(entries, results):
+        if entry.id in corrupt:
+            assert not result.ok and entry.encryption_version == 1
+        else:
+            assert result.value == plaintexts[entry.id] and entry.encryption_version == ENVELOPE_ENCRYPTION_VERSION
+    print("✅ every migrated entry decrypts to its original value with its owner's data key")
+
+    # --- KEK rotation: O(users) rewraps instead of O(entries) re-encryptions ---
+    old_kek = os.environ["ENCRYPTION_KEY"]
+    new_kek = Fernet.generate_key().decode()
+    rotated = rotate_kek.rotate(db, keys=DataKeyManager(keks=[new_kek, old_kek]), report=quiet)
+    assert rotated["rewrapped"] == args.users and not rotated["failed"]
+    new_only = DataKeyManager(keks=[new_kek])
+    for user_id in rng.sample(range(1, args.users + 1), min(20, args.users)):
+        key = new_only.key_for(db, user_id)
+        mine = [e for e in entries if e.user_id == user_id and e.id not in corrupt]
+        assert [r.value for r in encryption_manager.decrypt_many([e.encrypted_password for e in mine], key)] \
+            == [plaintexts[e.id] for e in mine]
+    try:
+        DataKeyManager(keks=[old_kek]).key_for(db, 1)
+        raise AssertionError("the retired KEK still opens a data key")
+    except DataKeyError:
+        pass
+    reencrypt = n / (migrated / seconds)
+    print(f"✅ KEK rotated: {rotated['rewrapped']:,} data keys in {rotated['seconds'] * 1000:.0f} ms "
+          f"(re-encrypting all {n:,} entries takes ~{reencrypt * 1000:.0f} ms); old KEK no longer needed")
+
+    # --- First-use provisioning under a race ---
+    db.add(User(id=args.users + 1, username="late", email="late@example.com", hashed_master_password="x"))
+    db.commit()
+    keys = DataKeyManager(keks=[new_kek])
+    racer = DataKeyManager(keks=[new_kek])
+    first_key = keys.key_for(db, args.users + 1)
+    other = SessionLocal()
+    assert racer._provision(other, args.users + 1) == db.query(User.wrapped_data_key).filter(
+        User.id == args.users + 1).scalar(), "a second provisioning must not replace the first data key"
+    assert racer.key_for(other, args.users + 1) == first_key
+    other.close()
+    print("✅ concurrent first-use provisioning keeps one data key per user")
+
+    # --- DEK cache ---
+    keys = DataKeyManager(keks=[new_kek], cache_size=args.users)
+    user_ids = list(range(1, args.users + 1))
+    cold, warm = [], []
+    for samples in (cold, warm):
+        for user_id in user_ids:
+            start = time.perf_counter()
+            keys.key_for(db, user_id)
+            samples.append(time.perf_counter() - start)
+    print()
+    summarize("key_for, cold (DB + unwrap)", cold)
+    summarize("key_for, warm (LRU)", warm)
+    small = DataKeyManager(keks=[new_kek], cache_size=10)
+    for user_id in user_ids:
+        small.key_for(db, user_id)
+    assert small.stats()["entries"] == 10
+    print(f"✅ DEK cache stays bounded: {small.stats()}")
+    db.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=200)
+    parser.add_argument("--entries", type=int, default=50, help="entries per user")
+    parser.add_argument("--chunk", type=int, default=500)
+    main(parser.parse_args())
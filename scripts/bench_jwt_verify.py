@@ -0,0 +1,194 @@
+"""
+Bearer token check: python-jose vs the stdlib HS256 verifier vs the verified-token cache
+
+Micro-benchmarks in-process, no server:
+
+  verify    one token decoded N times by jose.jwt.decode, by HS256Verifier
+            and by decode_access_token with a warm token_cache
+  chain     the auth dependency chain on its own: OAuth2PasswordBearer on a
+            bare Request, then get_current_user (principal cache warm, so
+            token handling is all that differs between the rows)
+
+Then it asserts that:
+
+  - HS256Verifier rejects every token python-jose rejects (tampered, wrong
+    key, alg none/HS512, expired, nbf, aud, malformed ...) and accepts the
+    same claims otherwise, except the cases in STRICTER
+
+  - rejected tokens are never cached
+  - a cached token stops being accepted at its exp, not later
+
+Usage:
+  python scripts/bench_jwt_verify.py --iterations 20000
+"""
+import argparse
+import asyncio
+import base64
+import hashlib
+import hmac
+import json
+import os
+import tempfile
+import time
+from datetime import timedelta
+
+import bench_common  # noqa: F401  (import path + throwaway secrets)
+
+os.environ["DATABASE_URL"] = f"sqlite:///{tempfile.mkdtemp()}/vault.db"
+
+from jose import jwt
+from starlette.requests import Request
+
+from app.api.deps import get_current_user, oauth2_scheme
+from app.config import settings
+from app.core.jwt import create_access_token, decode_access_token, hs256_verifier, token_cache
+from app.core.principals import principal_cache
+from app.database.init_db import init_database
+from app.database.session import SessionLocal
+from app.models.password_entry import PasswordEntry  # noqa: F401  (registers the mapper)
+from app.models.user import User
+
+SECRET = settings.JWT_SECRET_KEY
+# Tokens jose lets through and the stdlib verifier refuses on purpose
+STRICTER = {"non-ascii"}   # jose's base64 decoding silently drops the stray character
+
+
+def b64(data: bytes) -> str:
+    return base64.urlsafe_b64encode(data).rstrip(b"=").decode()
+
+
+def forge(header: dict, claims: dict, key: str = SECRET) -> str:
+    """Hand-built HS256-signed token, whatever the header claims."""
+    signing_input = f"{b64(json.dumps(header).encode())}.{b64(json.dumps(claims).encode())}"
+    sig = hmac.new(key.encode(), signing_input.encode(), hashlib.sha256).digest()
+    return f"{signing_input}.{b64(sig)}"
+
+
+def per_op_us(fn, n: int) -> float:
+    start = time.perf_counter()
+    for _ in range(n):
+        fn()
+    return (time.perf_counter() - start) / n * 1e6
+
+
+def jose_decode(token: str):
+    try:
+        return jwt.decode(token, SECRET, algorithms=["HS256"])
+    except Exception:
+        return None
+
+
+def parity_cases():
+    now = int(time.time())
+    good = {"sub": "1", "exp": now + 600}
+    token = create_access_token({"sub": "1"})
+    head, body, sig = token.split(".")
+    none_header = b64(json.dumps({"alg": "none", "typ": "JWT"}).encode())
+    return {
+        "valid": token,
+        "valid, extra claims": jwt.encode({**good, "iat": now, "jti": "abc"}, SECRET, algorithm="HS256"),
+        "no exp": jwt.encode({"sub": "1"}, SECRET, algorithm="HS256"),
+        "tampered payload": f"{head}.{b64(json.dumps({'sub': '2', 'exp': now + 600}).encode())}.{sig}",
+        "tampered signature": f"{head}.{body}.{sig[:-2]}{'AA' if sig[-2:] != 'AA' else 'BB'}",
+        "wrong key": jwt.encode(good, "another-secret", algorithm="HS256"),
+        "alg none": f"{none_header}.{body}.",
+        "alg HS512": jwt.encode(good, SECRET, algorithm="HS512"),
+        "header says HS512, HS256 sig": forge({"alg": "HS512", "typ": "JWT"}, good),
+        "expired": jwt.encode({"sub": "1", "exp": now - 5}, SECRET, algorithm="HS256"),
+        "not yet valid (nbf)": jwt.encode({**good, "nbf": now + 300}, SECRET, algorithm="HS256"),
+        "audience": jwt.encode({**good, "aud": "someone"}, SECRET, algorithm="HS256"),
+        "sub not a string": forge({"alg": "HS256"}, {"sub": 1, "exp": now + 600}),
+        "claims not an object": forge({"alg": "HS256"}, ["sub", "1"]),
+        "two segments": f"{head}.{body}",
+        "four segments": f"{token}.{sig}",
+        "not base64": f"{head}.{body}.!!!",
+        "non-ascii": token + "é",
+        "empty": "",
+    }
+
+
+async def chain_once(request: Request, db):
+    token = await oauth2_scheme(request)
+    return get_current_user(token=token, db=db)
+
+
+def chain_us(request: Request, db, n: int) -> float:
+    async def run():
+        start = time.perf_counter()
+        for _ in range(n):
+            await chain_once(request, db)
+        return (time.perf_counter() - start) / n * 1e6
+    return asyncio.run(run())
+
+
+def main(args):
+    n = args.iterations
+    init_database()
+    db = SessionLocal()
+    user = User(username="alice", email="alice@example.com", hashed_master_password="x")
+    db.add(user)
+    db.commit()
+    token = create_access_token({"sub": str(user.id)})
+
+    # Parity first: a faster verifier is only worth it if it is as strict
+    print(f"\n{'case':<32} {'jose':>8} {'stdlib':>8}")
+    for label, case in parity_cases().items():
+        expected, got = jose_decode(case), hs256_verifier.verify(case)
+        print(f"{label:<32} {'accept' if expected else 'reject':>8} {'accept' if got else 'reject':>8}"
+              f"{'  (stricter)' if label in STRICTER else ''}")
+        if label in STRICTER:
+            expected = None
+        assert got == expected, f"{label}: jose={expected} stdlib={got}"
+        before = token_cache.stats()["entries"]
+        decode_access_token(case)
+        if expected is None:
+            assert token_cache.stats()["entries"] == before, f"{label}: rejected token was cached"
+    print("✅ stdlib verifier is at least as strict as python-jose; rejected tokens are not cached")
+
+    # verify: one token, three ways
+    token_cache.clear()
+    decode_access_token(token)
+    jose_us = per_op_us(lambda: jwt.decode(token, SECRET, algorithms=["HS256"]), n)
+    lean_us = per_op_us(lambda: hs256_verifier.verify(token), n)
+    cached_us = per_op_us(lambda: decode_access_token(token), n)
+    print(f"\n{'verify one token':<32} {'us/op':>8} {'speed-up':>9}")
+    for label, us in (("python-jose jwt.decode", jose_us), ("HS256Verifier.verify", lean_us),
+                      ("decode_access_token (cached)", cached_us)):
+        print(f"{label:<32} {us:8.2f} {jose_us / us:8.1f}x")
+    assert lean_us < jose_us and cached_us < lean_us
+
+    # chain: OAuth2PasswordBearer + get_current_user, principal already cached
+    request = Request({"type": "http", "method": "GET", "path": "/", "query_string": b"",
+                       "headers": [(b"authorization", f"Bearer {token}".encode())]})
+    principal_cache.invalidate()
+    assert asyncio.run(chain_once(request, db)).id == user.id
+    size = token_cache.max_entries
+    rows = []
+    for label, fast, cache_size in (("jose, no token cache", False, 0),
+                                    ("stdlib HS256, no token cache", True, 0),
+                                    ("stdlib HS256 + token cache", True, size)):
+        settings.JWT_FAST_HS256 = fast
+        token_cache.max_entries = cache_size
+        token_cache.clear()
+        rows.append((label, chain_us(request, db, n)))
+    print(f"\n{'auth dependency chain':<32} {'us/req':>8} {'speed-up':>9}")
+    for label, us in rows:
+        print(f"{label:<32} {us:8.2f} {rows[0][1] / us:8.1f}x")
+    assert rows[2][1] < rows[1][1] < rows[0][1]
+    print(f"token cache: {token_cache.stats()}")
+
+    # A cached token dies at its exp
+    short = create_access_token({"sub": str(user.id)}, expires_delta=timedelta(seconds=2))
+    exp = decode_access_token(short)["exp"]
+    assert decode_access_token(short) is not None and token_cache.get(short) is not None
+    time.sleep(max(0.0, exp - time.time()))
+    expired = token_cache.expired
+    assert decode_access_token(short) is None and token_cache.expired == expired + 1
+    print("✅ a cached token is rejected from its exp on")
+    db.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--iterations", type=int, default=20000, help="calls per measurement")
+    main(parser.parse_args())
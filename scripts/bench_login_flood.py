@@ -0,0 +1,180 @@
+"""
+Login flood load test: vault CRUD latency while /api/auth/token is hammered
+
+Runs the real app under uvicorn in a child process, on a throwaway SQLite
+database. One client keeps reading vault entries (list + get one,
+sequentially). Meanwhile an open-loop flood fires --rate logins per second,
+mostly with wrong passwords. That is far more than bcrypt can serve, and
+the flood never backs off on 503. The phases are:
+
+  idle      no logins
+  legacy    logins through a sync route that runs bcrypt in the shared
+            threadpool, the way /token used to (mounted by this script only)
+  pooled    logins through /api/auth/token (bcrypt on its bounded pool)
+
+It reports CRUD latency per phase, login outcomes (200 / 401 / 503) and
+the bcrypt pool's stats. It then asserts that surplus logins were shed
+with 503, and that CRUD got through many times more requests than under
+the legacy flood.
+
+Usage:
+  python scripts/bench_login_flood.py --rate 30 --seconds 5
+"""
+import argparse
+import asyncio
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from collections import Counter
+
+import bench_common  # noqa: F401  (import path + throwaway secrets)
+from bench_common import percentile, summarize
+
+import httpx
+
+MASTER = "correct-horse-battery-staple"
+
+
+def serve(port: int):
+    """Child process: the app plus the legacy login route and a stats route."""
+    os.environ["DATABASE_URL"] = f"sqlite:///{tempfile.mkdtemp()}/vault.db"
+    import uvicorn
+    from fastapi import Depends, HTTPException
+    from fastapi.security import OAuth2PasswordRequestForm
+
+    from app.core.hashing import bcrypt_pool
+    from app.database.session import get_db
+    from app.main import app
+    from app.services.user_services import user_service
+
+    @app.post("/bench/legacy-token")
+    def legacy_login(form_data: OAuth2PasswordRequestForm = Depends(), db=Depends(get_db)):
+        """The old login: a sync route, so bcrypt holds a shared threadpool thread."""
+        if not user_service.authenticate_user(db, form_data.username, form_data.password):
+            raise HTTPException(status_code=401)
+        return {"ok": True}
+
+    @app.get("/bench/hashing-stats")
+    def hashing_stats():
+        return bcrypt_pool.stats()
+
+    uvicorn.run(app, host="127.0.0.1", port=port, log_level="warning")
+
+
+def start_server() -> (subprocess.Popen, str):
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        port = s.getsockname()[1]
+    proc = subprocess.Popen([sys.executable, __file__, "--serve", str(port)])
+    base_url = f"http://127.0.0.1:{port}"
+    for _ in range(600):
+        try:
+            httpx.get(f"{base_url}/health", timeout=1)
+            return proc, base_url
+        except httpx.TransportError:
+            time.sleep(0.1)
+    proc.kill()
+    raise RuntimeError("server did not start")
+
+
+async def crud_loop(client, headers, entry_ids, stop: asyncio.Event, samples: list):
+    i = 0
+    while not stop.is_set():
+        start = time.perf_counter()
+        if i % 2:
+            r = await client.get("/api/passwords/", headers=headers)
+        else:
+            r = await client.get(f"/api/passwords/{entry_ids[i % len(entry_ids)]}", headers=headers)
+        r.raise_for_status()
+        samples.append(time.perf_counter() - start)
+        i += 1
+
+
+async def login(client, path: str, n: int, outcomes: Counter, latencies: list):
+    # Mostly wrong passwords, as in a credential-stuffing flood
+    form = {"username": "alice", "password": MASTER if n % 10 == 0 else f"guess-{n}"}
+    start = time.perf_counter()
+    r = await client.post(path, data=form)
+    outcomes[r.status_code] += 1
+    latencies.append(time.perf_counter() - start)
+
+
+async def login_flood(client, path: str, rate: float, stop: asyncio.Event, outcomes: Counter, latencies: list):
+    """Open loop: a new login every 1/rate seconds, whether or not earlier ones finished."""
+    sent = []
+    start = time.perf_counter()
+    while not stop.is_set():
+        sent.append(asyncio.create_task(login(client, path, len(sent), outcomes, latencies)))
+        await asyncio.sleep(max(0.0, start + len(sent) / rate - time.perf_counter()))
+    await asyncio.gather(*sent)
+
+
+async def phase(client, headers, entry_ids, label: str, login_path, rate: float, seconds: float):
+    stop = asyncio.Event()
+    crud, logins, outcomes = [], [], Counter()
+    tasks = [asyncio.create_task(crud_loop(client, headers, entry_ids, stop, crud))]
+    if login_path:
+        tasks.append(asyncio.create_task(login_flood(client, login_path, rate, stop, outcomes, logins)))
+    await asyncio.sleep(seconds)
+    stop.set()
+    await asyncio.gather(*tasks)
+    summarize(f"CRUD during {label}", crud)
+    if login_path:
+        print(f"{'':<32} logins: {dict(sorted(outcomes.items()))}  "
+              f"p50={percentile([t * 1000 for t in logins], 50):.0f} ms")
+    return crud, outcomes
+
+
+async def run(args, base_url: str):
+    limits = httpx.Limits(max_connections=None)
+    async with httpx.AsyncClient(base_url=base_url, timeout=120, limits=limits) as client:
+        r = await client.post("/api/auth/register",
+                              json={"username": "alice", "email": "alice@example.com", "master_password": MASTER})
+        assert r.status_code == 201, r.text
+        r = await client.post("/api/auth/token", data={"username": "alice", "password": MASTER})
+        assert r.status_code == 200, r.text
+        headers = {"Authorization": f"Bearer {r.json()['access_token']}"}
+        entry_ids = []
+        for i in range(20):
+            r = await client.post("/api/passwords/", headers=headers,
+                                  json={"service": f"site{i}", "username": "alice", "password": f"secret-{i}"})
+            assert r.status_code == 201, r.text
+            entry_ids.append(r.json()["id"])
+
+        pool = (await client.get("/bench/hashing-stats")).json()
+        print(f"\nbcrypt pool: {pool['workers']} worker(s), queue {pool['max_queue']}; "
+              f"flood of {args.rate:g} logins/s; {os.cpu_count()} CPU(s)\n")
+        idle, _ = await phase(client, headers, entry_ids, "idle", None, 0, args.seconds)
+        legacy, _ = await phase(client, headers, entry_ids, "legacy flood", "/bench/legacy-token",
+                                args.rate, args.seconds)
+        pooled, outcomes = await phase(client, headers, entry_ids, "pooled flood", "/api/auth/token",
+                                       args.rate, args.seconds)
+        print(f"\nbcrypt pool stats: {(await client.get('/bench/hashing-stats')).json()}")
+
+    assert outcomes[503] > 0, "a flood beyond the pool's capacity must be shed with 503"
+    assert outcomes[200] > 0, "logins must keep succeeding during the flood"
+    assert len(pooled) > 5 * len(legacy), "CRUD must keep flowing during the pooled flood"
+    print(f"✅ CRUD requests served in {args.seconds:g}s: idle {len(idle):,}, pooled flood {len(pooled):,}, "
+          f"legacy flood {len(legacy):,}; surplus logins shed with 503")
+
+
+def main(args):
+    if args.serve:
+        return serve(args.serve)
+    proc, base_url = start_server()
+    try:
+        asyncio.run(run(args, base_url))
+    finally:
+        proc.terminate()
+        proc.wait()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rate", type=float, default=30.0, help="logins per second offered by the flood")
+    parser.add_argument("--seconds", type=float, default=5.0, help="length of each phase")
+    parser.add_argument("--serve", type=int, default=0, help=argparse.SUPPRESS)
+    main(parser.parse_args())
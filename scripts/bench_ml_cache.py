@@ -0,0 +1,97 @@
+"""
+Prediction cache benchmark for the strength model
+
+Compares an uncached model with the feature-tuple LRU and the precomputed
+threshold table. It checks that all three give identical scores (including
+long and non-ASCII passwords), reports how many distinct feature tuples a
+batch of passwords collapses to, and checks that touching the manifest (or
+model file) starts the new model with fresh caches. Needs a trained model:
+  cd backend && python -m app.ml.train
+
+Usage:
+  python scripts/bench_ml_cache.py --passwords 20000
+"""
+import argparse
+import os
+import secrets
+import string
+
+import bench_common  # noqa: F401  (import path + throwaway secrets)
+
+from app.config import settings
+from app.ml.features import extract_features
+from app.ml.password_strength import CANARY_PASSWORDS, COMPILED_MODEL_PATH, MODEL_PATH, PasswordStrengthModel
+from app.ml.registry import model_registry
+from bench_ml_predict import best_of
+
+ALPHABET = string.ascii_letters + string.digits + string.punctuation + " éü€漢"
+
+
+def mixed_passwords(n: int):
+    """Realistic lengths plus a long tail up to 64 characters, some non-ASCII."""
+    passwords = []
+    for _ in range(n):
+        length = 4 + secrets.randbelow(17) if secrets.randbelow(10) else 1 + secrets.randbelow(64)
+        passwords.append("".join(secrets.choice(ALPHABET) for _ in range(length)))
+    return passwords
+
+
+def make_model(cache_size: int, table: bool) -> PasswordStrengthModel:
+    settings.ML_PREDICTION_CACHE_SIZE = cache_size
+    settings.ML_PREDICTION_TABLE_ENABLED = table
+    model = PasswordStrengthModel()
+    model.load()
+    return model
+
+
+def main(args):
+    plain = make_model(0, False)
+    if not plain.model:
+        raise SystemExit("Train the model first: cd backend && python -m app.ml.train")
+    lru = make_model(args.cache_size, False)
+    table = make_model(args.cache_size, True)
+
+    passwords = mixed_passwords(args.passwords)
+    distinct = len({extract_features(p) for p in passwords})
+    print(f"\n{len(passwords):,} passwords -> {distinct:,} distinct feature tuples")
+
+    expected = [plain.predict(p)["score"] for p in passwords[:2000]]
+    for name, model in (("lru", lru), ("table", table)):
+        assert [model.predict(p)["score"] for p in passwords[:2000]] == expected, f"{name} predict() differs"
+        assert [r["score"] for r in model.predict_many(passwords)] == \
+               [r["score"] for r in plain.predict_many(passwords)], f"{name} predict_many() differs"
+    print("✅ identical scores from the uncached model, the LRU and the table")
+
+    sample = passwords[:args.single]
+    print(f"\n{'engine':<10} {'predict() each':>18} {f'predict_many({len(passwords)})':>24}")
+    for name, model in (("uncached", plain), ("lru", lru), ("table", table)):
+        single = best_of(3, lambda: [model.predict(p) for p in sample]) / len(sample)
+        batch = best_of(3, lambda: model.predict_many(passwords))
+        print(f"{name:<10} {single * 1e6:14.1f} us {batch * 1000:20.2f} ms")
+
+    print(f"\nLRU stats:   {lru.cache_stats()['lru']}")
+    print(f"Table stats: {table.cache_stats()['table']}")
+
+    # A changed model must come with empty caches
+    settings.ML_PREDICTION_TABLE_ENABLED = False  # reload `lru` as it was built
+    if model_registry.exists():
+        path = model_registry.manifest_path
+    else:
+        path = COMPILED_MODEL_PATH if COMPILED_MODEL_PATH.exists() else MODEL_PATH
+    stat = path.stat()
+    try:
+        os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+        assert lru.check_for_updates()   # what the background watcher does
+    finally:
+        os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+    # Only the canary warm-up batch is cached by the new model
+    assert lru.reloads == 1 and lru.cache_stats()["lru"]["entries"] <= len(CANARY_PASSWORDS)
+    print(f"✅ touching {path.name} reloaded the model with a fresh cache")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--passwords", type=int, default=20000)
+    parser.add_argument("--single", type=int, default=2000, help="passwords timed one predict() at a time")
+    parser.add_argument("--cache-size", type=int, default=65536)
+    main(parser.parse_args())
@@ -0,0 +1,66 @@
+"""
+Compiled forest benchmark: parity and speed against scikit-learn
+
+Loads the joblib model and its compiled export, asserts predict_proba is
+bit-for-bit identical on random feature rows and real password features,
+then times both engines at several batch sizes. Parity of the export itself
+(threshold edges included) is tested on a small forest in
+backend/tests/test_compiled_forest.py; this checks the trained artifacts.
+Needs both artifacts:
+  cd backend && python -m app.ml.train
+
+Usage:
+  python scripts/bench_ml_compiled.py --sizes 1 10 100 1000 10000
+"""
+import argparse
+import time
+
+import numpy as np
+
+import bench_common  # noqa: F401  (import path + throwaway secrets)
+
+from app.ml.features import extract_features_batch
+from app.ml.forest import CompiledForest
+from app.ml.password_strength import COMPILED_MODEL_PATH, MODEL_PATH
+from bench_ml_predict import best_of, random_passwords
+
+
+def check_parity(clf, forest: CompiledForest, rows: int):
+    rng = np.random.default_rng(7)
+    random_rows = rng.integers(0, 64, size=(rows, clf.n_features_in_))
+    real_rows = extract_features_batch(random_passwords(rows))
+    for label, X in (("random feature rows", random_rows), ("password features", real_rows)):
+        for size in (1, 7, 1023, 1025, rows):  # straddle the chunk boundary too
+            expected = clf.predict_proba(X[:size])
+            actual = forest.predict_proba(X[:size])
+            assert np.array_equal(expected, actual), f"mismatch on {size} {label}"
+        print(f"✅ identical predict_proba on {rows:,} {label}")
+
+
+def main(args):
+    import joblib
+
+    if not (MODEL_PATH.exists() and COMPILED_MODEL_PATH.exists()):
+        raise SystemExit("Train and export the model first: cd backend && python -m app.ml.train")
+
+    clf = joblib.load(MODEL_PATH)
+    forest = CompiledForest.load(COMPILED_MODEL_PATH)
+    print(f"Forest: {forest.n_estimators} trees, {forest.node_count:,} nodes, max depth {forest.max_depth}, "
+          f"{forest.nbytes:,} bytes")
+    check_parity(clf, forest, args.parity_rows)
+
+    print(f"\n{'batch':>7} {'sklearn':>18} {'compiled':>18} {'speedup':>9}")
+    rng = np.random.default_rng(1)
+    for size in args.sizes:
+        X = rng.integers(0, 40, size=(size, clf.n_features_in_))
+        repeats = max(3, min(200, 20000 // size))
+        sk = best_of(repeats, lambda: clf.predict_proba(X))
+        compiled = best_of(repeats, lambda: forest.predict_proba(X))
+        print(f"{size:>7} {sk * 1000:14.3f} ms {compiled * 1000:14.3f} ms {sk / compiled:8.1f}x")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1, 10, 100, 1000, 10000])
+    parser.add_argument("--parity-rows", type=int, default=20000)
+    main(parser.parse_args())
@@ -0,0 +1,80 @@
+"""
+Synthetic training data benchmark: per-password loop vs NumPy bulk generation
+
+Checks before timing anything:
+  * the vectorized feature counts equal extract_features() on the same
+    passwords, rebuilt as strings
+  * both generators produce the same feature distributions (means)
+  * a seed gives the same dataset whatever the number of jobs
+
+Then reports rows/s of generate_synthetic_data() against
+generate_synthetic_data_vectorized() with 1 and N processes.
+
+Usage:
+  python scripts/bench_ml_datagen.py --samples 1000000 --jobs 4
+"""
+import argparse
+import time
+
+import numpy as np
+
+import bench_common  # noqa: F401  (import path + throwaway secrets)
+
+from app.ml import train
+
+
+def check_features():
+    rng = np.random.default_rng(7)
+    for _, alphabet, min_len, max_len in (train.WEAK_RECIPE, train.STRONG_RECIPE):
+        chars, lengths = train._draw_passwords(rng, 5000, len(alphabet), min_len, max_len)
+        fast = train._features_from_indices(chars, lengths, train._alphabet_classes(alphabet))
+        passwords = ["".join(alphabet[i] for i in row[:n]) for row, n in zip(chars, lengths)]
+        assert np.array_equal(fast, [train.extract_features(p) for p in passwords]), "feature mismatch"
+    print("✅ vectorized features match extract_features() on 10,000 passwords")
+
+
+def check_distribution():
+    X_py, y_py = train.generate_synthetic_data(20000)
+    X_np, y_np = train.generate_synthetic_data_vectorized(20000, seed=1)
+    for label in (0, 1):
+        py_mean, np_mean = X_py[y_py == label].mean(axis=0), X_np[y_np == label].mean(axis=0)
+        assert np.allclose(py_mean, np_mean, atol=0.25), f"label {label}: {py_mean} vs {np_mean}"
+    print("✅ feature means agree with the original generator")
+
+
+def check_seed(jobs: int):
+    n = 3 * train.CHUNK_SAMPLES
+    one = train.generate_synthetic_data_vectorized(n, seed=123, jobs=1)
+    many = train.generate_synthetic_data_vectorized(n, seed=123, jobs=jobs)
+    assert all(np.array_equal(a, b) for a, b in zip(one, many)), "seeded data depends on jobs"
+    print(f"✅ seed 123 gives identical data with 1 and {jobs} jobs")
+
+
+def rate(fn, n: int) -> str:
+    start = time.perf_counter()
+    X, _ = fn(n)
+    elapsed = time.perf_counter() - start
+    assert len(X) == n
+    return f"{n / elapsed:>12,.0f} rows/s ({elapsed:6.2f}s)"
+
+
+def main(args):
+    check_features()
+    check_distribution()
+    check_seed(args.jobs)
+
+    print(f"\n{'rows':>10}  {'python loop':>28}  {'vectorized, 1 job':>28}  {f'vectorized, {args.jobs} jobs':>28}")
+    for n in (2000, 100_000, args.samples):
+        python = rate(train.generate_synthetic_data, n) if n <= args.python_max else "(skipped)"
+        single = rate(lambda k: train.generate_synthetic_data_vectorized(k, seed=0), n)
+        multi = rate(lambda k: train.generate_synthetic_data_vectorized(k, seed=0, jobs=args.jobs), n)
+        print(f"{n:>10,}  {python:>28}  {single:>28}  {multi:>28}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--samples", type=int, default=1_000_000)
+    parser.add_argument("--jobs", type=int, default=4)
+    parser.add_argument("--python-max", type=int, default=100_000,
+                        help="largest size timed with the slow per-password loop")
+    main(parser.parse_args())
@@ -0,0 +1,71 @@
+"""
+Feature extraction benchmark: per-string passes vs the batch encoder
+
+Checks that features.extract_features() and extract_features_batch()
+agree with each other. It also checks them against the original six-pass
+train.py definition, on random passwords mixing ASCII, accented letters,
+CJK, emoji, digits from other scripts, lone surrogates and empty strings.
+Then reports passwords/s for:
+
+  six passes    the original train.extract_features()
+  one pass      features.extract_features() in a loop
+  batch         features.extract_features_batch()
+
+Usage:
+  python scripts/bench_ml_features.py --sizes 10 1000 100000
+"""
+import argparse
+import random
+import string
+
+import numpy as np
+
+import bench_common  # noqa: F401  (import path + throwaway secrets)
+
+from app.ml.features import extract_features, extract_features_batch
+from bench_ml_predict import best_of
+
+CHARACTERS = (string.ascii_letters + string.digits + string.punctuation + " "
+              + "äöüßÉñçø" + "漢字パスワード" + "٣٤५६" + "ΑΩαω" + "😀🔑" + "\ud800")
+
+
+def six_passes(password: str):
+    """The original train.py definition, kept here as the reference."""
+    return [
+        len(password),
+        sum(c.isdigit() for c in password),
+        sum(c.isupper() for c in password),
+        sum(c.islower() for c in password),
+        sum(c in string.punctuation for c in password),
+        len(set(password)),
+    ]
+
+
+def random_passwords(n: int, rng: random.Random):
+    return ["".join(rng.choice(CHARACTERS) for _ in range(rng.randint(0, 24))) for _ in range(n)]
+
+
+def main(args):
+    rng = random.Random(0)
+    passwords = random_passwords(20000, rng) + ["", "a", "aaaa", "\ud800\ud800"]
+    reference = np.array([six_passes(p) for p in passwords])
+    assert np.array_equal(reference, [extract_features(p) for p in passwords]), "single-pass mismatch"
+    assert np.array_equal(reference, extract_features_batch(passwords)), "batch mismatch"
+    assert extract_features_batch([]).shape == (0, 6)
+    print(f"✅ one-pass and batch features match the original definition on {len(passwords):,} passwords")
+
+    print(f"\n{'batch':>8} {'six passes':>16} {'one pass':>16} {'batch':>16} {'speedup':>8}")
+    for n in args.sizes:
+        batch = random_passwords(n, rng)
+        repeats = max(1, min(50, 20000 // n))
+        slow = best_of(repeats, lambda: [six_passes(p) for p in batch])
+        loop = best_of(repeats, lambda: [extract_features(p) for p in batch])
+        fast = best_of(repeats, lambda: extract_features_batch(batch))
+        print(f"{n:>8,} {n / slow:>12,.0f} pw/s {n / loop:>12,.0f} pw/s {n / fast:>12,.0f} pw/s "
+              f"{slow / fast:>7.1f}x")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10, 1000, 100_000])
+    main(parser.parse_args())
@@ -0,0 +1,88 @@
+"""
+Micro-batching benchmark for /api/ml/predict
+
+Drives the predict endpoint with many concurrent callers, first with one
+thread-pool model call per request (the default) and then through the
+micro-batcher, and reports throughput, latency and the batch sizes seen.
+Needs a trained model:
+  cd backend && python -m app.ml.train
+
+Usage:
+  python scripts/bench_ml_microbatch.py --concurrency 1 16 64 --requests 2000
+"""
+import argparse
+import asyncio
+import secrets
+import string
+import time
+
+from bench_common import summarize
+
+from app.api.ml import MLRequest, predict_strength
+from app.ml.batcher import MicroBatcher
+from app.ml.password_strength import password_strength_model
+import app.api.ml as ml_api
+
+ALPHABET = string.ascii_letters + string.digits + string.punctuation
+
+
+def random_passwords(n: int):
+    return ["".join(secrets.choice(ALPHABET) for _ in range(4 + secrets.randbelow(17))) for _ in range(n)]
+
+
+async def drive(passwords, concurrency: int):
+    """Run every password through the endpoint with `concurrency` callers. Returns (elapsed, latencies, results)."""
+    latencies = []
+    results = [None] * len(passwords)
+    cursor = iter(range(len(passwords)))
+
+    async def caller():
+        for i in cursor:
+            start = time.perf_counter()
+            results[i] = await predict_strength(MLRequest(password=passwords[i]))
+            latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(caller() for _ in range(concurrency)))
+    return time.perf_counter() - start, latencies, results
+
+
+async def main(args):
+    password_strength_model.load()
+    if not password_strength_model.model:
+        raise SystemExit("Train the model first: cd backend && python -m app.ml.train")
+
+    passwords = random_passwords(args.requests)
+    expected = [r["score"] for r in password_strength_model.predict_many(passwords)]
+
+    for concurrency in args.concurrency:
+        print(f"\n--- {args.requests} requests, {concurrency} concurrent callers ---")
+
+        elapsed, latencies, results = await drive(passwords, concurrency)
+        assert [r["score"] for r in results] == expected
+        summarize(f"thread pool ({args.requests / elapsed:,.0f} req/s)", latencies)
+
+        batcher = MicroBatcher(password_strength_model.predict_many, args.window_ms, args.max_size)
+        original, ml_api.micro_batcher = ml_api.micro_batcher, batcher
+        await batcher.start()
+        try:
+            elapsed, latencies, results = await drive(passwords, concurrency)
+        finally:
+            await batcher.stop()
+            ml_api.micro_batcher = original
+        assert [r["score"] for r in results] == expected
+        summarize(f"micro-batched ({args.requests / elapsed:,.0f} req/s)", latencies)
+
+        stats = batcher.stats()
+        sizes = ", ".join(f"{k}: {v}" for k, v in stats["batch_size_histogram"].items() if v)
+        print(f"   {stats['batches']} batches, mean size {stats['mean_batch_size']:.1f} ({sizes})")
+        print(f"   queue delay p50={stats['queue_delay_ms']['p50']:.3f} ms p99={stats['queue_delay_ms']['p99']:.3f} ms")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 16, 64])
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--window-ms", type=float, default=2.0)
+    parser.add_argument("--max-size", type=int, default=64)
+    asyncio.run(main(parser.parse_args()))
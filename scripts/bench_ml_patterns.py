@@ -0,0 +1,97 @@
+"""
+Pattern engine benchmark: verdicts and latency per password
+
+Checks that the pattern engine rates well-known weak passwords (repeats,
+keyboard walks, l33t words, dates) as Weak and random or passphrase-style
+ones as Strong. It also shows what the forest says about the same passwords.
+It checks the Aho-Corasick automaton against a naive substring search.
+Then it times predict() on random, realistic and worst-case (100-character
+repetitive) inputs.
+
+Usage:
+  python scripts/bench_ml_patterns.py --passwords 5000
+"""
+import argparse
+import random
+import time
+
+import bench_common  # noqa: F401  (import path + throwaway secrets)
+from bench_common import summarize
+
+from app.ml.password_strength import password_strength_model
+from app.ml.patterns import COMPILED_PATH, DATA_DIR, DICTIONARIES, _read_wordlist, pattern_strength_engine
+
+EXPECTED = {
+    "Password1!Password1!": "Weak",
+    "password": "Weak",
+    "p@ssw0rd": "Weak",
+    "qwerty123": "Weak",
+    "1qaz2wsx": "Weak",
+    "asdfghjkl;": "Weak",
+    "drowssap": "Weak",
+    "iloveyou2024": "Weak",
+    "12/05/1999": "Weak",
+    "abcdef123456": "Weak",
+    "aaaaaaaaaaaa": "Weak",
+    "correct horse battery staple": "Strong",
+    "Zq9!vL2#rT8@wP5$": "Strong",
+    "vT7#qL9!xR2@mK4$": "Strong",
+}
+ALPHABET = "abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789!@#$%&*"
+
+
+def check_verdicts():
+    print(f"{'password':<30} {'patterns':<10} {'guesses':>9} {'forest':>8}")
+    for password, expected in EXPECTED.items():
+        result = pattern_strength_engine.predict(password)
+        forest = password_strength_model.predict(password)
+        print(f"{password:<30} {result['label']:<10} 10^{result['guesses_log10']:<6.1f} {forest['label']:>8}"
+              f"   {', '.join(result['patterns'])}")
+        assert result["label"] == expected, f"{password!r}: expected {expected}, got {result}"
+    print("✅ every verdict as expected")
+
+
+def check_automaton(rng: random.Random):
+    words = set()
+    for name in DICTIONARIES:
+        words |= {w for w in _read_wordlist(DATA_DIR / f"{name}.txt") if len(w) >= 3 and w.isascii()}
+    vocabulary = sorted(words)
+    for _ in range(2000):
+        text = "".join(rng.choice([rng.choice(vocabulary), rng.choice("abcxyz0123!")]) for _ in range(4))
+        found = {(m[0], m[1]) for m in pattern_strength_engine._dictionary_matches(text, text.encode().lower())}
+        expected = {(i, i + len(w) - 1) for w in words for i in range(len(text)) if text.startswith(w, i)}
+        assert found == expected, f"{text!r}: {found ^ expected}"
+    print(f"✅ automaton matches a naive substring search ({len(words):,} words, 2,000 strings)")
+
+
+def time_predict(label: str, passwords):
+    samples = []
+    for password in passwords:
+        start = time.perf_counter()
+        pattern_strength_engine.predict(password)
+        samples.append(time.perf_counter() - start)
+    summarize(label, samples)
+
+
+def main(args):
+    rng = random.Random(0)
+    pattern_strength_engine.load()
+    print(f"compiled pattern file: {COMPILED_PATH.stat().st_size / 1024:.0f} KB\n")
+    check_verdicts()
+    check_automaton(rng)
+
+    words = _read_wordlist(DATA_DIR / "english.txt")
+    random_pw = ["".join(rng.choice(ALPHABET) for _ in range(rng.randint(8, 20))) for _ in range(args.passwords)]
+    realistic = [rng.choice(words).capitalize() + str(rng.randint(0, 2030)) + rng.choice("!@#$")
+                 for _ in range(args.passwords)]
+    worst = ["a" * 100, "1234567890" * 10, "Password1!" * 10, "qwertyuiop" * 10, "19870312" * 12]
+    print()
+    time_predict("random 8-20 chars", random_pw)
+    time_predict("word + year + symbol", realistic)
+    time_predict("100-char repetitive (worst)", worst * 20)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--passwords", type=int, default=5000)
+    main(parser.parse_args())
@@ -0,0 +1,60 @@
+"""
+Password strength model benchmark
+
+Throughput of predict() called in a loop vs predict_many() on one batch,
+at several batch sizes. Needs a trained model:
+  cd backend && python -m app.ml.train
+
+Usage:
+  python scripts/bench_ml_predict.py --sizes 1 10 100 10000
+"""
+import argparse
+import secrets
+import string
+import time
+
+import bench_common  # noqa: F401  (import path + throwaway secrets)
+
+from app.ml.password_strength import password_strength_model
+
+ALPHABET = string.ascii_letters + string.digits + string.punctuation
+
+
+def random_passwords(n: int):
+    return ["".join(secrets.choice(ALPHABET) for _ in range(4 + secrets.randbelow(17))) for _ in range(n)]
+
+
+def best_of(repeats: int, fn):
+    best = float("inf")
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main(args):
+    model = password_strength_model
+    model.load()
+    if not model.model:
+        raise SystemExit("Train the model first: cd backend && python -m app.ml.train")
+
+    print(f"{'batch':>7} {'predict() loop':>20} {'predict_many()':>20} {'speedup':>9}")
+    for size in args.sizes:
+        passwords = random_passwords(size)
+        sample = passwords[:200]
+        assert [r["score"] for r in model.predict_many(sample)] == [model.predict(p)["score"] for p in sample]
+        repeats = max(1, min(args.repeats, 2000 // size))
+        loop = best_of(repeats, lambda: [model.predict(p) for p in passwords]) if size <= args.max_loop else None
+        batch = best_of(repeats, lambda: model.predict_many(passwords))
+        loop_txt = f"{size / loop:14,.0f} pw/s" if loop else f"{'(skipped)':>19}"
+        speedup = f"{loop / batch:8.1f}x" if loop else ""
+        print(f"{size:>7} {loop_txt:>20} {size / batch:14,.0f} pw/s {speedup:>9}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1, 10, 100, 10000])
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument("--max-loop", type=int, default=1000, help="largest batch to also time with a predict() loop")
+    main(parser.parse_args())
@@ -0,0 +1,137 @@
+"""
+Model hot-reload check: swap versions under load
+
+Publishes two versions into a temporary registry. v2 is trained on
+inverted labels, so every answer shows which model produced it. Worker
+threads keep calling predict()/predict_many() while the manifest is
+switched to v2 and the watcher's check runs. The script reports the
+reload time and the request latencies around it, and asserts that no
+request failed and that every answer after the swap came from v2.
+It also checks that a tampered artifact, an artifact embedding another
+feature schema version and a manifest entry for a foreign feature schema
+are all refused while the current model keeps serving.
+
+Usage:
+  python scripts/bench_ml_reload.py --threads 4 --seconds 3
+"""
+import argparse
+import json
+import tempfile
+import threading
+import time
+
+import numpy as np
+
+from bench_common import summarize
+
+import app.ml.password_strength as password_strength
+import app.ml.train as train
+from app.ml.registry import ModelRegistry, ModelRegistryError
+
+PROBE = "Zq9!vL2#rT8@wP5$"   # scored strong by v1, weak by the inverted v2
+
+
+def train_model(invert: bool):
+    from sklearn.ensemble import RandomForestClassifier
+
+    X, y = train.generate_synthetic_data(2000)
+    return RandomForestClassifier(n_estimators=100, random_state=42).fit(X, 1 - y if invert else y)
+
+
+def hammer(model, stop, samples, errors, batch: bool):
+    while not stop.is_set():
+        start = time.perf_counter()
+        try:
+            if batch:
+                results = model.predict_many([PROBE] * 16 + ["password"] * 16)
+            else:
+                results = [model.predict(PROBE)]
+            if any(r.get("error") for r in results):
+                errors.append("model not loaded")
+            samples.append((start, time.perf_counter() - start, results[0]["label"]))
+        except Exception as e:  # any exception is a dropped request
+            errors.append(repr(e))
+
+
+def main(args):
+    with tempfile.TemporaryDirectory() as models_dir:
+        registry = ModelRegistry(models_dir)
+        password_strength.model_registry = registry
+        train.model_registry = registry
+        train.MODELS_DIR = registry.models_dir
+
+        print("🧠 Publishing v1 (normal) and v2 (inverted labels)...")
+        train.publish_model(train_model(invert=False))
+        train.publish_model(train_model(invert=True), activate=False)
+
+        model = password_strength.PasswordStrengthModel()
+        model.load()
+        assert model.model_info()["version"] == "v1" and model.predict(PROBE)["label"] == "Strong"
+
+        stop = threading.Event()
+        samples, errors = [], []
+        threads = [threading.Thread(target=hammer, args=(model, stop, samples, errors, i % 2 == 1))
+                   for i in range(args.threads)]
+        for t in threads:
+            t.start()
+
+        time.sleep(args.seconds / 2)
+        registry.activate("v2")
+        reload_started = time.perf_counter()
+        assert model.check_for_updates()          # what the background watcher does
+        reload_finished = time.perf_counter()
+        time.sleep(args.seconds / 2)
+        stop.set()
+        for t in threads:
+            t.join()
+
+        assert not errors, f"{len(errors)} failed requests, e.g. {errors[0]}"
+        during = [s[1] for s in samples if reload_started <= s[0] <= reload_finished]
+        after = [s for s in samples if s[0] > reload_finished]
+        assert after and all(s[2] == "Weak" for s in after), "a request after the swap was served by v1"
+        print(f"✅ {len(samples):,} requests, 0 failed, swapped to {model.model_info()['version']} "
+              f"in {(reload_finished - reload_started) * 1000:.1f} ms")
+        summarize("latency, all requests", [s[1] for s in samples])
+        summarize("latency, during the reload", during or [0.0])
+
+        # A tampered artifact is refused and v2 keeps serving
+        v3 = train.publish_model(train_model(invert=False), activate=False)
+        forest_path = registry.models_dir / f"password_strength_{v3}.forest"
+        with open(forest_path, "r+b") as f:
+            f.seek(-8, 2)
+            f.write(np.float64(0.5).tobytes())
+        try:
+            model.reload(v3)
+            raise AssertionError("tampered model was accepted")
+        except ModelRegistryError as e:
+            print(f"✅ refused tampered {v3}: {e}")
+
+        # So is an artifact that embeds another feature schema version (training/serving skew)
+        train.FEATURE_SCHEMA_VERSION = 99
+        v4 = train.publish_model(train_model(invert=False), activate=False)
+        train.FEATURE_SCHEMA_VERSION = password_strength.FEATURE_SCHEMA_VERSION
+        try:
+            model.reload(v4)
+            raise AssertionError("feature schema skew was accepted")
+        except ModelRegistryError as e:
+            print(f"✅ refused {v4}: {e}")
+
+        # And a manifest entry recorded for a different feature schema
+        manifest = registry.read()
+        manifest["versions"]["v1"]["feature_schema"] = "0" * 64
+        with open(registry.manifest_path, "w") as f:
+            json.dump(manifest, f)
+        try:
+            model.reload("v1")
+            raise AssertionError("schema mismatch was accepted")
+        except ModelRegistryError as e:
+            print(f"✅ refused v1: {e}")
+        assert model.model_info()["version"] == "v2" and model.predict(PROBE)["label"] == "Weak"
+        print("✅ v2 still serving after every failed reload")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--threads", type=int, default=4)
+    parser.add_argument("--seconds", type=float, default=3.0)
+    main(parser.parse_args())
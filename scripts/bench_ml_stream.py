@@ -0,0 +1,96 @@
+"""
+Out-of-core training benchmark: peak memory vs corpus size
+
+Writes synthetic weak/strong password files of growing size (weak ones
+look like leaked lists: short lowercase + digits; strong ones like
+generator output) into a temp directory. Each size is trained in a fresh
+subprocess with train_streaming() + evaluate_streaming() and published
+into a temporary registry. The script reports the file size, the time,
+the holdout accuracy and the subprocess' peak RSS. Peak RSS should stay
+flat as the files grow. Finally the published model is loaded with
+PasswordStrengthModel and scored.
+
+Usage:
+  python scripts/bench_ml_stream.py --sizes 200000 1000000 3000000
+"""
+import argparse
+import json
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+
+from bench_common import backend_path
+
+import app.ml.password_strength as password_strength
+from app.ml import train
+from app.ml.registry import ModelRegistry
+
+TRAIN_PROBE = """
+import json, resource, sys
+from app.ml import train
+from app.ml.registry import ModelRegistry
+
+weak, strong, models_dir, chunk_lines = sys.argv[1], sys.argv[2], sys.argv[3], int(sys.argv[4])
+registry = ModelRegistry(models_dir)
+train.model_registry, train.MODELS_DIR = registry, registry.models_dir
+clf = train.train_streaming([weak], [strong], chunk_lines=chunk_lines)
+counts = train.evaluate_streaming(clf, [weak], [strong], chunk_lines=chunk_lines)
+version = train.publish_model(clf)
+print(json.dumps({"version": version, "accuracy": float(counts.trace() / counts.sum()),
+                  "holdout": int(counts.sum()), "trees": len(clf.estimators_),
+                  "peak_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024}))
+"""
+
+
+def write_corpus(path: Path, recipe, n: int, seed: int):
+    """n random passwords of one train.py recipe, one per line."""
+    _, alphabet, min_len, max_len = recipe
+    symbols = np.array(list(alphabet))
+    rng = np.random.default_rng(seed)
+    with open(path, "w", encoding="utf-8") as f:
+        for start in range(0, n, 100_000):
+            chars, lengths = train._draw_passwords(rng, min(100_000, n - start), len(alphabet), min_len, max_len)
+            rows = symbols[chars]
+            f.write("\n".join("".join(row[:k]) for row, k in zip(rows, lengths)))
+            f.write("\n")
+
+
+def main(args):
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        models_dir = tmp / "models"
+        print(f"{'lines/class':>12} {'files':>9} {'time':>8} {'trees':>6} {'holdout acc':>12} {'peak RSS':>10}")
+        for n in args.sizes:
+            weak, strong = tmp / "weak.txt", tmp / "strong.txt"
+            write_corpus(weak, train.WEAK_RECIPE, n, seed=1)
+            write_corpus(strong, train.STRONG_RECIPE, n, seed=2)
+            size_mb = (weak.stat().st_size + strong.stat().st_size) / 1e6
+
+            started = time.perf_counter()
+            out = subprocess.run([sys.executable, "-c", TRAIN_PROBE, str(weak), str(strong), str(models_dir),
+                                  str(args.chunk_lines)],
+                                 cwd=backend_path, capture_output=True, text=True, check=True)
+            result = json.loads(out.stdout.strip().splitlines()[-1])
+            print(f"{n:>12,} {size_mb:>6.0f} MB {time.perf_counter() - started:>7.1f}s {result['trees']:>6} "
+                  f"{result['accuracy']:>12.4f} {result['peak_rss_mb']:>7.0f} MB")
+
+        # The streamed artifact loads and serves like any other version
+        password_strength.model_registry = ModelRegistry(models_dir)
+        model = password_strength.PasswordStrengthModel()
+        model.load()
+        weak_result, strong_result = model.predict("abc123"), model.predict("Zq9!vL2#rT8@wP5$")
+        assert (weak_result["label"], strong_result["label"]) == ("Weak", "Strong"), (weak_result, strong_result)
+        print(f"✅ PasswordStrengthModel serves {model.model_info()['version']} "
+              f"({weak_result['score']:.2f} / {strong_result['score']:.2f})")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[200_000, 1_000_000, 3_000_000],
+                        help="passwords per class")
+    parser.add_argument("--chunk-lines", type=int, default=train.STREAM_CHUNK_LINES)
+    main(parser.parse_args())
@@ -0,0 +1,118 @@
+"""
+Model memory benchmark: private copies vs one shared mapping
+
+Trains a deliberately large forest into a temp directory and starts N
+worker processes (spawned, like `uvicorn --workers N`) for each loading
+strategy:
+
+  joblib       joblib.load(), as the service used to load the model
+  joblib-mmap  joblib.load(mmap_mode="r") on the uncompressed dump
+  flat-mmap    CompiledForest.load() of the flat compiled file
+
+Each worker loads the model, touches every byte of it, and then reports
+RSS and PSS from /proc/self/smaps_rollup while all workers are alive. It
+reports them as deltas over its own baseline taken before loading. PSS
+splits shared pages between the processes that map them, so its total is
+the real memory cost of the model across workers. Linux only.
+
+Usage:
+  python scripts/bench_model_memory.py --workers 8 --samples 20000
+"""
+import argparse
+import multiprocessing as mp
+import tempfile
+import time
+from pathlib import Path
+
+import bench_common  # noqa: F401  (import path + throwaway secrets)
+
+MODES = ("joblib", "joblib-mmap", "flat-mmap")
+
+
+def memory_kb() -> dict:
+    values = {}
+    with open("/proc/self/smaps_rollup") as f:
+        for line in f:
+            key, _, rest = line.partition(":")
+            if key in ("Rss", "Pss"):
+                values[key] = int(rest.split()[0])
+    return values
+
+
+def worker(mode: str, model_dir: str, barrier, results):
+    import joblib
+    import numpy as np
+    import sklearn.ensemble  # noqa: F401  (same imports in every mode, so the baselines match)
+    from app.ml.forest import CompiledForest
+
+    before = memory_kb()
+    X = np.random.default_rng(0).integers(0, 40, size=(256, 6))
+    if mode == "flat-mmap":
+        model = CompiledForest.load(Path(model_dir) / "model.forest")
+        # Fault in every page, the worst case for a long-running worker
+        touched = sum(float(a.sum()) for a in (model.feature, model.threshold, model.children, model.values))
+    else:
+        model = joblib.load(Path(model_dir) / "model.joblib", mmap_mode="r" if mode == "joblib-mmap" else None)
+        touched = float(sum(e.tree_.threshold.sum() for e in model.estimators_))
+    model.predict_proba(X)
+
+    barrier.wait()          # everyone has the model loaded
+    after = memory_kb()
+    results.put((after["Rss"] - before["Rss"], after["Pss"] - before["Pss"], touched))
+    barrier.wait()          # nobody exits before every worker measured
+
+
+def run_mode(mode: str, model_dir: str, n_workers: int):
+    ctx = mp.get_context("spawn")
+    barrier = ctx.Barrier(n_workers)
+    results = ctx.Queue()
+    procs = [ctx.Process(target=worker, args=(mode, model_dir, barrier, results)) for _ in range(n_workers)]
+    for p in procs:
+        p.start()
+    samples = [results.get(timeout=600) for _ in procs]
+    for p in procs:
+        p.join()
+    return samples
+
+
+def main(args):
+    import joblib
+    import numpy as np
+    from sklearn.ensemble import RandomForestClassifier
+    from app.ml.forest import CompiledForest
+
+    with tempfile.TemporaryDirectory() as model_dir:
+        print(f"🧠 Training a {args.trees}-tree forest on {args.samples:,} noisy samples...")
+        rng = np.random.default_rng(42)
+        X = rng.integers(0, 40, size=(args.samples, 6))
+        y = ((X[:, 0] + rng.normal(0, 15, args.samples)) > 20).astype(int)  # noise -> deep trees
+        clf = RandomForestClassifier(n_estimators=args.trees, random_state=42).fit(X, y)
+        joblib.dump(clf, Path(model_dir) / "model.joblib")
+        forest = CompiledForest.from_sklearn(clf)
+        forest.save(Path(model_dir) / "model.forest")
+        joblib_mb = (Path(model_dir) / "model.joblib").stat().st_size / 1e6
+        print(f"   {forest.node_count:,} nodes: joblib file {joblib_mb:.1f} MB, flat file {forest.nbytes / 1e6:.1f} MB")
+        del clf
+
+        print(f"\n{args.workers} workers, memory added by loading the model (per worker mean):")
+        print(f"{'mode':<13} {'RSS':>10} {'PSS':>10} {'total PSS':>11} {'time':>7}")
+        for mode in args.modes:
+            started = time.time()
+            samples = run_mode(mode, model_dir, args.workers)
+            rss = sum(s[0] for s in samples) / len(samples) / 1024
+            pss = sum(s[1] for s in samples) / len(samples) / 1024
+            total = sum(s[1] for s in samples) / 1024
+            print(f"{mode:<13} {rss:8.1f} MB {pss:8.1f} MB {total:9.1f} MB {time.time() - started:6.1f}s")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, default=8)
+    parser.add_argument("--samples", type=int, default=20000, help="training rows; more rows, bigger trees")
+    parser.add_argument("--trees", type=int, default=100)
+    parser.add_argument("--modes", nargs="+", default=list(MODES))
+    args = parser.parse_args()
+    unknown = set(args.modes) - set(MODES)
+    if unknown:
+        parser.error(f"unknown mode(s): {', '.join(sorted(unknown))}")
+    main(args)
@@ -0,0 +1,163 @@
+"""
+Refresh tokens: renewal cost vs a login, rotation, reuse detection and revocation
+
+Drives the app in-process (TestClient) on a throwaway SQLite database.
+It compares renewing a session by logging in again (bcrypt at
+BCRYPT_ROUNDS) with trading a refresh token at /api/auth/refresh, and
+counts the bcrypt calls each makes. Then it asserts that:
+
+  - a replayed (already used) refresh token ends its whole session: the
+    newest refresh token and its access token stop working at once
+  - /logout kills the access token on the next request, even though the
+    verified-token cache still holds it, and the refresh token with it
+  - another worker learns of the revocation on its next sync
+  - a password change ends every session of the user
+  - revoked jtis leave the in-memory set once their token has expired
+
+Usage:
+  python scripts/bench_refresh_tokens.py --logins 5 --refreshes 200
+"""
+import argparse
+import os
+import tempfile
+import time
+
+import bench_common  # noqa: F401  (import path + throwaway secrets)
+from bench_common import percentile
+
+os.environ["DATABASE_URL"] = f"sqlite:///{tempfile.mkdtemp()}/vault.db"
+
+from fastapi.testclient import TestClient
+
+from app.config import settings
+from app.core.hashing import bcrypt_pool
+from app.core.jwt import decode_access_token, token_cache
+from app.core.revocation import RevocationSet, revoked_tokens
+from app.database.session import SessionLocal
+from app.main import app
+from app.services.token_service import TokenService, token_service
+
+MASTER = "correct-horse-battery-staple"
+
+
+def login(client, password: str = MASTER) -> dict:
+    r = client.post("/api/auth/token", data={"username": "alice", "password": password})
+    assert r.status_code == 200, r.text
+    return r.json()
+
+
+def refresh(client, pair: dict):
+    return client.post("/api/auth/refresh", json={"refresh_token": pair["refresh_token"]})
+
+
+def vault_status(client, pair: dict) -> int:
+    return client.get("/api/passwords/", headers={"Authorization": f"Bearer {pair['access_token']}"}).status_code
+
+
+def timed(fn):
+    start = time.perf_counter()
+    result = fn()
+    return result, (time.perf_counter() - start) * 1000
+
+
+def main(args):
+    with TestClient(app) as client:
+        r = client.post("/api/auth/register", json={"username": "alice", "email": "alice@example.com",
+                                                     "master_password": MASTER})
+        assert r.status_code == 201, r.text
+        pair = login(client)
+        assert pair["refresh_token"] and pair["expires_in"] == settings.ACCESS_TOKEN_EXPIRE_MINUTES * 60
+
+        # Renewal cost: log in again vs trade the refresh token
+        bcrypt_before = bcrypt_pool.completed
+        login_ms = [timed(lambda: login(client))[1] for _ in range(args.logins)]
+        login_bcrypt = (bcrypt_pool.completed - bcrypt_before) / args.logins
+        bcrypt_before = bcrypt_pool.completed
+        refresh_ms = []
+        for _ in range(args.refreshes):
+            r, ms = timed(lambda: refresh(client, pair))
+            assert r.status_code == 200, r.text
+            pair = r.json()
+            refresh_ms.append(ms)
+        assert bcrypt_pool.completed == bcrypt_before, "a refresh must never run bcrypt"
+        assert vault_status(client, pair) == 200
+
+        per_day = 8 * 60 / settings.ACCESS_TOKEN_EXPIRE_MINUTES
+        print(f"\n{'renew a session':<28} {'p50':>9} {'p99':>9} {'bcrypt calls':>13}")
+        print(f"{'login again (/token)':<28} {percentile(login_ms, 50):6.1f} ms {percentile(login_ms, 99):6.1f} ms "
+              f"{login_bcrypt:>13.0f}")
+        print(f"{'refresh (/refresh)':<28} {percentile(refresh_ms, 50):6.1f} ms {percentile(refresh_ms, 99):6.1f} ms "
+              f"{0:>13}")
+        print(f"speed-up {percentile(login_ms, 50) / percentile(refresh_ms, 50):.0f}x at BCRYPT_ROUNDS="
+              f"{settings.BCRYPT_ROUNDS}; bcrypt verifications per client per 8 h day: "
+              f"{per_day:.0f} -> {1 / settings.REFRESH_TOKEN_EXPIRE_DAYS:.2f}\n")
+
+        # Reuse detection: replaying a used refresh token ends the session
+        used = pair
+        r = refresh(client, used)
+        assert r.status_code == 200
+        newest = r.json()
+        assert vault_status(client, newest) == 200      # now in the verified-token cache
+        reuse = token_service.reuse_detected
+        assert refresh(client, used).status_code == 401
+        assert token_service.reuse_detected == reuse + 1
+        assert refresh(client, newest).status_code == 401, "the rest of the family must be revoked"
+        assert vault_status(client, newest) == 401, "the family's access token must be revoked"
+        print("✅ replaying a used refresh token ends the session (refresh and access tokens)")
+
+        # Logout
+        session = login(client)
+        assert vault_status(client, session) == 200
+        r = client.post("/api/auth/logout", json={"refresh_token": session["refresh_token"]},
+                        headers={"Authorization": f"Bearer {session['access_token']}"})
+        assert r.status_code == 204, r.text
+        assert token_cache.get(session["access_token"]) is not None
+        assert vault_status(client, session) == 401
+        assert refresh(client, session).status_code == 401
+        print("✅ logout revokes the access token on the next request, and its refresh token")
+
+        # Another worker: its own revocation set, refreshed by sync()
+        db = SessionLocal()
+        worker_b = TokenService(revocations=RevocationSet())
+        other = login(client)
+        jti = decode_access_token(other["access_token"])["jti"]
+        client.post("/api/auth/logout", headers={"Authorization": f"Bearer {other['access_token']}"})
+        assert revoked_tokens.is_revoked(jti) and not worker_b.revocations.is_revoked(jti)
+        loaded = worker_b.sync(db)
+        assert worker_b.revocations.is_revoked(jti)
+        print(f"✅ another worker picks the logout up on its next sync ({loaded} live revocations loaded, "
+              f"every {settings.REVOCATION_SYNC_SECONDS:g}s)")
+
+        # A password change ends every session
+        sessions = [login(client) for _ in range(2)]
+        r = client.post("/api/auth/change-password",
+                        headers={"Authorization": f"Bearer {sessions[0]['access_token']}"},
+                        json={"current_master_password": MASTER,
+                              "new_master_password": "another-long-master-password"})
+        assert r.status_code == 204, r.text
+        for s in sessions:
+            assert vault_status(client, s) == 401 and refresh(client, s).status_code == 401
+        print("✅ a password change ends every session")
+        db.close()
+
+        # The revocation set only holds tokens that have not expired yet
+        revocations = RevocationSet()
+        for i in range(10000):
+            revocations.revoke(f"jti-{i}", time.time() + 3600)
+        start = time.perf_counter()
+        for i in range(100000):
+            revocations.is_revoked("not-revoked")
+        check_us = (time.perf_counter() - start) / 100000 * 1e6
+        revocations.revoke("short-lived", time.time() + 0.5)
+        time.sleep(0.6)
+        revocations.purge()
+        assert len(revocations) == 10000 and not revocations.is_revoked("short-lived")
+        print(f"✅ expired revocations are purged; is_revoked costs {check_us:.2f} us with 10,000 entries")
+        print(f"   token stats: {token_service.stats()}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--logins", type=int, default=5, help="logins timed for the comparison")
+    parser.add_argument("--refreshes", type=int, default=200, help="refreshes timed for the comparison")
+    main(parser.parse_args())
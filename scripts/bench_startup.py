@@ -0,0 +1,108 @@
+"""
+API cold-start benchmark
+
+1. Import time of app.main in a fresh interpreter (median of several runs),
+   plus which heavy ML modules that import dragged in.
+2. Time to first response: starts uvicorn and polls until /health
+   answers, until /ready reports ready, and until /api/ml/predict returns a
+   score. Each time is measured from process start.
+
+Usage:
+  python scripts/bench_startup.py --runs 5
+"""
+import argparse
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import time
+
+import httpx
+
+from bench_common import backend_path
+
+HEAVY_MODULES = ("numpy", "sklearn", "joblib")
+
+IMPORT_PROBE = f"""
+import sys, time
+start = time.perf_counter()
+import app.main
+elapsed = time.perf_counter() - start
+print(elapsed, ",".join(m for m in {HEAVY_MODULES!r} if m in sys.modules))
+"""
+
+
+def bench_env() -> dict:
+    env = dict(os.environ)
+    env.setdefault("DATABASE_URL", "sqlite:////tmp/bench_startup.db")
+    return env
+
+
+def import_time(runs: int):
+    samples, heavy = [], ""
+    for _ in range(runs):
+        out = subprocess.run([sys.executable, "-c", IMPORT_PROBE], cwd=backend_path, env=bench_env(),
+                             capture_output=True, text=True, check=True).stdout.strip().splitlines()[-1]
+        elapsed, _, heavy = out.partition(" ")
+        samples.append(float(elapsed))
+    return statistics.median(samples), heavy or "none"
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def first_response():
+    port = free_port()
+    base = f"http://127.0.0.1:{port}"
+    started = time.perf_counter()
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(port), "--log-level", "warning"],
+        cwd=backend_path, env=bench_env(), stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    marks = {}
+    try:
+        with httpx.Client(timeout=1.0) as client:
+            while len(marks) < 3 and time.perf_counter() - started < 60:
+                try:
+                    if "health" not in marks and client.get(f"{base}/health").status_code == 200:
+                        marks["health"] = time.perf_counter() - started
+                    if "ready" not in marks:
+                        ready = client.get(f"{base}/ready")
+                        if ready.status_code == 200:
+                            marks["ready"] = time.perf_counter() - started
+                        elif ready.status_code == 404:
+                            marks["ready"] = None   # tree without a readiness endpoint
+                    if "predict" not in marks:
+                        r = client.post(f"{base}/api/ml/predict", json={"password": "Tr0ub4dor&3"})
+                        if r.status_code == 200:
+                            marks["predict"] = time.perf_counter() - started
+                except httpx.TransportError:
+                    pass
+                time.sleep(0.005)
+    finally:
+        server.terminate()
+        server.wait()
+    return marks
+
+
+def main(args):
+    median, heavy = import_time(args.runs)
+    print(f"import app.main: {median * 1000:.0f} ms (median of {args.runs}), heavy modules loaded: {heavy}")
+
+    runs = [first_response() for _ in range(args.runs)]
+    for key, label in (("health", "first /health"), ("ready", "/ready is ready"), ("predict", "first ML score")):
+        values = [r.get(key) for r in runs if r.get(key) is not None]
+        if values:
+            print(f"{label:<18} {statistics.median(values) * 1000:7.0f} ms after process start")
+        else:
+            print(f"{label:<18} {'n/a':>7}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5)
+    main(parser.parse_args())
@@ -0,0 +1,122 @@
+"""
+Move vault entries from the global ENCRYPTION_KEY to per-user data keys
+
+Streams the legacy entries (encryption_version 1) in id order, one chunk at
+a time. Each chunk is decrypted with the global key in one bulk call and
+re-encrypted per owner with that user's data key. The chunk's rows are
+written in a single transaction. Rows are only rewritten while they are
+still version 1, so entries the app re-saved in the meantime are left alone.
+
+Migrated rows stop matching the query. An interrupted run (Ctrl-C, crash)
+therefore resumes where it stopped when started again, without a checkpoint
+file. Entries that cannot be decrypted are reported and left at version 1.
+
+Usage:
+  python scripts/migrate_envelope.py --chunk 500
+  python scripts/migrate_envelope.py --dry-run
+"""
+import argparse
+import sys
+import time
+from collections import defaultdict
+from pathlib import Path
+
+# Make 'app' importable (the backend folder is the import root)
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "backend"))
+
+from sqlalchemy import bindparam, func, update
+
+from app.core.envelope import DataKeyManager, data_key_manager
+from app.core.security import ENVELOPE_ENCRYPTION_VERSION, LEGACY_ENCRYPTION_VERSION, encryption_manager
+from app.database.init_db import init_database
+from app.database.session import SessionLocal
+from app.models.password_entry import PasswordEntry
+from app.models.user import User  # noqa: F401  (registers the mapper)
+
+entries = PasswordEntry.__table__
+
+# One executemany per chunk. updated_at is pinned: re-encryption is not a user edit
+MIGRATE_ROW = (
+    update(entries)
+    .where(entries.c.id == bindparam("_id"), entries.c.encryption_version == LEGACY_ENCRYPTION_VERSION)
+    .values(encrypted_password=bindparam("_token"), encryption_version=ENVELOPE_ENCRYPTION_VERSION,
+            updated_at=entries.c.updated_at)
+)
+
+
+def migrate(db, chunk: int = 500, limit: int = None, dry_run: bool = False,
+            keys: DataKeyManager = data_key_manager, report=print) -> dict:
+    """Migrate up to `limit` legacy entries. Returns counts for the run."""
+    legacy = entries.c.encryption_version == LEGACY_ENCRYPTION_VERSION
+    total = db.execute(entries.select().with_only_columns(func.count()).where(legacy)).scalar()
+    if limit is not None:
+        total = min(total, limit)
+    stats = {"total": total, "migrated": 0, "failed": 0, "failed_ids": []}
+    report(f"🔐 {total:,} legacy entries to migrate{' (dry run)' if dry_run else ''}")
+
+    start = time.perf_counter()
+    last_id = 0
+    seen = 0
+    while seen < total:
+        rows = db.execute(
+            entries.select().with_only_columns(entries.c.id, entries.c.user_id, entries.c.encrypted_password)
+            .where(legacy, entries.c.id > last_id).order_by(entries.c.id).limit(min(chunk, total - seen))
+        ).all()
+        if not rows:
+            break
+        last_id = rows[-1].id
+        seen += len(rows)
+
+        # Open the whole chunk with the global key, then seal it per owner
+        by_user = defaultdict(list)
+        for row, opened in zip(rows, encryption_manager.decrypt_many([r.encrypted_password for r in rows])):
+            if opened.ok:
+                by_user[row.user_id].append((row.id, opened.value))
+            else:
+                stats["failed"] += 1
+                stats["failed_ids"].append(row.id)
+
+        params = []
+        for user_id, items in by_user.items():
+            key = keys.key_for(db, user_id)
+            sealed = encryption_manager.encrypt_many([plain for _, plain in items], key)
+            params.extend({"_id": entry_id, "_token": s.value} for (entry_id, _), s in zip(items, sealed))
+
+        if params and not dry_run:
+            db.execute(MIGRATE_ROW, params)
+            db.commit()
+        stats["migrated"] += len(params)
+
+        elapsed = time.perf_counter() - start
+        rate = seen / elapsed if elapsed else 0.0
+        eta = (total - seen) / rate if rate else 0.0
+        report(f"   {seen:,}/{total:,} ({seen / total:.0%})  {rate:,.0f} entries/s  ETA {eta:,.0f}s  "
+               f"failed {stats['failed']:,}")
+
+    stats["seconds"] = time.perf_counter() - start
+    return stats
+
+
+def main(args):
+    init_database()  # adds the encryption_version / wrapped_data_key columns if missing
+    db = SessionLocal()
+    try:
+        stats = migrate(db, chunk=args.chunk, limit=args.limit, dry_run=args.dry_run)
+    except KeyboardInterrupt:
+        db.rollback()
+        print("⏸️  Interrupted - committed chunks are kept, run again to resume")
+        return
+    finally:
+        db.close()
+    print(f"✅ Migrated {stats['migrated']:,} entries in {stats['seconds']:.1f}s")
+    if stats["failed"]:
+        print(f"⚠️  {stats['failed']:,} entries could not be decrypted with ENCRYPTION_KEY "
+              f"(left at version 1): ids {stats['failed_ids'][:20]}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--chunk", type=int, default=500, help="entries per transaction")
+    parser.add_argument("--limit", type=int, default=None, help="stop after this many entries")
+    parser.add_argument("--dry-run", action="store_true", help="decrypt and re-encrypt, but write nothing")
+    main(parser.parse_args())
@@ -0,0 +1,88 @@
+"""
+Rewrap every user's data key under the primary key-encryption key
+
+Run after putting a new KEK first in ENCRYPTION_KEKS (the old one stays
+listed so existing wraps still open). Work is one small token per user.
+Vault entries are untouched. Users are streamed in id order, one
+transaction per chunk, and a row is only rewritten if its wrap has not
+changed since it was read. Re-running is safe: rewrapping an already
+current key just rewraps it again. Once the run reports no failures, drop
+the old KEK from ENCRYPTION_KEKS.
+
+Usage:
+  ENCRYPTION_KEKS="<new>,<old>" python scripts/rotate_kek.py --chunk 1000
+"""
+import argparse
+import sys
+import time
+from pathlib import Path
+
+# Make 'app' importable (the backend folder is the import root)
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "backend"))
+
+from sqlalchemy import bindparam, update
+
+from app.core.envelope import DataKeyError, DataKeyManager, data_key_manager
+from app.database.init_db import init_database
+from app.database.session import SessionLocal
+from app.models.password_entry import PasswordEntry  # noqa: F401  (registers the mapper)
+from app.models.user import User
+
+users = User.__table__
+
+REWRAP_ROW = (
+    update(users)
+    .where(users.c.id == bindparam("_id"), users.c.wrapped_data_key == bindparam("_old"))
+    .values(wrapped_data_key=bindparam("_new"), updated_at=users.c.updated_at)
+)
+
+
+def rotate(db, chunk: int = 1000, keys: DataKeyManager = data_key_manager, report=print) -> dict:
+    """Rewrap all data keys under keys' primary KEK. Returns counts for the run."""
+    stats = {"rewrapped": 0, "failed": 0, "failed_ids": []}
+    start = time.perf_counter()
+    last_id = 0
+    while True:
+        rows = db.execute(
+            users.select().with_only_columns(users.c.id, users.c.wrapped_data_key)
+            .where(users.c.wrapped_data_key.is_not(None), users.c.id > last_id)
+            .order_by(users.c.id).limit(chunk)
+        ).all()
+        if not rows:
+            break
+        last_id = rows[-1].id
+
+        params = []
+        for row in rows:
+            try:
+                params.append({"_id": row.id, "_old": row.wrapped_data_key, "_new": keys.rewrap(row.wrapped_data_key)})
+            except DataKeyError:
+                stats["failed"] += 1
+                stats["failed_ids"].append(row.id)
+        if params:
+            db.execute(REWRAP_ROW, params)
+            db.commit()
+        stats["rewrapped"] += len(params)
+        report(f"   {stats['rewrapped']:,} data keys rewrapped, failed {stats['failed']:,}")
+
+    stats["seconds"] = time.perf_counter() - start
+    return stats
+
+
+def main(args):
+    init_database()
+    print(f"🔑 Rewrapping data keys under the first of {data_key_manager.kek_count} active KEK(s)")
+    db = SessionLocal()
+    try:
+        stats = rotate(db, chunk=args.chunk)
+    finally:
+        db.close()
+    print(f"✅ Rewrapped {stats['rewrapped']:,} data keys in {stats['seconds']:.1f}s")
+    if stats["failed"]:
+        print(f"⚠️  {stats['failed']:,} data keys open with none of ENCRYPTION_KEKS: ids {stats['failed_ids'][:20]}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--chunk", type=int, default=1000, help="users per transaction")
+    main(parser.parse_args())